@@ -0,0 +1,218 @@
+"""Tabelas agregadas de gaps usadas pelos filtros do dashboard.
+
+As estatísticas por ativo (média, quartis, bigodes e uma amostra de outliers
+de ``Variação_%`` por tipo de gap, contagens por dia da semana x tipo de gap)
+são calculadas ticker a ticker e guardadas no cache em disco
+(``cache_derivados``) junto com a base diária; só os tickers regravados são
+recalculados. O dashboard só faz consultas por ticker nessas tabelas em vez de
+varrer todas as linhas a cada interação.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import armazem_precos
+import cache_derivados
+from dados_graficos import MAX_OUTLIERS, resumo_box
+from instrumentacao import logger
+from motor_gaps import LIMIAR_PADRAO, TIPOS_GAP, classificar_gaps, gap_abertura
+
+TABELAS = ("estatisticas", "resumo_gap", "frequencia", "quartis", "outliers")
+# Tabelas calculadas ticker a ticker (``quartis`` é sobre todos os ativos)
+TABELAS_POR_TICKER = ("estatisticas", "resumo_gap", "frequencia", "outliers")
+ARQUIVO_CSV = "dados_completos_dashboard.csv"
+
+# Nome por ``dayofweek``; fins de semana (já removidos por ``validacao_dados``) caem em 'Segunda'
+_NOMES_POR_DIA = np.array(['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Segunda', 'Segunda'])
+
+
+def dias_semana(datas):
+    """``Dia_Semana`` em português a partir das datas (vetorizado)."""
+    return _NOMES_POR_DIA[pd.DatetimeIndex(datas).dayofweek]
+
+
+def derivar_colunas(df):
+    """Acrescenta ``Variação_%``, ``Gap_%``, ``Tipo_Gap`` e ``Dia_Semana``.
+
+    ``Tipo_Gap`` vem do gap de abertura (Open contra o fechamento anterior);
+    sem a coluna Open cai no retorno fechamento a fechamento, como antes.
+    """
+    df['Variação_%'] = (df.groupby('Ticker', observed=True)['Close'].pct_change() * 100).fillna(0)
+    if 'Open' in df.columns:
+        df['Gap_%'] = np.nan_to_num(gap_abertura(df['Ticker'], df['Open'], df['Close']))
+    else:
+        df['Gap_%'] = df['Variação_%']
+    df['Tipo_Gap'] = classificar_gaps(df['Gap_%'])
+    df['Dia_Semana'] = dias_semana(df['Date'])
+    return df
+
+
+def carregar_base():
+    """Dados diários com as colunas do dashboard (armazém ou CSV combinado)."""
+    if armazem_precos.existe_armazem():
+        # Só as colunas usadas pelos gráficos são lidas do Parquet
+        return derivar_colunas(armazem_precos.ler_todos(colunas=["Date", "Open", "Close", "Volume"]))
+    if os.path.exists(ARQUIVO_CSV):
+        return pd.read_csv(ARQUIVO_CSV)
+    return pd.DataFrame(columns=["Ticker", "Date", "Variação_%", "Tipo_Gap", "Dia_Semana"])
+
+
+def _quartis(agrupado):
+    quartis = agrupado.quantile([0.25, 0.5, 0.75]).unstack().reindex(columns=[0.25, 0.5, 0.75])
+    quartis.columns = ["Q1", "Q2", "Q3"]
+    return quartis
+
+
+def construir_agregados(df_all):
+    """Calcula todas as tabelas agregadas a partir do DataFrame diário."""
+    df = df_all[["Ticker", "Dia_Semana", "Tipo_Gap", "Variação_%"]].copy()
+    for col in ("Ticker", "Dia_Semana", "Tipo_Gap"):
+        df[col] = df[col].astype(str)
+    df["Variação_%"] = df["Variação_%"].astype("float64")
+    variacao = df.groupby(["Ticker", "Tipo_Gap"])["Variação_%"]
+
+    # Estatísticas de box plot (bigodes de Tukey) e amostra limitada de outliers
+    box, outliers = resumo_box(df, ["Ticker", "Tipo_Gap"])
+    resumo_gap = box.join(pd.concat([variacao.min().rename("Min"), variacao.max().rename("Max")], axis=1),
+                          on=["Ticker", "Tipo_Gap"])
+    resumo_gap = resumo_gap[["Ticker", "Tipo_Gap", "N", "Media", "Min", "Q1", "Q2", "Q3", "Max",
+                             "Bigode_Inf", "Bigode_Sup"]]
+
+    frequencia = (df.groupby(["Ticker", "Dia_Semana", "Tipo_Gap"]).size()
+                  .reset_index(name="Frequência"))
+
+    # Percentual de cada tipo de gap por ativo e dia da semana
+    contagens = (frequencia.pivot_table(index=["Ticker", "Dia_Semana"], columns="Tipo_Gap",
+                                        values="Frequência", fill_value=0)
+                 .reindex(columns=TIPOS_GAP, fill_value=0))
+    dias = contagens.sum(axis=1)
+    estatisticas = (contagens.div(dias, axis=0) * 100).round(1)
+    estatisticas.columns = ["Gap_Alto", "Gap_Baixo", "Sem_Gap"]
+    estatisticas.insert(0, "Dias", dias.astype(int))
+    estatisticas["Variação_Media"] = df.groupby(["Ticker", "Dia_Semana"])["Variação_%"].mean().round(3)
+    estatisticas = estatisticas.reset_index().rename(columns={"Ticker": "Ativo"})
+
+    return {
+        "estatisticas": estatisticas,
+        "resumo_gap": resumo_gap,
+        "frequencia": frequencia,
+        "quartis": _quartis_gerais(df),
+        "outliers": outliers,
+    }
+
+
+def _quartis_gerais(df):
+    return _quartis(df["Variação_%"].astype("float64").groupby(df["Tipo_Gap"].astype(str))).reset_index()
+
+
+def _mtime_fontes():
+    fontes = glob.glob(os.path.join(armazem_precos.DIRETORIO_PADRAO, "Ticker=*",
+                                    armazem_precos.NOME_ARQUIVO))
+    if os.path.exists(ARQUIVO_CSV):
+        fontes.append(ARQUIVO_CSV)
+    return max((os.path.getmtime(f) for f in fontes), default=0)
+
+
+def versao_dados():
+    """Versão dos dados de origem (mtime mais recente), usada como chave de cache."""
+    return _mtime_fontes()
+
+
+def indexar_por_ticker(agregados):
+    """Indexa as tabelas por ativo para que cada seleção seja uma consulta direta."""
+    return {
+        "estatisticas": agregados["estatisticas"].set_index("Ativo").sort_index(),
+        "resumo_gap": agregados["resumo_gap"].set_index("Ticker").sort_index(),
+        "frequencia": agregados["frequencia"].set_index("Ticker").sort_index(),
+        "quartis": agregados["quartis"],
+        "outliers": agregados["outliers"].set_index("Ticker").sort_index(),
+    }
+
+
+def consultar(tabela, ticker):
+    """Linhas de ``tabela`` (indexada por ativo) do ticker pedido."""
+    if ticker not in tabela.index:
+        return tabela.iloc[0:0].reset_index()
+    return tabela.loc[[ticker]].reset_index()
+
+
+def parametros_analise():
+    """Parâmetros da análise; qualquer mudança gera chaves novas nos caches."""
+    return {"limiar": LIMIAR_PADRAO, "max_outliers": MAX_OUTLIERS, "tabelas": TABELAS}
+
+
+def _derivar_ticker(ticker):
+    df = armazem_precos.ler_ticker(ticker, colunas=["Date", "Open", "Close", "Volume"])
+    df.insert(0, "Ticker", ticker)
+    df = derivar_colunas(df)
+    return df, construir_agregados(df)
+
+
+def carregar_ticker(ticker, diretorio_cache=cache_derivados.DIRETORIO_CACHE):
+    """``(df, agregados, acerto)`` de um ticker do armazém, via cache em disco."""
+    (df, agregados), acerto = cache_derivados.obter(
+        f"ticker_{ticker}", [armazem_precos.caminho_ticker(ticker)],
+        lambda: _derivar_ticker(ticker), parametros_analise(), diretorio=diretorio_cache)
+    return df, agregados, acerto
+
+
+def carregar_com_cache(diretorio_cache=cache_derivados.DIRETORIO_CACHE, max_workers=None):
+    """Base diária e agregados a partir do cache em disco.
+
+    Cada ticker do armazém é uma entrada chaveada pelo arquivo da sua partição:
+    só os tickers regravados desde a última execução são recalculados. Com
+    ``max_workers`` > 1 os tickers são processados num pool de processos.
+    Devolve ``(df_all, agregados, recalculados)``.
+    """
+    parametros = parametros_analise()
+    if not armazem_precos.existe_armazem():
+        if not os.path.exists(ARQUIVO_CSV):
+            df = carregar_base()
+            return df, construir_agregados(df), []
+
+        def calcular():
+            df = pd.read_csv(ARQUIVO_CSV)
+            return df, construir_agregados(df)
+
+        (df, agregados), acerto = cache_derivados.obter("csv_combinado", [ARQUIVO_CSV], calcular, parametros,
+                                                        diretorio=diretorio_cache)
+        return df, agregados, [] if acerto else [ARQUIVO_CSV]
+
+    tickers = armazem_precos.listar_tickers()
+    if max_workers and max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            resultados = list(executor.map(carregar_ticker, tickers, [diretorio_cache] * len(tickers)))
+    else:
+        resultados = [carregar_ticker(t, diretorio_cache) for t in tickers]
+
+    partes, tabelas, recalculados = [], [], []
+    for ticker, (df, agregados, acerto) in zip(tickers, resultados):
+        partes.append(df)
+        tabelas.append(agregados)
+        if not acerto:
+            recalculados.append(ticker)
+    df_all, agregados = combinar_tickers(partes, tabelas)
+    return df_all, agregados, recalculados
+
+
+def combinar_tickers(partes, tabelas):
+    """Junta as bases e os agregados calculados ticker a ticker."""
+    df_all = pd.concat(partes, ignore_index=True)
+    df_all["Ticker"] = df_all["Ticker"].astype("category")
+    agregados = {nome: pd.concat([t[nome] for t in tabelas], ignore_index=True) for nome in TABELAS_POR_TICKER}
+    agregados["quartis"] = _quartis_gerais(df_all)
+    return df_all, agregados
+
+
+def aquecer_cache(diretorio_cache=cache_derivados.DIRETORIO_CACHE, max_workers=None):
+    """Etapa executada após cada atualização dos dados: recalcula no cache os tickers alterados."""
+    _, agregados, recalculados = carregar_com_cache(diretorio_cache, max_workers)
+    logger.info("Cache em %s/: %d ativo(s) recalculado(s)", diretorio_cache, len(recalculados))
+    return agregados
+
+
+if __name__ == "__main__":
+    aquecer_cache()
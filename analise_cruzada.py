@@ -0,0 +1,93 @@
+"""Visão cruzada entre ativos: correlação de retornos e coocorrência de gaps.
+
+Os dados diários são alinhados numa matriz datas x tickers e as duas matrizes
+ticker x ticker saem de produtos matriciais (sem laço por par):
+
+- correlação de ``Variação_%`` por pares completos (só as datas em que os dois
+  ativos negociaram entram em cada célula);
+- coocorrência de gaps: quantos pregões os dois ativos abriram com gap do
+  mesmo tipo, e a probabilidade condicional P(coluna | linha).
+"""
+import numpy as np
+import pandas as pd
+
+MINIMO_PERIODOS = 20
+TIPOS_COOCORRENCIA = ("Alta", "Baixa", "Qualquer")
+
+
+def alinhar(df, coluna):
+    """Matriz datas x tickers de ``coluna`` (NaN onde o ativo não negociou)."""
+    tickers = pd.Categorical(df["Ticker"].astype(str))
+    datas = pd.DatetimeIndex(pd.to_datetime(df["Date"]))
+    indice_datas, codigos_datas = np.unique(datas.to_numpy("datetime64[ns]"), return_inverse=True)
+    valores = df[coluna].to_numpy()
+    matriz = np.full((len(indice_datas), len(tickers.categories)),
+                     np.nan if valores.dtype.kind == "f" else None,
+                     dtype=np.float64 if valores.dtype.kind == "f" else object)
+    matriz[codigos_datas, tickers.codes] = valores
+    return pd.DataFrame(matriz, index=pd.DatetimeIndex(indice_datas, name="Date"),
+                        columns=pd.Index(tickers.categories, name="Ticker"))
+
+
+def correlacao(retornos, minimo_periodos=MINIMO_PERIODOS):
+    """Correlação de Pearson por pares completos, via produtos matriciais."""
+    x = retornos.to_numpy(np.float64)
+    presente = (~np.isnan(x)).astype(np.float64)
+    x = np.nan_to_num(x)
+    n = presente.T @ presente
+    soma = x.T @ presente                  # soma de x_i nas datas em que j existe
+    soma2 = (x * x).T @ presente
+    cruzado = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * cruzado - soma * soma.T
+        var = n * soma2 - soma * soma
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < minimo_periodos] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(n) >= minimo_periodos, 1.0, np.nan))
+    return pd.DataFrame(np.clip(corr, -1, 1), index=retornos.columns, columns=retornos.columns)
+
+
+def coocorrencia_gaps(tipos_gap, tipo="Qualquer"):
+    """Contagens de pregões com gap simultâneo e P(gap na coluna | gap na linha).
+
+    ``tipos_gap`` é a matriz alinhada de ``Tipo_Gap``; ``tipo`` é ``Alta``,
+    ``Baixa`` ou ``Qualquer`` (alta ou baixa, mesma direção nos dois ativos).
+    """
+    valores = tipos_gap.to_numpy()
+    direcoes = ("Alta", "Baixa") if tipo == "Qualquer" else (tipo,)
+    contagens = np.zeros((valores.shape[1], valores.shape[1]))
+    for direcao in direcoes:
+        indicador = (valores == direcao).astype(np.float32)
+        contagens += indicador.T @ indicador
+    with np.errstate(invalid="ignore", divide="ignore"):
+        condicional = contagens / np.diag(contagens)[:, None]
+    rotulos = tipos_gap.columns
+    return (pd.DataFrame(contagens.astype(np.int64), index=rotulos, columns=rotulos),
+            pd.DataFrame(condicional, index=rotulos, columns=rotulos))
+
+
+def principais_pares(matriz, n=20, nome="Valor"):
+    """Os ``n`` maiores valores fora da diagonal (cada par uma vez)."""
+    valores = matriz.to_numpy()
+    i, j = np.triu_indices_from(valores, k=1)
+    pares = valores[i, j]
+    validos = np.flatnonzero(~pd.isna(pares))
+    topo = validos[np.argsort(-pares[validos].astype(np.float64), kind="stable")[:n]]
+    return pd.DataFrame({"Ativo_A": matriz.index[i[topo]], "Ativo_B": matriz.columns[j[topo]],
+                         nome: pares[topo]})
+
+
+def calcular(df, tipo="Qualquer", minimo_periodos=MINIMO_PERIODOS):
+    """Correlação, coocorrência (contagens) e coocorrência condicional."""
+    corr = correlacao(alinhar(df, "Variação_%"), minimo_periodos)
+    contagens, condicional = coocorrencia_gaps(alinhar(df, "Tipo_Gap"), tipo)
+    return {"correlacao": corr, "coocorrencia": contagens, "condicional": condicional}
+
+
+if __name__ == "__main__":
+    import agregados_gaps
+    resultado = calcular(agregados_gaps.carregar_base())
+    print("Pares mais correlacionados:")
+    print(principais_pares(resultado["correlacao"], nome="Correlação").to_string(index=False))
+    print("\nPares que mais abrem com gap juntos:")
+    print(principais_pares(resultado["coocorrencia"], nome="Pregões").to_string(index=False))
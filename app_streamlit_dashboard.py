@@ -1,83 +1,67 @@
 
+# pylint: disable=wrong-import-order
+import instrumentacao  # antes do Streamlit: fallback do início do processo fora do Linux
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import os
+import json
+# pylint: enable=wrong-import-order
+
+# plotly.express, backtest_gaps, carregador_csv e cache_derivados são importados
+# no primeiro uso, para o título e os filtros aparecerem antes
+import agregados_gaps
+import armazem_precos
+import dados_graficos
+import estatisticas_incrementais
+import instantaneo_painel
+from dataset_painel import DatasetPainel
 
 st.set_page_config(page_title="Painel de Análise Estatística - Day Trade", layout="wide")
 
+# Instrumentação do rerun (spans por etapa, contadores de cache)
+medidor = instrumentacao.Medidor()
+painel_perf = st.sidebar.checkbox("⚙️ Painel de performance")
+area_perf = st.sidebar.container()
+
+def mostrar_grafico(fig, etapa):
+    # Span em volta do envio ao navegador (serialização incluída)
+    with medidor.span(etapa) as registro:
+        if painel_perf:
+            registro["payload_kb"] = round(dados_graficos.bytes_payload(fig) / 1e3, 1)
+        st.plotly_chart(fig, use_container_width=True)
+
 st.title("📊 Painel de Análise Estatística - 30 Ativos Bovespa (Day Trade)")
 st.markdown("Visualização interativa de métricas estatísticas com base em gaps, liquidez, rentabilidade e volatilidade diária.")
 
 # Carregar os dados
-@st.cache_data
-def carregar_dados():
+# cache_resource: o dataset (possivelmente mapeado do instantâneo) é compartilhado sem pickle a cada acerto;
+# max_entries=1 libera o dataset da versão anterior quando os dados mudam
+@st.cache_resource(max_entries=1)
+def carregar_dados(versao_dados):
+    # versao_dados (mtime das fontes) invalida o cache em memória quando o downloader regrava os arquivos
+    instrumentacao.contar_miss("carregar_dados")
+    falhas = {}
+    agregados = None
     try:
-        # Tentar carregar arquivos de análise se existirem
-        if os.path.exists("dashboard_analise_ativos.csv"):
-            df_stats = pd.read_csv("dashboard_analise_ativos.csv")
-        else:
-            # Criar dados mock se não existir
-            df_stats = pd.DataFrame({
-                "Ativo": ["POMO4", "BRFS3", "WEGE3", "MGLU3"],
-                "Dia_Semana": ["Segunda", "Terça", "Quarta", "Quinta"] * 1,
-                "Gap_Alto": [10, 15, 8, 12],
-                "Gap_Baixo": [5, 8, 3, 7],
-                "Sem_Gap": [85, 77, 89, 81]
-            })
-        
-        if os.path.exists("quartis_por_tipo_gap.csv"):
-            df_quartis = pd.read_csv("quartis_por_tipo_gap.csv")
-        else:
-            # Criar dados mock se não existir
-            df_quartis = pd.DataFrame({
-                "Tipo_Gap": ["Alta", "Baixa", "Sem Gap"],
-                "Q1": [0.5, -1.5, -0.2],
-                "Q2": [1.0, -0.5, 0.1],
-                "Q3": [2.0, 0.5, 0.8]
-            })
-        
-        # Carregar arquivos diários se existirem
-        if os.path.exists("dados_completos_dashboard.csv"):
-            df_all = pd.read_csv("dados_completos_dashboard.csv")
+        # Instantâneo pré-processado da mesma versão: só mapeia os arquivos
+        instantaneo = instantaneo_painel.carregar(versao_dados)
+        if instantaneo is not None:
+            dados, agregados = instantaneo
+            return agregados_gaps.indexar_por_ticker(agregados), dados, falhas
+
+        # Armazém Parquet / CSV combinado via cache em disco (só tickers alterados são recalculados)
+        if armazem_precos.existe_armazem() or os.path.exists(agregados_gaps.ARQUIVO_CSV):
+            df_all, agregados, recalculados = agregados_gaps.carregar_com_cache()
+            instrumentacao.logger.info("Cache em disco: %d fonte(s) recalculada(s) %s",
+                                       len(recalculados), recalculados)
         else:
             csv_files = [f for f in os.listdir() if f.endswith(".csv") and "diario" in f]
             if csv_files:
-                # Tentar carregar e processar arquivos individuais
-                dfs = []
-                for f in csv_files:
-                    try:
-                        df_temp = pd.read_csv(f)
-                        if not df_temp.empty and len(df_temp.columns) > 3:
-                            # Extrair ticker do nome do arquivo
-                            ticker = f.replace("_diario_5anos.csv", "")
-                            df_temp['Ticker'] = ticker
-                            
-                            # Calcular variação percentual se não existir
-                            if 'Close' in df_temp.columns:
-                                df_temp['Variação_%'] = df_temp['Close'].pct_change() * 100
-                                df_temp['Variação_%'] = df_temp['Variação_%'].fillna(0)
-                                
-                                # Definir tipo de gap
-                                df_temp['Tipo_Gap'] = df_temp['Variação_%'].apply(
-                                    lambda x: 'Alta' if x > 1 else 'Baixa' if x < -1 else 'Sem Gap'
-                                )
-                                
-                                # Adicionar dia da semana se Date existe
-                                if 'Date' in df_temp.columns:
-                                    df_temp['Date'] = pd.to_datetime(df_temp['Date'])
-                                    df_temp['Dia_Semana'] = df_temp['Date'].dt.day_name().map({
-                                        'Monday': 'Segunda', 'Tuesday': 'Terça', 'Wednesday': 'Quarta',
-                                        'Thursday': 'Quinta', 'Friday': 'Sexta'
-                                    }).fillna('Segunda')
-                                    
-                                dfs.append(df_temp)
-                    except Exception as e:
-                        continue
-                
-                if dfs:
-                    df_all = pd.concat(dfs, ignore_index=True)
-                else:
+                import carregador_csv  # pylint: disable=import-outside-toplevel  # só no fallback de CSVs soltos
+                # Arquivos individuais lidos em paralelo; falhas são reportadas
+                df_all, falhas = carregador_csv.carregar_diarios(csv_files)
+                if df_all.empty:
                     df_all = pd.DataFrame({
                         "Ticker": ["POMO4", "BRFS3", "WEGE3", "MGLU3"] * 100,
                         "Date": pd.date_range("2020-01-01", periods=400),
@@ -94,13 +78,61 @@ def carregar_dados():
                     "Tipo_Gap": ["Alta", "Baixa", "Sem Gap", "Alta"] * 100,
                     "Dia_Semana": ["Segunda", "Terça", "Quarta", "Quinta"] * 100
                 })
-            
-        return df_stats, df_quartis, df_all
+
+        # Layout compacto indexado por ticker (categorias, float32, fatias contíguas)
+        dados = DatasetPainel(df_all)
+        instrumentacao.logger.info("Memória do dataset: %s", dados.relatorio_memoria())
+
+        if agregados is None:
+            agregados = agregados_gaps.construir_agregados(dados.df)
+        if versao_dados:
+            # Próximas partidas leem o instantâneo em vez de reconstruir o dataset
+            try:
+                instantaneo_painel.salvar(dados, agregados, versao_dados)
+            except Exception as e:  # sem instantâneo a próxima partida só fica mais lenta
+                instrumentacao.logger.warning("Instantâneo não gravado: %s", e)
+        return agregados_gaps.indexar_por_ticker(agregados), dados, falhas
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        vazio = agregados_gaps.construir_agregados(
+            pd.DataFrame(columns=["Ticker", "Dia_Semana", "Tipo_Gap", "Variação_%"]))
+        return agregados_gaps.indexar_por_ticker(vazio), DatasetPainel(pd.DataFrame(columns=["Ticker"])), falhas
 
-df_stats, df_quartis, df_all = carregar_dados()
+instrumentacao.contar_chamada("carregar_dados")
+with medidor.span("carregar_dados") as registro:
+    agregados, dados, falhas_carga = carregar_dados(agregados_gaps.versao_dados())
+    registro["linhas"] = len(dados)
+
+@st.cache_data(max_entries=1)
+def carregar_estatisticas(versao_dados, versao_estado):
+    instrumentacao.contar_miss("carregar_estatisticas")
+    # versao_dados muda com a base (downloader, validação, carga manual); versao_estado
+    # (mtime do arquivo) quando outro processo regrava o estado
+    if versao_estado:
+        estado = estatisticas_incrementais.EstatisticasIncrementais.carregar()
+        if estado.versao_dados == versao_dados:
+            return estado
+    # Estado ausente ou atrás da base: incorpora só as barras novas e grava para os próximos
+    # processos. Só as colunas usadas: com o instantâneo mapeado o restante não vira pandas
+    colunas = dados.colunas(estatisticas_incrementais.COLUNAS)
+    try:
+        return estatisticas_incrementais.atualizar_estado(colunas, versao=versao_dados)
+    except OSError as e:
+        instrumentacao.logger.warning("Estado das estatísticas não gravado: %s", e)
+        estado = estatisticas_incrementais.EstatisticasIncrementais()
+        estado.atualizar(colunas)
+        return estado
+
+caminho_estado = estatisticas_incrementais.ARQUIVO_ESTADO
+instrumentacao.contar_chamada("carregar_estatisticas")
+with medidor.span("carregar_estatisticas"):
+    estatisticas = carregar_estatisticas(
+        agregados_gaps.versao_dados(),
+        os.path.getmtime(caminho_estado) if os.path.exists(caminho_estado) else 0)
+if falhas_carga:
+    st.warning("Arquivos ignorados por erro de leitura:\n" +
+               "\n".join(f"- `{f}`: {erro}" for f, erro in sorted(falhas_carga.items())))
+df_stats = agregados["estatisticas"].reset_index()
 
 # Filtros
 ativos = sorted(df_stats["Ativo"].unique())
@@ -115,31 +147,151 @@ with col2:
 with col3:
     gap_sel = st.selectbox("⛳ Tipo de Gap", gaps)
 
+JANELAS = {"Histórico completo": None, "Últimos 20 pregões": 20,
+           "Últimos 60 pregões": 60, "Últimos 250 pregões": 250}
+col4, col5 = st.columns(2)
+with col4:
+    janela_sel = JANELAS[st.selectbox("🪟 Janela", list(JANELAS))]
+with col5:
+    regime_sel = st.selectbox("🌡️ Regime de volatilidade", ["Todos"] + estatisticas_incrementais.REGIMES,
+                              disabled=janela_sel is not None,
+                              help="Disponível para o histórico completo")
+usar_incremental = janela_sel is not None or regime_sel != "Todos"
+with medidor.span("stats_janela") as registro:
+    stats_janela = estatisticas.resumo(ativo_sel, janela=janela_sel,
+                                       regime=None if regime_sel == "Todos" else regime_sel)
+    registro["linhas"] = len(stats_janela)
+
+st.caption("Tipo de gap: abertura contra o fechamento do pregão anterior (limiar de ±1%).")
 st.markdown("---")
 
+with st.sidebar.expander("🧠 Memória do dataset"):
+    st.json(dados.relatorio_memoria())
+
 # Tabela principal
 st.subheader("📋 Tabela Estatística do Ativo Selecionado")
-tabela_filtrada = df_stats[(df_stats["Ativo"] == ativo_sel) & (df_stats["Dia_Semana"] == dia_sel)]
+with medidor.span("filtro_tabela") as registro:
+    tabela_ativo = agregados_gaps.consultar(agregados["estatisticas"], ativo_sel)
+    tabela_filtrada = tabela_ativo[tabela_ativo["Dia_Semana"] == dia_sel]
+    registro["linhas"] = len(tabela_filtrada)
 st.dataframe(tabela_filtrada)
 
+# Adiado: tabela e filtros já foram enviados ao navegador antes do import do plotly
+import plotly.express as px  # pylint: disable=wrong-import-position,wrong-import-order
+
 # Rentabilidade por tipo de gap
 st.subheader("💰 Rentabilidade Média por Tipo de Gap")
-rent_df = df_all[df_all["Ticker"] == ativo_sel].groupby("Tipo_Gap")["Variação_%"].mean().reset_index()
-fig_rent = px.bar(rent_df, x="Tipo_Gap", y="Variação_%", color="Tipo_Gap", title="Rentabilidade Média (%)")
-st.plotly_chart(fig_rent, use_container_width=True)
+with medidor.span("dados_rentabilidade") as registro:
+    if usar_incremental:
+        rent_df = stats_janela.rename(columns={"Media": "Variação_%"})
+    else:
+        rent_df = agregados_gaps.consultar(agregados["resumo_gap"], ativo_sel).rename(columns={"Media": "Variação_%"})
+    registro["linhas"] = len(rent_df)
+with medidor.span("figura_rentabilidade"):
+    fig_rent = px.bar(rent_df, x="Tipo_Gap", y="Variação_%", color="Tipo_Gap", title="Rentabilidade Média (%)")
+mostrar_grafico(fig_rent, "render_rentabilidade")
 
 # Quartis do ativo selecionado por gap
 st.subheader("📦 Quartis de Variação % por Tipo de Gap")
-qdf = df_all[df_all["Ticker"] == ativo_sel]
-fig_box = px.box(qdf, x="Tipo_Gap", y="Variação_%", color="Tipo_Gap", title="Distribuição de Variação (%) por Tipo de Gap")
-st.plotly_chart(fig_box, use_container_width=True)
+with medidor.span("figura_quartis") as registro:
+    # Caixas pré-calculadas: o payload não depende do tamanho do histórico
+    if usar_incremental:
+        # Quantis do estado incremental (bigodes em P05/P95)
+        fig_box = dados_graficos.figura_box(
+            stats_janela, bigodes=("P05", "P95"),
+            titulo="Distribuição de Variação (%) por Tipo de Gap (bigodes: P05-P95)")
+        registro["linhas"] = len(stats_janela)
+    else:
+        box_df = agregados_gaps.consultar(agregados["resumo_gap"], ativo_sel)
+        fig_box = dados_graficos.figura_box(
+            box_df, outliers=agregados_gaps.consultar(agregados["outliers"], ativo_sel),
+            titulo="Distribuição de Variação (%) por Tipo de Gap")
+        registro["linhas"] = len(box_df)
+mostrar_grafico(fig_box, "render_quartis")
 
 # Frequência de gaps por dia
 st.subheader("📈 Frequência de Gaps por Dia da Semana")
-freq = df_all[df_all["Ticker"] == ativo_sel].groupby(["Dia_Semana", "Tipo_Gap"]).size().reset_index(name="Frequência")
-fig_freq = px.bar(freq, x="Dia_Semana", y="Frequência", color="Tipo_Gap", barmode="group", title="Frequência de Gaps")
-st.plotly_chart(fig_freq, use_container_width=True)
+with medidor.span("dados_frequencia") as registro:
+    freq = agregados_gaps.consultar(agregados["frequencia"], ativo_sel)
+    registro["linhas"] = len(freq)
+with medidor.span("figura_frequencia"):
+    fig_freq = px.bar(freq, x="Dia_Semana", y="Frequência", color="Tipo_Gap", barmode="group", title="Frequência de Gaps")
+mostrar_grafico(fig_freq, "render_frequencia")
+instrumentacao.registrar_primeira_renderizacao(medidor)
+
+# Histórico de fechamento, subamostrado por LTTB (o payload não cresce com o histórico)
+with medidor.span("dados_fechamento") as registro:
+    serie_ativo = dados.fatia(ativo_sel)
+    if {"Date", "Close"} <= set(serie_ativo.columns):
+        serie_ativo = dados_graficos.reduzir_serie(serie_ativo[["Date", "Close"]], "Date", "Close")
+    registro["linhas"] = len(serie_ativo)
+if "Close" in serie_ativo.columns and not serie_ativo.empty:
+    st.subheader("📉 Histórico de Fechamento")
+    with medidor.span("figura_fechamento"):
+        fig_fech = px.line(serie_ativo, x="Date", y="Close", title=f"{ativo_sel}: Fechamento")
+    mostrar_grafico(fig_fech, "render_fechamento")
+
+# Backtest da estratégia de gap
+@st.cache_data
+def rodar_backtest(ativo, limiares, dias, stops, alvos, direcoes, custo):
+    instrumentacao.contar_miss("rodar_backtest")
+    import backtest_gaps  # pylint: disable=import-outside-toplevel  # só quando o backtest roda
+    df_ativo = armazem_precos.ler_ticker(ativo, colunas=["Date", "Open", "High", "Low", "Close"])
+    return backtest_gaps.backtest_ticker(df_ativo, limiares, dias=dias, stops=stops, alvos=alvos,
+                                         direcoes=direcoes, custo_pct=custo, top_curvas=5)
+
+with st.expander("🧪 Backtest de Gaps do Ativo Selecionado"):
+    import backtest_gaps  # pylint: disable=import-outside-toplevel  # só quando o expander é montado
+    if ativo_sel not in armazem_precos.listar_tickers():
+        st.info("O backtest usa as barras OHLC do armazém `dados_precos/`; ativo não encontrado.")
+    else:
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            faixa = st.slider("Limiar do gap (%)", 0.25, 5.0, (0.5, 3.0), step=0.25)
+            custo = st.number_input("Custo por operação (%)", 0.0, 1.0, 0.05, step=0.01)
+        with b2:
+            stops = st.multiselect("Stop (%)", [0.5, 1.0, 2.0, 3.0, 5.0], default=[1.0, 2.0])
+            alvos = st.multiselect("Alvo (%)", [0.5, 1.0, 2.0, 3.0, 5.0], default=[1.0, 2.0])
+        with b3:
+            direcoes = st.multiselect("Direção", ["venda", "compra"], default=["venda", "compra"])
+            minimo = st.number_input("Mínimo de trades", 1, 500, 20)
+        limiares = tuple(np.arange(faixa[0], faixa[1] + 1e-9, 0.25).round(2))
+        instrumentacao.contar_chamada("rodar_backtest")
+        with medidor.span("backtest") as registro:
+            resumo_bt, curvas_bt = rodar_backtest(
+                ativo_sel, limiares, (None, 0, 1, 2, 3, 4), (None,) + tuple(stops),
+                (None,) + tuple(alvos), tuple(direcoes) or ("venda",), custo)
+            registro["linhas"] = len(resumo_bt)
+        st.dataframe(backtest_gaps.ranking(resumo_bt, minimo_trades=minimo))
+        if not curvas_bt.empty:
+            # Min-max por bucket: no máximo ~PONTOS_SERIE datas no gráfico
+            fig_bt = px.line(dados_graficos.reduzir_curvas(curvas_bt),
+                             labels={"value": "Retorno acumulado (%)", "variable": "Combo"},
+                             title="Curvas de Capital (5 melhores por Sharpe)")
+            mostrar_grafico(fig_bt, "render_backtest")
 
 # Exportação
 st.markdown("📤 Baixe os dados filtrados para Excel:")
 st.download_button("⬇️ Exportar CSV", tabela_filtrada.to_csv(index=False), file_name=f"{ativo_sel}_{dia_sel}_estatisticas.csv")
+
+# Relatório de performance do rerun (log estruturado + painel opcional)
+relatorio_perf = medidor.finalizar()
+if painel_perf:
+    with area_perf:
+        total = relatorio_perf["total_ms"]
+        if relatorio_perf["acima_orcamento"]:
+            st.error(f"Rerun: {total:.0f} ms (orçamento {instrumentacao.ORCAMENTO_MS:.0f} ms)")
+        else:
+            st.success(f"Rerun: {total:.0f} ms (orçamento {instrumentacao.ORCAMENTO_MS:.0f} ms)")
+        st.dataframe(pd.DataFrame(relatorio_perf["spans"]), hide_index=True)
+        st.caption("Cache (@st.cache_data) no processo")
+        st.dataframe(pd.DataFrame(relatorio_perf["cache"]).T)
+        st.caption("Cache de dados derivados em disco")
+        import cache_derivados  # pylint: disable=import-outside-toplevel  # só com o painel de performance
+        st.json(cache_derivados.resumo())
+        primeira = instrumentacao.primeira_renderizacao()
+        if primeira:
+            st.caption(f"Primeira renderização do processo: {primeira['ms']:.0f} ms")
+        st.download_button("⬇️ Exportar métricas (JSON)",
+                           json.dumps(relatorio_perf, ensure_ascii=False, default=str),
+                           file_name="performance_painel.json")
@@ -0,0 +1,168 @@
+"""Armazém colunar de preços (Parquet) particionado por ticker.
+
+Substitui os arquivos ``*_diario_5anos.csv``: cada ticker fica em
+``dados_precos/Ticker=<TICKER>/dados.parquet`` com tipos fixos, de modo que
+a leitura não precisa reinterpretar datas e pode trazer só as colunas usadas.
+"""
+import glob
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DIRETORIO_PADRAO = "dados_precos"
+NOME_ARQUIVO = "dados.parquet"
+
+# Esquema fixo das barras diárias (mesmas colunas do yfinance)
+ESQUEMA = pa.schema([
+    ("Date", pa.timestamp("ns")),
+    ("Open", pa.float64()),
+    ("High", pa.float64()),
+    ("Low", pa.float64()),
+    ("Close", pa.float64()),
+    ("Adj Close", pa.float64()),
+    ("Volume", pa.int64()),
+])
+COLUNAS = ESQUEMA.names
+
+
+def _caminho_particao(ticker, diretorio):
+    return os.path.join(diretorio, f"Ticker={ticker}")
+
+
+def caminho_ticker(ticker, diretorio=DIRETORIO_PADRAO):
+    """Arquivo Parquet da partição do ticker."""
+    return os.path.join(_caminho_particao(ticker, diretorio), NOME_ARQUIVO)
+
+
+def normalizar_colunas(df):
+    """Deixa o DataFrame no layout do armazém (Date como coluna, tipos fixos)."""
+    df = df.copy()
+    # yf.download pode devolver colunas MultiIndex (Preço, Ticker)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    if "Date" not in df.columns:
+        df = df.reset_index()
+        if "Date" not in df.columns:
+            df = df.rename(columns={df.columns[0]: "Date"})
+    if "Adj Close" not in df.columns and "Close" in df.columns:
+        df["Adj Close"] = df["Close"]
+    faltando = [c for c in COLUNAS if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes: {faltando}")
+
+    df = df[COLUNAS]
+    datas = pd.to_datetime(df["Date"])
+    if getattr(datas.dt, "tz", None) is not None:
+        datas = datas.dt.tz_localize(None)
+    df["Date"] = datas.astype("datetime64[ns]")
+    for col in ("Open", "High", "Low", "Close", "Adj Close"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0).astype("int64")
+    return df.sort_values("Date").reset_index(drop=True)
+
+
+def salvar_ticker(df, ticker, diretorio=DIRETORIO_PADRAO):
+    """Grava (substitui) a partição de um ticker de forma atômica."""
+    df = normalizar_colunas(df)
+    pasta = _caminho_particao(ticker, diretorio)
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, NOME_ARQUIVO)
+    # Prefixo "." faz o pyarrow.dataset ignorar o temporário
+    temporario = os.path.join(pasta, "." + NOME_ARQUIVO + ".tmp")
+    tabela = pa.Table.from_pandas(df, schema=ESQUEMA, preserve_index=False)
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, destino)
+    return destino
+
+
+def anexar_ticker(df, ticker, diretorio=DIRETORIO_PADRAO):
+    """Acrescenta barras novas à partição do ticker.
+
+    Datas já existentes são substituídas pelas novas, então repetir um
+    download interrompido não duplica linhas.
+    """
+    novos = normalizar_colunas(df)
+    try:
+        atuais = ler_ticker(ticker, diretorio=diretorio)
+    except FileNotFoundError:
+        return salvar_ticker(novos, ticker, diretorio)
+    combinado = pd.concat([atuais, novos], ignore_index=True)
+    combinado = combinado.drop_duplicates("Date", keep="last")
+    return salvar_ticker(combinado, ticker, diretorio)
+
+
+def ultima_data(ticker, diretorio=DIRETORIO_PADRAO):
+    """Última ``Date`` gravada do ticker, ou ``None`` se ele não existe."""
+    caminho = caminho_ticker(ticker, diretorio)
+    if not os.path.exists(caminho):
+        return None
+    datas = pq.read_table(caminho, columns=["Date"]).column("Date")
+    if len(datas) == 0:
+        return None
+    return pd.Timestamp(pc.max(datas).as_py())
+
+
+def listar_tickers(diretorio=DIRETORIO_PADRAO):
+    """Tickers presentes no armazém, em ordem alfabética."""
+    padrao = os.path.join(diretorio, "Ticker=*", NOME_ARQUIVO)
+    return sorted(os.path.basename(os.path.dirname(p)).split("=", 1)[1]
+                  for p in glob.glob(padrao))
+
+
+def existe_armazem(diretorio=DIRETORIO_PADRAO):
+    """Há ao menos um ticker gravado? Sem armazém os leitores caem no CSV combinado."""
+    return bool(listar_tickers(diretorio))
+
+
+def ler_ticker(ticker, colunas=None, diretorio=DIRETORIO_PADRAO):
+    """Lê um ticker; ``colunas`` limita a leitura às colunas pedidas."""
+    caminho = caminho_ticker(ticker, diretorio)
+    return pq.read_table(caminho, columns=colunas).to_pandas()
+
+
+def ler_todos(colunas=None, tickers=None, diretorio=DIRETORIO_PADRAO):
+    """Lê vários tickers num só DataFrame com a coluna ``Ticker``.
+
+    A coluna ``Ticker`` vem da partição (não é gravada no arquivo) e é
+    devolvida como categórica.
+    """
+    if not existe_armazem(diretorio):
+        return pd.DataFrame(columns=["Ticker"] + list(colunas or COLUNAS))
+    particao = ds.partitioning(pa.schema([("Ticker", pa.string())]), flavor="hive")
+    dataset = ds.dataset(diretorio, format="parquet", partitioning=particao)
+    filtro = ds.field("Ticker").isin(list(tickers)) if tickers else None
+    projecao = ["Ticker"] + [c for c in (colunas or COLUNAS) if c != "Ticker"]
+    tabela = dataset.to_table(columns=projecao, filter=filtro)
+    df = tabela.to_pandas()
+    df["Ticker"] = df["Ticker"].astype("category")
+    ordem = ["Ticker", "Date"] if "Date" in df.columns else ["Ticker"]
+    return df.sort_values(ordem, kind="stable").reset_index(drop=True)
+
+
+def importar_csv(caminho, ticker=None, diretorio=DIRETORIO_PADRAO):
+    """Importa um ``<TICKER>_diario_5anos.csv`` existente para o armazém."""
+    if ticker is None:
+        ticker = os.path.basename(caminho).split("_")[0]
+    df = pd.read_csv(caminho)
+    salvar_ticker(df, ticker, diretorio)
+    return ticker
+
+
+def importar_csvs(padrao="*_diario_5anos.csv", diretorio=DIRETORIO_PADRAO):
+    """Importa todos os CSVs diários que casam com ``padrao``."""
+    importados = []
+    for caminho in sorted(glob.glob(padrao)):
+        try:
+            importados.append(importar_csv(caminho, diretorio=diretorio))
+        except (ValueError, KeyError, pd.errors.ParserError) as e:
+            print(f"⚠️ Ignorado {caminho}: {e}")
+    return importados
+
+
+if __name__ == "__main__":
+    for t in importar_csvs():
+        print(f"✅ Importado para {DIRETORIO_PADRAO}: {t}")
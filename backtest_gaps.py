@@ -0,0 +1,186 @@
+"""Backtest vetorizado de estratégias de gap com varredura de parâmetros.
+
+Estratégia: no dia em que o gap de abertura passa do limiar (``Alta``: gap >
+limiar, ``Baixa``: gap < -limiar), e opcionalmente só num dia da semana,
+entra na abertura comprando ou vendendo, sai no fechamento ou antes pelo
+stop/alvo (em % do preço de entrada), pagando ``custo_pct`` por operação.
+Com barras diárias não se sabe a ordem intradiária; se stop e alvo são
+tocados no mesmo dia assume-se o stop (hipótese conservadora).
+
+Para cada ticker a grade inteira (tipo x limiar x dia x direção x stop x alvo)
+é avaliada com broadcasting NumPy, em blocos de tamanho limitado; os tickers
+rodam em processos paralelos.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import armazem_precos
+
+NOMES_DIAS = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+DIRECOES = {"compra": 1.0, "venda": -1.0}
+DIAS_ANO = 252
+# Células (dias com entrada x combinações) avaliadas por bloco da grade (~80 MB em float32)
+CELULAS_POR_BLOCO = 20_000_000
+
+
+def _retornos_operacao(abertura, maxima, minima, fech, sinais, stops, alvos, custo_pct):
+    """Retorno % por barra para cada (direção, stop, alvo): shape (n, D, S, A)."""
+    ab = abertura[:, None, None, None]
+    sinal = sinais[None, :, None, None]
+    stop = stops[None, None, :, None] / 100
+    alvo = alvos[None, None, None, :] / 100
+
+    # Excursões a favor e contra a posição, relativas à entrada
+    favor = np.where(sinal > 0, maxima[:, None, None, None] / ab - 1, 1 - minima[:, None, None, None] / ab)
+    contra = np.where(sinal > 0, 1 - minima[:, None, None, None] / ab, maxima[:, None, None, None] / ab - 1)
+    final = sinal * (fech[:, None, None, None] / ab - 1)
+
+    retorno = np.where(contra >= stop, -stop, np.where(favor >= alvo, alvo, final))
+    return retorno * 100 - custo_pct
+
+
+def _metricas_vazias(n_combos):
+    """Métricas de combinações sem nenhuma operação."""
+    zeros = np.zeros(n_combos)
+    nulos = np.full(n_combos, np.nan)
+    return {"Trades": zeros.astype(np.int64), "Acerto_%": nulos, "Expectativa_%": nulos,
+            "Retorno_Total_%": zeros, "Max_DD_%": zeros, "Sharpe": nulos}
+
+
+def _metricas(pnl, entradas, n_total):
+    """Métricas por combinação; ``pnl``/``entradas`` têm shape (linhas, combos).
+
+    Só as linhas com alguma entrada são passadas; os demais dias têm P&L
+    zero, o que é levado em conta no Sharpe via ``n_total``.
+    """
+    trades = entradas.sum(axis=0)
+    ganhos = ((pnl > 0) & entradas).sum(axis=0)
+    total = pnl.sum(axis=0, dtype=np.float64)
+    curva = np.cumsum(pnl, axis=0)
+    drawdown = (np.maximum.accumulate(np.maximum(curva, 0), axis=0) - curva).max(axis=0)
+    media = total / n_total
+    desvio = np.sqrt(np.maximum(np.square(pnl, dtype=np.float64).sum(axis=0) / n_total - media ** 2, 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "Trades": trades,
+            "Acerto_%": ganhos / trades * 100,
+            "Expectativa_%": total / trades,
+            "Retorno_Total_%": total,
+            "Max_DD_%": drawdown,
+            "Sharpe": np.where(desvio > 0, media / desvio * np.sqrt(DIAS_ANO), np.nan),
+        }
+
+
+def backtest_ticker(df, limiares, dias=(None,), stops=(None,), alvos=(None,),
+                    direcoes=("venda", "compra"), tipos=("Alta", "Baixa"), custo_pct=0.0,
+                    top_curvas=0):
+    """Avalia a grade para um ticker (``df`` com Date/Open/High/Low/Close ordenado).
+
+    ``None`` em ``dias`` significa "todos os dias"; em ``stops``/``alvos``
+    significa sem stop/alvo. Devolve ``(resumo, curvas)``; ``curvas`` traz as
+    curvas de capital (retorno % acumulado) das ``top_curvas`` melhores
+    combinações por Sharpe, com colunas = ``Combo`` do resumo.
+    """
+    df = df.sort_values("Date")
+    abertura = df["Open"].to_numpy(np.float64)
+    maxima = df["High"].to_numpy(np.float64)
+    minima = df["Low"].to_numpy(np.float64)
+    fech = df["Close"].to_numpy(np.float64)
+    anterior = np.concatenate(([np.nan], fech[:-1]))
+    with np.errstate(invalid="ignore"):
+        gap = np.nan_to_num((abertura / anterior - 1) * 100)
+    dia = pd.DatetimeIndex(df["Date"]).dayofweek.to_numpy()
+
+    limiares = np.asarray(limiares, dtype=np.float64)
+    sinais = np.array([DIRECOES[d] for d in direcoes])
+    stops_arr = np.array([np.inf if s is None else s for s in stops], dtype=np.float64)
+    alvos_arr = np.array([np.inf if a is None else a for a in alvos], dtype=np.float64)
+
+    # Entradas: (n, T, L, W)
+    sentido = np.array([1.0 if t == "Alta" else -1.0 for t in tipos])
+    passou = gap[:, None, None] * sentido[None, :, None] > limiares[None, None, :]
+    no_dia = np.stack([np.ones_like(dia, dtype=bool) if d is None else dia == d for d in dias], axis=1)
+    entradas = passou[:, :, :, None] & no_dia[:, None, None, :]
+
+    # Só os dias com alguma entrada entram na grade (os demais têm P&L zero)
+    entradas = entradas.reshape(len(df), -1)  # (n, T*L*W)
+    linhas = np.flatnonzero(entradas.any(axis=1))
+    entradas = entradas[linhas]
+    m = len(linhas)
+    n_saidas = len(sinais) * len(stops_arr) * len(alvos_arr)
+    n_combos = entradas.shape[1] * n_saidas
+    if m == 0:
+        metricas = _metricas_vazias(n_combos)
+        retornos = np.zeros((0, n_saidas), dtype=np.float32)
+    else:
+        retornos = _retornos_operacao(abertura[linhas], maxima[linhas], minima[linhas], fech[linhas],
+                                      sinais, stops_arr, alvos_arr, custo_pct).astype(np.float32).reshape(m, -1)
+        # P&L (m, grupos de entrada x saídas) em blocos de grupos para limitar a memória;
+        # a ordem das colunas segue (T, L, W) por fora e (D, S, A) por dentro
+        por_bloco = max(1, CELULAS_POR_BLOCO // (m * n_saidas))
+        partes = []
+        for g in range(0, entradas.shape[1], por_bloco):
+            bloco = entradas[:, g:g + por_bloco]
+            pnl = np.where(bloco[:, :, None], retornos[:, None, :], np.float32(0)).reshape(m, -1)
+            entradas_bloco = np.repeat(bloco, n_saidas, axis=1)
+            partes.append(_metricas(pnl, entradas_bloco, len(df)))
+        metricas = {nome: np.concatenate([p[nome] for p in partes]) for nome in partes[0]}
+
+    rotulos_dias = ["Todos" if d is None else NOMES_DIAS[d] for d in dias]
+    grade = list(itertools.product(tipos, limiares, rotulos_dias, direcoes, stops, alvos))
+    resumo = pd.DataFrame(grade, columns=["Tipo_Gap", "Limiar", "Dia_Semana", "Direcao", "Stop_%", "Alvo_%"])
+    resumo.insert(0, "Combo", np.arange(len(resumo)))
+    for nome, valores in metricas.items():
+        resumo[nome] = valores
+
+    curvas = pd.DataFrame(index=pd.DatetimeIndex(df["Date"]))
+    if top_curvas:
+        melhores = resumo["Sharpe"].fillna(-np.inf).nlargest(top_curvas).index
+        for i in melhores:
+            grupo, saida = divmod(i, n_saidas)
+            diario = np.zeros(len(df))
+            diario[linhas] = np.where(entradas[:, grupo], retornos[:, saida], 0)
+            curvas[i] = np.cumsum(diario)
+    return resumo, curvas
+
+
+def _executar(args):
+    ticker, df, kwargs = args
+    resumo, curvas = backtest_ticker(df, **kwargs)
+    resumo.insert(0, "Ticker", ticker)
+    return ticker, resumo, curvas
+
+
+def executar_grade(df_todos=None, tickers=None, max_workers=None, **kwargs):
+    """Roda a grade para todos os tickers em processos paralelos.
+
+    ``df_todos`` é o quadro longo de barras (padrão: armazém de preços).
+    Aceita os mesmos parâmetros de ``backtest_ticker``. Devolve
+    ``(resumo, curvas)``, com ``curvas`` = ``{ticker: DataFrame}``.
+    """
+    if df_todos is None:
+        df_todos = armazem_precos.ler_todos(colunas=["Date", "Open", "High", "Low", "Close"],
+                                            tickers=tickers)
+    tarefas = [(str(t), g[["Date", "Open", "High", "Low", "Close"]], kwargs)
+               for t, g in df_todos.groupby("Ticker", observed=True)
+               if tickers is None or t in tickers]
+    if max_workers == 1 or len(tarefas) <= 1:
+        resultados = [_executar(t) for t in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            resultados = list(executor.map(_executar, tarefas))
+
+    if not resultados:
+        return pd.DataFrame(), {}
+    resumo = pd.concat([r for _, r, _ in resultados], ignore_index=True)
+    return resumo, {t: c for t, _, c in resultados}
+
+
+def ranking(resumo, minimo_trades=20, por="Sharpe", n=20):
+    """Melhores combinações com amostra mínima de operações."""
+    return (resumo[resumo["Trades"] >= minimo_trades]
+            .sort_values(por, ascending=False).head(n).reset_index(drop=True))
@@ -1,13 +1,109 @@
-import yfinance as yf
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 
-# Lista de ativos com sufixo .SA para B3 no Yahoo Finance
-ativos = ["POMO4.SA", "BRFS3.SA", "WEGE3.SA", "MGLU3.SA"]
+import agregados_gaps
+import armazem_precos
+import estatisticas_incrementais
+import validacao_dados
+from provedores_dados import PROVEDORES
+
+# Ativos usados quando a lista completa não está disponível
+ativos = ["POMO4", "BRFS3", "WEGE3", "MGLU3"]
+
+ARQUIVO_ATIVOS = "Ativos historicos de preços.txt"
+
+
+def ler_lista_ativos(caminho=ARQUIVO_ATIVOS):
+    """Lê os tickers de ``Ativos historicos de preços.txt`` (linhas "1.  ABEV3 (...)")."""
+    if not os.path.exists(caminho):
+        return list(ativos)
+    with open(caminho, encoding="utf-8") as f:
+        encontrados = re.findall(r"^\s*\d+\.\s+([A-Z0-9]+)\s", f.read(), flags=re.MULTILINE)
+    return encontrados or list(ativos)
+
+
+def atualizar_ticker(provedor, ticker, completo=False, tentativas=3, espera=1.0, hoje=None):
+    """Baixa só o intervalo que falta do ticker e anexa ao armazém.
+
+    Retorna a quantidade de barras novas. Cada gravação é atômica, então uma
+    execução interrompida pode ser repetida e continua de onde parou. Erros de
+    rede são repetidos até ``tentativas`` vezes (no mínimo uma); os demais
+    sobem na hora.
+    """
+    ultima = None if completo else armazem_precos.ultima_data(ticker)
+    inicio = None if ultima is None else ultima + pd.Timedelta(days=1)
+    if inicio is not None and hoje is not None and inicio > pd.Timestamp(hoje):
+        return 0
+
+    # Só falhas transitórias (rede, limite de requisições) são repetidas
+    transitorios = provedor.erros_transitorios()
+    tentativas = max(1, tentativas)
+    for tentativa in range(tentativas):
+        try:
+            df = provedor.baixar(ticker, inicio=inicio, fim=hoje)
+            break
+        except transitorios:
+            if tentativa == tentativas - 1:
+                raise
+            time.sleep(espera * 2 ** tentativa)
+
+    if df.empty:
+        return 0
+    if completo:
+        armazem_precos.salvar_ticker(df, ticker)
+    else:
+        armazem_precos.anexar_ticker(df, ticker)
+    return len(df)
+
+
+def atualizar_todos(provedor, tickers, max_workers=4, **kwargs):
+    """Atualiza vários tickers em paralelo; devolve ``(novas_barras, falhas)``."""
+    novas, falhas = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(atualizar_ticker, provedor, t, **kwargs): t for t in tickers}
+        for futuro in as_completed(futuros):
+            ticker = futuros[futuro]
+            try:
+                novas[ticker] = futuro.result()
+                print(f"✅ {ticker}: {novas[ticker]} barras novas")
+            except Exception as e:  # falha de um ticker não interrompe os demais
+                falhas[ticker] = str(e)
+                print(f"❌ {ticker}: {e}")
+    return novas, falhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza o histórico diário dos ativos da B3")
+    parser.add_argument("tickers", nargs="*", help="tickers (padrão: lista do arquivo de ativos)")
+    parser.add_argument("--provedor", choices=sorted(PROVEDORES), default="yahoo")
+    parser.add_argument("--origem", default=".", help="pasta dos CSVs para o provedor 'arquivo'")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tentativas", type=int, default=3)
+    parser.add_argument("--completo", action="store_true",
+                        help="baixa o histórico inteiro e sobrescreve o armazém")
+    args = parser.parse_args()
+    if args.tentativas < 1:
+        parser.error("--tentativas precisa ser pelo menos 1")
 
-for ativo in ativos:
-    print(f"🔄 Baixando dados para {ativo}")
-    df = yf.download(ativo, period="5y", interval="1d")
-    df.reset_index(inplace=True)
-    nome_arquivo = f"{ativo.replace('.SA','')}_diario_5anos.csv"
-    df.to_csv(nome_arquivo, index=False)
-    print(f"✅ Salvo: {nome_arquivo}")
+    if args.provedor == "arquivo":
+        provedor = PROVEDORES["arquivo"](args.origem)
+    else:
+        provedor = PROVEDORES[args.provedor]()
+    lista = args.tickers or ler_lista_ativos()
+    print(f"🔄 Atualizando {len(lista)} ativos via {provedor.nome}")
+    novas, erros = atualizar_todos(provedor, lista, max_workers=args.workers,
+                                   completo=args.completo, tentativas=args.tentativas)
+    if any(novas.values()):
+        # Limpeza em lote antes das análises (regrava só os tickers reparados)
+        qualidade = validacao_dados.validar_armazem()
+        print(f"🧹 {int((qualidade['Alteradas'] > 0).sum())} ativo(s) reparado(s); "
+              f"relatório em {validacao_dados.ARQUIVO_RELATORIO}")
+        agregados_gaps.aquecer_cache()
+        estatisticas_incrementais.atualizar_estado(reconstruir=args.completo)
+    sys.exit(1 if erros else 0)
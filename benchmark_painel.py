@@ -0,0 +1,256 @@
+"""Benchmark do pipeline carregar -> agregar -> renderizar do dashboard.
+
+Gera um conjunto sintético do tamanho pedido numa pasta temporária e mede,
+sem subir o Streamlit:
+
+- ``gerar``: barras sintéticas + gravação no armazém Parquet. Com
+  ``--barras-por-dia`` > 1 cada pregão tem esse número de barras intradiárias
+  (``gerar_sessoes_intradiarias``), no mesmo intervalo de datas;
+- ``carga_fria``: ``carregar_com_cache`` com o cache em disco vazio (leitura,
+  colunas derivadas, agregados por ticker e gravação do cache) + ``DatasetPainel``;
+- ``carga_cache``: a mesma carga com o cache em disco já preenchido;
+- ``gravar_instantaneo``: ``instantaneo_painel.salvar``;
+- ``carga_instantaneo``: o que a partida do app faz com o instantâneo
+  (mapear os arquivos, indexar os agregados e ler a fatia de um ativo);
+- ``selecao_legado``: máscara por ticker + três groupbys, como o app fazia;
+- ``selecao``: consultas às tabelas agregadas (inclusive estatísticas do box);
+- ``figuras``: ``px.bar``, box pré-calculado e ``px.bar`` + serialização JSON.
+
+Tempos são o mínimo e a mediana de ``--repeticoes`` execuções. A memória de
+cada etapa vem de uma execução separada: ``pico_mb`` é o pico do
+``tracemalloc`` (só alocações do Python e do numpy); ``arrow_pico_mb`` e
+``rss_pico_mb`` são os picos acima do início da etapa de
+``pyarrow.total_allocated_bytes()`` e do RSS do processo, amostrados numa
+thread. Buffers Arrow/Parquet e arquivos mapeados só aparecem nesses dois. O
+RSS vem de ``/proc`` e fica de fora nos sistemas sem ele. O resultado vai para
+um JSON que pode ser comparado entre commits:
+
+    python benchmark_painel.py --ativos 30 --anos 5 --saida bench_atual.json
+    python benchmark_painel.py --ativos 30 --anos 5 --comparar bench_base.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+PREGOES_ANO = 252
+# Medidas de memória por etapa e rótulo na comparação
+MEDIDAS_MEMORIA = {"pico_mb": "py", "arrow_pico_mb": "arrow", "rss_pico_mb": "rss"}
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _rss_bytes():
+    """RSS atual do processo, ou ``None`` sem ``/proc`` (Windows, macOS)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _picos_fora_do_python(funcao, intervalo=0.002):
+    """Roda ``funcao`` amostrando RSS e memória do Arrow; devolve os picos acima do início (MB)."""
+    import pyarrow as pa
+
+    inicio = {"rss": _rss_bytes(), "arrow": pa.total_allocated_bytes()}
+    picos = dict(inicio)
+    parar = threading.Event()
+
+    def amostrar():
+        picos["arrow"] = max(picos["arrow"], pa.total_allocated_bytes())
+        if picos["rss"] is not None:
+            picos["rss"] = max(picos["rss"], _rss_bytes())
+
+    def laco():
+        while not parar.wait(intervalo):
+            amostrar()
+
+    amostrador = threading.Thread(target=laco, daemon=True)
+    amostrador.start()
+    try:
+        funcao()
+        amostrar()
+    finally:
+        parar.set()
+        amostrador.join()
+    medida = {"arrow_pico_mb": round((picos["arrow"] - inicio["arrow"]) / 1e6, 2)}
+    if inicio["rss"] is not None:
+        medida["rss_pico_mb"] = round((picos["rss"] - inicio["rss"]) / 1e6, 2)
+    return medida
+
+
+def _medir(funcao, repeticoes, medir_memoria):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    medida = {"min_s": round(min(tempos), 6), "mediana_s": round(statistics.median(tempos), 6)}
+    if medir_memoria:
+        tracemalloc.start()
+        medida.update(_picos_fora_do_python(funcao))
+        medida["pico_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return medida, resultado
+
+
+def executar(n_ativos, anos, barras_por_dia=1, repeticoes=3, seed=0, medir_memoria=True):
+    """Roda todas as etapas e devolve o dicionário de resultados."""
+    import pandas as pd
+    import plotly.express as px
+
+    import agregados_gaps
+    import armazem_precos
+    import dados_graficos
+    import gerar_dados_simulados
+    import instantaneo_painel
+    from dataset_painel import DatasetPainel
+
+    n_dias = anos * PREGOES_ANO
+    pasta_original = os.getcwd()
+    pasta = tempfile.mkdtemp(prefix="bench_painel_")
+    etapas = {}
+    try:
+        os.chdir(pasta)
+
+        def gerar():
+            rng = np.random.default_rng(seed)
+            inicio = pd.Timestamp.now().normalize() - pd.DateOffset(years=anos)
+            if barras_por_dia == 1:
+                df = gerar_dados_simulados.gerar_barras(rng, n_ativos=n_ativos, n_dias=n_dias, inicio=inicio)
+                for ativo, df_ativo in df.groupby("Ticker", observed=True, sort=False):
+                    armazem_precos.salvar_ticker(df_ativo[armazem_precos.COLUNAS], ativo)
+                return len(df)
+            linhas = 0
+            for ativo in gerar_dados_simulados.nomes_ativos(n_ativos):
+                df = pd.concat(gerar_dados_simulados.gerar_sessoes_intradiarias(
+                    rng, n_dias=n_dias, inicio=inicio, minutos=barras_por_dia), ignore_index=True)
+                armazem_precos.salvar_ticker(df, ativo)
+                linhas += len(df)
+            return linhas
+
+        etapas["gerar"], linhas = _medir(gerar, 1, medir_memoria)
+
+        caches = itertools.count()
+
+        def carga(diretorio_cache):
+            df_all, agregados, _ = agregados_gaps.carregar_com_cache(diretorio_cache)
+            return agregados, DatasetPainel(df_all)
+
+        # Cada repetição fria usa um diretório de cache novo
+        etapas["carga_fria"], (agregados, dados) = _medir(
+            lambda: carga(f"cache_frio_{next(caches)}"), repeticoes, medir_memoria)
+        carga("cache_quente")
+        etapas["carga_cache"], _ = _medir(lambda: carga("cache_quente"), repeticoes, medir_memoria)
+
+        versao = agregados_gaps.versao_dados()
+        etapas["gravar_instantaneo"], _ = _medir(
+            lambda: instantaneo_painel.salvar(dados, agregados, versao), repeticoes, medir_memoria)
+        ativo = dados.tickers[0]
+
+        def carga_instantaneo():
+            dados_mapeados, agregados_lidos = instantaneo_painel.carregar(versao)
+            return agregados_gaps.indexar_por_ticker(agregados_lidos), dados_mapeados.fatia(ativo)
+
+        etapas["carga_instantaneo"], _ = _medir(carga_instantaneo, repeticoes, medir_memoria)
+
+        agregados = agregados_gaps.indexar_por_ticker(agregados)
+        df_plano = dados.df.astype({"Ticker": str, "Tipo_Gap": str, "Dia_Semana": str})
+
+        def selecao_legado():
+            rent = df_plano[df_plano["Ticker"] == ativo].groupby("Tipo_Gap")["Variação_%"].mean().reset_index()
+            qdf = df_plano[df_plano["Ticker"] == ativo]
+            freq = (df_plano[df_plano["Ticker"] == ativo].groupby(["Dia_Semana", "Tipo_Gap"]).size()
+                    .reset_index(name="Frequência"))
+            return rent, qdf, freq
+
+        def selecao():
+            rent = agregados_gaps.consultar(agregados["resumo_gap"], ativo).rename(columns={"Media": "Variação_%"})
+            caixas = (agregados_gaps.consultar(agregados["resumo_gap"], ativo),
+                      agregados_gaps.consultar(agregados["outliers"], ativo))
+            return rent, caixas, agregados_gaps.consultar(agregados["frequencia"], ativo)
+
+        etapas["selecao_legado"], _ = _medir(selecao_legado, repeticoes, medir_memoria)
+        etapas["selecao"], (rent, caixas, freq) = _medir(selecao, repeticoes, medir_memoria)
+
+        def figuras():
+            figs = [
+                px.bar(rent, x="Tipo_Gap", y="Variação_%", color="Tipo_Gap"),
+                dados_graficos.figura_box(caixas[0], outliers=caixas[1]),
+                px.bar(freq, x="Dia_Semana", y="Frequência", color="Tipo_Gap", barmode="group"),
+            ]
+            return sum(len(f.to_json()) for f in figs)
+
+        etapas["figuras"], payload = _medir(figuras, repeticoes, medir_memoria)
+        etapas["figuras"]["payload_kb"] = round(payload / 1e3, 1)
+    finally:
+        os.chdir(pasta_original)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "parametros": {"ativos": n_ativos, "anos": anos, "barras_por_dia": barras_por_dia,
+                       "linhas": int(linhas), "repeticoes": repeticoes, "seed": seed},
+        "etapas": etapas,
+    }
+
+
+def comparar(atual, base):
+    """Tabela de razões atual/base por etapa (mínimo de tempo e picos de memória)."""
+    linhas = []
+    for etapa, medida in atual["etapas"].items():
+        anterior = base.get("etapas", {}).get(etapa)
+        if not anterior:
+            continue
+        razao_t = medida["min_s"] / anterior["min_s"] if anterior["min_s"] else float("nan")
+        linha = f"{etapa:<16} {anterior['min_s']:>10.4f}s -> {medida['min_s']:>10.4f}s  x{razao_t:6.2f}"
+        for chave, rotulo in MEDIDAS_MEMORIA.items():
+            if chave in medida and chave in anterior:
+                linha += f"   {rotulo}: {anterior[chave]:>8.1f}MB -> {medida[chave]:>8.1f}MB"
+        linhas.append(linha)
+    return "\n".join(linhas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline do dashboard")
+    parser.add_argument("--ativos", type=int, default=30)
+    parser.add_argument("--anos", type=int, default=5)
+    parser.add_argument("--barras-por-dia", type=int, default=1,
+                        help="barras intradiárias por pregão (ex.: 84 ~ barras de 5 min)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede pico de memória")
+    parser.add_argument("--saida", default="benchmark_resultado.json")
+    parser.add_argument("--comparar", help="JSON de um benchmark anterior para comparação")
+    args = parser.parse_args()
+
+    resultado = executar(args.ativos, args.anos, args.barras_por_dia, args.repeticoes,
+                         args.seed, medir_memoria=not args.sem_memoria)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(json.dumps(resultado["etapas"], indent=2, ensure_ascii=False))
+    print(f"✅ Resultado salvo em {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            print(comparar(resultado, json.load(f)))
@@ -0,0 +1,147 @@
+"""Cache persistente em disco para dados derivados.
+
+Cada entrada é identificada pela impressão digital dos arquivos de origem
+(caminho, tamanho e mtime em ns, ou o hash do conteúdo com ``conteudo=True``)
+mais os parâmetros da análise (limiares, janelas) e a versão do pandas. Se um
+arquivo de origem for regravado, a chave muda e a entrada antiga deixa de ser
+usada; ela sai do disco pela evicção por tamanho (LRU pelo mtime, que é
+renovado a cada acerto).
+
+Entradas são gravadas num temporário exclusivo do processo e publicadas com
+``os.replace``: vários processos do app podem ler e escrever o mesmo
+diretório sem ver arquivos pela metade. Um arquivo removido por outro
+processo no meio da leitura conta como miss.
+"""
+import functools
+import hashlib
+import json
+import os
+import pickle
+import uuid
+
+import pandas as pd
+
+DIRETORIO_CACHE = "cache_derivados"
+LIMITE_MB = float(os.environ.get("PAINEL_CACHE_MB", "512"))
+EXTENSAO = ".pkl"
+
+
+def impressao_digital(caminhos, conteudo=False):
+    """Resumo dos arquivos de origem: (caminho, tamanho, mtime_ns) ou sha1 do conteúdo."""
+    partes = []
+    for caminho in sorted(caminhos):
+        info = os.stat(caminho)
+        if conteudo:
+            sha = hashlib.sha1()
+            with open(caminho, "rb") as f:
+                for bloco in iter(functools.partial(f.read, 1 << 20), b""):
+                    sha.update(bloco)
+            partes.append((caminho, sha.hexdigest()))
+        else:
+            partes.append((caminho, info.st_size, info.st_mtime_ns))
+    return partes
+
+
+def chave(nome, fontes, parametros=None, conteudo=False):
+    """Chave da entrada: ``<nome>-<sha1 de fontes + parâmetros>``."""
+    descricao = json.dumps({"fontes": impressao_digital(fontes, conteudo), "parametros": parametros or {},
+                            "pandas": pd.__version__}, sort_keys=True, default=str)
+    return f"{nome}-{hashlib.sha1(descricao.encode()).hexdigest()[:20]}"
+
+
+def _caminho(chave_entrada, diretorio):
+    return os.path.join(diretorio, chave_entrada + EXTENSAO)
+
+
+def ler(chave_entrada, diretorio=DIRETORIO_CACHE):
+    """Valor em cache ou ``None``; um acerto renova o mtime (LRU)."""
+    caminho = _caminho(chave_entrada, diretorio)
+    try:
+        with open(caminho, "rb") as f:
+            valor = pickle.load(f)
+        os.utime(caminho)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    return valor
+
+
+def gravar(chave_entrada, valor, diretorio=DIRETORIO_CACHE):
+    """Grava ``valor`` de forma atômica (temporário + ``os.replace``); devolve o caminho."""
+    os.makedirs(diretorio, exist_ok=True)
+    destino = _caminho(chave_entrada, diretorio)
+    # Temporário exclusivo por processo/escrita; o prefixo "." fica fora da evicção
+    temporario = os.path.join(diretorio, f".{chave_entrada}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    with open(temporario, "wb") as f:
+        pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, destino)
+    return destino
+
+
+def obter(nome, fontes, calcular, parametros=None, conteudo=False, diretorio=DIRETORIO_CACHE):
+    """Devolve ``(valor, acerto)``; em miss chama ``calcular()`` e grava o resultado."""
+    chave_entrada = chave(nome, fontes, parametros, conteudo)
+    valor = ler(chave_entrada, diretorio)
+    if valor is not None:
+        return valor, True
+    valor = calcular()
+    gravar(chave_entrada, valor, diretorio)
+    evictar(diretorio=diretorio)
+    return valor, False
+
+
+def _entradas(diretorio):
+    try:
+        nomes = os.listdir(diretorio)
+    except FileNotFoundError:
+        return []
+    entradas = []
+    for nome in nomes:
+        if nome.startswith(".") or not nome.endswith(EXTENSAO):
+            continue
+        try:
+            info = os.stat(os.path.join(diretorio, nome))
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, nome))
+    return entradas
+
+
+def evictar(limite_mb=None, diretorio=DIRETORIO_CACHE):
+    """Remove as entradas menos usadas até o diretório caber em ``limite_mb``."""
+    limite = (LIMITE_MB if limite_mb is None else limite_mb) * 1e6
+    entradas = sorted(_entradas(diretorio))
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    removidas = 0
+    for _, tamanho, nome in entradas:
+        if total <= limite:
+            break
+        try:
+            os.remove(os.path.join(diretorio, nome))
+            removidas += 1
+        except FileNotFoundError:
+            pass  # outro processo já removeu
+        total -= tamanho
+    return removidas
+
+
+def resumo(diretorio=DIRETORIO_CACHE):
+    """Quantidade de entradas, tamanho total e limite (MB) do cache."""
+    entradas = _entradas(diretorio)
+    return {"entradas": len(entradas), "tamanho_mb": round(sum(t for _, t, _ in entradas) / 1e6, 2),
+            "limite_mb": LIMITE_MB}
+
+
+def limpar(diretorio=DIRETORIO_CACHE):
+    """Apaga todas as entradas (temporários de escritas em andamento ficam)."""
+    for _, _, nome in _entradas(diretorio):
+        try:
+            os.remove(os.path.join(diretorio, nome))
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    import sys
+    if "--limpar" in sys.argv:
+        limpar()
+    print(json.dumps(resumo(), ensure_ascii=False))
@@ -0,0 +1,83 @@
+"""Carregamento paralelo dos arquivos ``*diario*.csv`` (caminho legado do dashboard).
+
+Cada arquivo é lido num worker já com as colunas mínimas e tipos compactos,
+classificado de forma vetorizada e devolvido pronto; o quadro combinado é
+montado com uma única concatenação. Arquivos com erro são devolvidos em
+``falhas`` em vez de descartados em silêncio.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from agregados_gaps import dias_semana
+from dataset_painel import ORDEM_DIAS
+from motor_gaps import classificar_gaps
+from validacao_dados import validar
+
+COLUNAS_LIDAS = ("Date", "Open", "Close", "Volume")
+
+
+def ticker_do_arquivo(caminho):
+    return os.path.basename(caminho).replace("_diario_5anos.csv", "")
+
+
+def ler_arquivo_diario(caminho):
+    """Lê um CSV diário e devolve as colunas do dashboard com tipos compactos."""
+    df = pd.read_csv(caminho, usecols=lambda c: c in COLUNAS_LIDAS)
+    faltando = [c for c in ("Date", "Close") if c not in df.columns]
+    if faltando:
+        raise ValueError(f"colunas ausentes: {faltando}")
+    if df.empty:
+        raise ValueError("arquivo sem linhas")
+
+    # Mesma limpeza do armazém: duplicadas, fins de semana/feriados, preços inválidos
+    df, _ = validar(df.assign(Ticker=ticker_do_arquivo(caminho)))
+    if df.empty:
+        raise ValueError("nenhuma linha válida")
+    close = pd.to_numeric(df["Close"], errors="coerce")
+    variacao = (close.pct_change() * 100).fillna(0)
+    if "Open" in df.columns:
+        # Gap de abertura: Open contra o fechamento anterior
+        abertura = pd.to_numeric(df["Open"], errors="coerce")
+        gap = (abertura / close.shift() - 1).fillna(0) * 100
+    else:
+        gap = variacao
+    return pd.DataFrame({
+        "Ticker": ticker_do_arquivo(caminho),
+        "Date": df["Date"],
+        "Variação_%": variacao.astype("float32"),
+        "Gap_%": gap.astype("float32"),
+        "Tipo_Gap": classificar_gaps(gap),
+        "Dia_Semana": dias_semana(df["Date"]),
+        "Close": close.astype("float32"),
+        "Volume": df["Volume"] if "Volume" in df.columns else 0,
+    })
+
+
+def carregar_diarios(arquivos, max_workers=None, usar_processos=False):
+    """Lê ``arquivos`` em paralelo; devolve ``(df_combinado, falhas)``.
+
+    ``falhas`` mapeia caminho -> mensagem de erro. Com ``usar_processos`` o
+    parsing roda num pool de processos (útil para muitos arquivos grandes);
+    por padrão usa threads, já que o parser C do pandas libera o GIL.
+    """
+    executor_cls = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+    partes, falhas = {}, {}
+    with executor_cls(max_workers=max_workers) as executor:
+        futuros = {executor.submit(ler_arquivo_diario, f): f for f in arquivos}
+        for futuro in as_completed(futuros):
+            caminho = futuros[futuro]
+            try:
+                partes[caminho] = futuro.result()
+            except Exception as e:  # qualquer erro de parsing vira relatório
+                falhas[caminho] = f"{type(e).__name__}: {e}"
+
+    if not partes:
+        return pd.DataFrame(), falhas
+    # Ordem determinística e uma única cópia para o quadro combinado
+    df = pd.concat([partes.pop(c) for c in sorted(partes)], ignore_index=True)
+    df["Ticker"] = df["Ticker"].astype("category")
+    df["Tipo_Gap"] = df["Tipo_Gap"].astype("category")
+    df["Dia_Semana"] = pd.Categorical(df["Dia_Semana"], categories=ORDEM_DIAS)
+    return df, falhas
@@ -0,0 +1,142 @@
+"""Camada de dados dos gráficos: o servidor agrega, o navegador só desenha.
+
+- Box plots saem de estatísticas pré-calculadas (quartis, bigodes de Tukey e
+  uma amostra limitada de outliers), então o payload não cresce com o
+  histórico.
+- Séries temporais são reduzidas a um orçamento fixo de pontos por LTTB
+  (Largest-Triangle-Three-Buckets) ou min-max por bucket.
+"""
+import numpy as np
+
+MAX_OUTLIERS = 50
+PONTOS_SERIE = 1000
+
+
+def resumo_box(df, por, valor="Variação_%", max_outliers=MAX_OUTLIERS):
+    """Estatísticas de box plot por grupo e amostra limitada de outliers.
+
+    Devolve ``(box, outliers)``: ``box`` tem ``por + [N, Media, Q1, Q2, Q3,
+    Bigode_Inf, Bigode_Sup]`` (bigodes de Tukey: valor mais extremo dentro de
+    1,5 IQR); ``outliers`` guarda até ``max_outliers`` pontos por grupo, os
+    mais distantes da mediana.
+    """
+    por = list(por)
+    dados = df[por + [valor]].copy()
+    dados[valor] = dados[valor].astype("float64")
+    grupos = dados.groupby(por, observed=True)[valor]
+    box = grupos.quantile([0.25, 0.5, 0.75]).unstack().reindex(columns=[0.25, 0.5, 0.75])
+    box.columns = ["Q1", "Q2", "Q3"]
+    box.insert(0, "Media", grupos.mean())
+    box.insert(0, "N", grupos.size())
+
+    # Limites de Tukey alinhados a cada linha
+    limites = dados[por].join(box[["Q1", "Q2", "Q3"]], on=por)
+    iqr = limites["Q3"] - limites["Q1"]
+    dentro = dados[valor].between(limites["Q1"] - 1.5 * iqr, limites["Q3"] + 1.5 * iqr)
+    internos = dados[dentro].groupby(por, observed=True)[valor]
+    box["Bigode_Inf"] = internos.min()
+    box["Bigode_Sup"] = internos.max()
+    box = box.reset_index()
+
+    externos = dados[~dentro].assign(_dist=(dados[valor] - limites["Q2"]).abs()[~dentro])
+    outliers = (externos.sort_values("_dist", ascending=False)
+                .groupby(por, observed=True, sort=False).head(max_outliers)
+                .drop(columns="_dist").sort_values(por).reset_index(drop=True))
+    return box, outliers
+
+
+def figura_box(box, x="Tipo_Gap", valor="Variação_%", outliers=None, bigodes=("Bigode_Inf", "Bigode_Sup"),
+               titulo=None):
+    """Box plot a partir das estatísticas (sem enviar as linhas brutas)."""
+    # Import adiado: quem só usa as funções de dados não paga o plotly na partida
+    import plotly.graph_objects as go  # pylint: disable=import-outside-toplevel
+
+    fig = go.Figure()
+    cores = {}
+    for i, linha in enumerate(box.itertuples(index=False)):
+        linha = linha._asdict()
+        nome = str(linha[x])
+        cores[nome] = f"hsl({(i * 137) % 360},60%,45%)"
+        fig.add_trace(go.Box(
+            name=nome, x=[nome], q1=[linha["Q1"]], median=[linha["Q2"]], q3=[linha["Q3"]],
+            lowerfence=[linha[bigodes[0]]], upperfence=[linha[bigodes[1]]], mean=[linha["Media"]],
+            marker_color=cores[nome], boxpoints=False, legendgroup=nome,
+        ))
+    if outliers is not None and not outliers.empty:
+        for nome, grupo in outliers.groupby(x, observed=True):
+            fig.add_trace(go.Scatter(
+                x=[str(nome)] * len(grupo), y=grupo[valor], mode="markers", showlegend=False,
+                marker={"color": cores.get(str(nome)), "size": 4}, legendgroup=str(nome),
+                name=f"{nome} (outliers)",
+            ))
+    fig.update_layout(title=titulo, xaxis_title=x, yaxis_title=valor)
+    return fig
+
+
+def _indices_lttb(x, y, pontos):
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    # Buckets internos (primeiro e último pontos são sempre mantidos)
+    bordas = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    selecionados = np.empty(pontos, dtype=np.int64)
+    selecionados[0], selecionados[-1] = 0, n - 1
+    a = 0
+    for i in range(pontos - 2):
+        ini, fim = bordas[i], bordas[i + 1]
+        # Média do próximo bucket (ou o último ponto)
+        prox_ini, prox_fim = fim, bordas[i + 2] if i + 2 < len(bordas) else n
+        mx, my = x[prox_ini:prox_fim].mean(), y[prox_ini:prox_fim].mean()
+        area = np.abs((x[a] - mx) * (y[ini:fim] - y[a]) - (x[a] - x[ini:fim]) * (my - y[a]))
+        a = ini + int(np.argmax(area))
+        selecionados[i + 1] = a
+    return selecionados
+
+
+def _indices_minmax(y, pontos):
+    n = len(y)
+    buckets = max(pontos // 2, 1)
+    if pontos >= n:
+        return np.arange(n)
+    inicios = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    # Mínimo/máximo de cada bucket por reduceat; depois o primeiro índice que os atinge
+    minimos = np.minimum.reduceat(y, inicios)
+    maximos = np.maximum.reduceat(y, inicios)
+    bucket = np.searchsorted(inicios, np.arange(n), side="right") - 1
+    eh_min = y == minimos[bucket]
+    eh_max = y == maximos[bucket]
+    idx_min = np.full(buckets, n, dtype=np.int64)
+    idx_max = np.full(buckets, n, dtype=np.int64)
+    np.minimum.at(idx_min, bucket[eh_min], np.flatnonzero(eh_min))
+    np.minimum.at(idx_max, bucket[eh_max], np.flatnonzero(eh_max))
+    return np.unique(np.concatenate((idx_min, idx_max, [0, n - 1])).clip(0, n - 1))
+
+
+def reduzir_serie(df, x, y, pontos=PONTOS_SERIE, metodo="lttb"):
+    """Subamostra ``df`` (ordenado por ``x``) para no máximo ~``pontos`` linhas."""
+    if len(df) <= pontos:
+        return df
+    valores_y = df[y].to_numpy(np.float64)
+    if metodo == "minmax":
+        indices = _indices_minmax(valores_y, pontos)
+    else:
+        eixo_x = df[x].to_numpy()
+        if np.issubdtype(eixo_x.dtype, np.datetime64):
+            eixo_x = eixo_x.astype("datetime64[ns]").astype(np.int64)
+        indices = _indices_lttb(eixo_x.astype(np.float64), valores_y, pontos)
+    return df.iloc[indices]
+
+
+def reduzir_curvas(curvas, pontos=PONTOS_SERIE):
+    """Min-max conjunto para um quadro largo (índice = datas, uma coluna por série)."""
+    if len(curvas) <= pontos or curvas.empty:
+        return curvas
+    por_serie = max(pontos // max(len(curvas.columns), 1), 2)
+    indices = np.unique(np.concatenate(
+        [_indices_minmax(curvas[c].to_numpy(np.float64), por_serie) for c in curvas.columns]))
+    return curvas.iloc[indices]
+
+
+def bytes_payload(fig):
+    """Tamanho em bytes do JSON que vai para o navegador."""
+    return len(fig.to_json())
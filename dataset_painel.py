@@ -0,0 +1,123 @@
+"""Conjunto de dados diário do dashboard em layout compacto, indexado por ticker.
+
+As colunas de texto viram categóricas, os valores contínuos viram float32 e as
+linhas ficam ordenadas por (Ticker, Date). Assim cada ativo ocupa um bloco
+contíguo e a seleção de um ticker é um fatiamento posicional, sem máscara
+booleana sobre o conjunto inteiro.
+"""
+import numpy as np
+import pandas as pd
+
+from motor_gaps import TIPOS_GAP
+
+ORDEM_DIAS = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+
+# Colunas em que float32 (~7 dígitos significativos) é suficiente
+COLUNAS_FLOAT32 = ("Open", "High", "Low", "Close", "Adj Close", "Variação_%", "Gap_%")
+
+
+def memoria_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compactar(df):
+    """Converte para tipos compactos e ordena por (Ticker, Date)."""
+    df = df.copy()
+    df["Ticker"] = df["Ticker"].astype("category")
+    if "Tipo_Gap" in df.columns:
+        df["Tipo_Gap"] = pd.Categorical(df["Tipo_Gap"].astype(str), categories=TIPOS_GAP)
+    if "Dia_Semana" in df.columns:
+        dias = df["Dia_Semana"].astype(str)
+        extras = sorted(set(dias.unique()) - set(ORDEM_DIAS))
+        df["Dia_Semana"] = pd.Categorical(dias, categories=ORDEM_DIAS + extras)
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"])
+    for col in COLUNAS_FLOAT32:
+        if col in df.columns:
+            df[col] = df[col].astype("float32")
+    if "Volume" in df.columns:
+        df["Volume"] = pd.to_numeric(df["Volume"], downcast="integer")
+
+    ordem = ["Ticker", "Date"] if "Date" in df.columns else ["Ticker"]
+    return df.sort_values(ordem, kind="stable").reset_index(drop=True)
+
+
+def indice_tickers(df):
+    """Mapeia cada ticker para o ``slice`` contíguo de suas linhas (df já compactado)."""
+    codigos = df["Ticker"].cat.codes.to_numpy()
+    if len(codigos) == 0:
+        return {}
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(codigos)) + 1))
+    fins = np.append(inicios[1:], len(codigos))
+    categorias = df["Ticker"].cat.categories
+    return {categorias[codigos[i]]: slice(int(i), int(f)) for i, f in zip(inicios, fins)}
+
+
+class DatasetPainel:
+    """DataFrame compacto + índice ticker -> fatia contígua."""
+
+    def __init__(self, df):
+        self.memoria_original = memoria_bytes(df)
+        self._df = compactar(df)
+        self._tabela = None
+        self.memoria_compacta = memoria_bytes(self._df)
+        self.indice = indice_tickers(self._df)
+
+    @classmethod
+    def de_arrow(cls, tabela, indice):
+        """Dataset sobre uma tabela Arrow já compacta e ordenada (ex.: mapeada em memória).
+
+        Só as fatias pedidas viram pandas; ``df`` converte o conjunto inteiro
+        no primeiro acesso.
+        """
+        dados = cls.__new__(cls)
+        dados._df = None
+        dados._tabela = tabela
+        dados.indice = indice
+        dados.memoria_original = dados.memoria_compacta = tabela.nbytes
+        return dados
+
+    @property
+    def df(self):
+        if self._df is None:
+            self._df = self._tabela.to_pandas()
+        return self._df
+
+    def colunas(self, nomes):
+        """Só as colunas pedidas, sem converter o restante da tabela mapeada."""
+        if self._df is None:
+            return self._tabela.select(list(nomes)).to_pandas()
+        return self._df[list(nomes)]
+
+    def __len__(self):
+        return len(self._df) if self._df is not None else self._tabela.num_rows
+
+    @property
+    def tickers(self):
+        return sorted(self.indice)
+
+    def fatia(self, ticker):
+        """Linhas do ticker sem varrer as demais (fatiamento posicional)."""
+        faixa = self.indice.get(ticker)
+        if self._df is None:
+            # Fatia da tabela Arrow sem cópia; só ela é convertida
+            faixa = faixa or slice(0, 0)
+            return self._tabela.slice(faixa.start, faixa.stop - faixa.start).to_pandas()
+        if faixa is None:
+            return self._df.iloc[0:0]
+        return self._df.iloc[faixa]
+
+    def relatorio_memoria(self):
+        """Uso de memória antes/depois da compactação, em MB e por coluna."""
+        if self._df is None:
+            por_coluna = {c: self._tabela.column(c).nbytes for c in self._tabela.column_names}
+        else:
+            por_coluna = self._df.memory_usage(deep=True, index=False)
+        return {
+            "linhas": len(self),
+            "tickers": len(self.indice),
+            "antes_mb": round(self.memoria_original / 1e6, 2),
+            "depois_mb": round(self.memoria_compacta / 1e6, 2),
+            "reducao_%": round(100 * (1 - self.memoria_compacta / max(self.memoria_original, 1)), 1),
+            "por_coluna_mb": {c: round(b / 1e6, 3) for c, b in por_coluna.items()},
+        }
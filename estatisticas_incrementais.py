@@ -0,0 +1,329 @@
+"""Estatísticas de ``Variação_%`` em janelas móveis e por regime, atualizadas
+incrementalmente.
+
+Para cada (ticker, dia da semana, tipo de gap) o motor mantém contagem, soma,
+soma dos quadrados e um histograma de bins fixos (sketch de quantis que aceita
+inserção e remoção):
+
+- nas janelas móveis (últimos 20/60/250 pregões do ticker) as barras ficam
+  num buffer circular e as estatísticas de cada janela são refeitas a partir
+  dele a cada atualização (no máximo 250 barras por ticker);
+- por regime de volatilidade (baixa/normal/alta, pela razão entre a
+  volatilidade EWMA curta e a longa do ticker) o acumulado é do histórico todo.
+
+As barras novas de um ticker entram de uma vez (EWMA por somas acumuladas em
+blocos, ``np.add.at`` nos acumuladores). Soma e soma dos quadrados do histórico
+já incorporado ficam no estado: se o histórico antigo mudar (barras
+substituídas por ``armazem_precos.anexar_ticker``, reajuste de split), o
+estado do ticker é refeito do zero.
+
+O estado é gravado em ``estado_estatisticas.npz``. Os acumuladores custam
+O(barras novas) por atualização, mas a entrada é o histórico inteiro de cada
+ticker: ``atualizar_estado`` lê a base toda (``carregar_base``) e a
+verificação de revisões soma as barras já incorporadas (uma passada vetorizada
+por ticker). Uma atualização diária custa, portanto, O(histórico) em leitura e
+somas, e O(barras novas) no resto.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_painel import ORDEM_DIAS
+from instrumentacao import logger
+from motor_gaps import TIPOS_GAP
+
+ARQUIVO_ESTADO = "estado_estatisticas.npz"
+JANELAS = (20, 60, 250)
+REGIMES = ["Baixa", "Normal", "Alta"]
+
+# Histograma de Variação_% em [-15%, 15%], bins de 0,125 p.p. (extremos saturam)
+LIMITE_HIST = 15.0
+LARGURA_BIN = 0.125
+N_BINS = int(2 * LIMITE_HIST / LARGURA_BIN)
+
+# Regime: razão entre volatilidade EWMA curta e longa
+LAMBDA_CURTA = 0.94
+LAMBDA_LONGA = 0.99
+RAZAO_BAIXA = 0.8
+RAZAO_ALTA = 1.25
+# Barras por bloco na EWMA vetorizada (λ^-128 ainda é bem representado em float64)
+BLOCO_EWMA = 128
+# Diferença tolerada na soma do histórico já incorporado (float32 do dataset do app)
+TOLERANCIA_HISTORICO = 1e-2
+
+# Colunas lidas por ``EstatisticasIncrementais.atualizar``
+COLUNAS = ["Ticker", "Date", "Variação_%", "Tipo_Gap", "Dia_Semana"]
+
+_CAMPOS_ESTADO = ("n_obs", "ultima_data", "ewma_curta", "ewma_longa", "buf_valor", "buf_dia",
+                  "buf_gap", "buf_bin", "jan_n", "jan_soma", "jan_soma2", "jan_hist",
+                  "reg_n", "reg_soma", "reg_soma2", "reg_hist", "hist_soma", "hist_soma2")
+# Valor inicial dos campos que não começam em zero
+_VAZIOS = {"ultima_data": np.datetime64("NaT"), "ewma_curta": np.nan, "ewma_longa": np.nan}
+
+
+def _bins(valores):
+    return np.clip((valores + LIMITE_HIST) // LARGURA_BIN, 0, N_BINS - 1).astype(np.int16)
+
+
+def _ewma(inicial, valores, lam):
+    """EWMA após cada valor, com ``e_i = lam * e_{i-1} + (1 - lam) * x_i``.
+
+    Em blocos: ``e_j = lam^j * (lam * e_0 + (1 - lam) * cumsum(x_i * lam^-i))``.
+    Sem valor inicial (NaN) a série começa no primeiro valor.
+    """
+    if np.isnan(inicial):
+        inicial = valores[0]
+    saida = np.empty(len(valores))
+    for i in range(0, len(valores), BLOCO_EWMA):
+        bloco = valores[i:i + BLOCO_EWMA]
+        potencias = lam ** np.arange(len(bloco))
+        saida[i:i + len(bloco)] = potencias * (lam * inicial + (1 - lam) * np.cumsum(bloco / potencias))
+        inicial = saida[i + len(bloco) - 1]
+    return saida
+
+
+def _quantis(hist, probs):
+    """Quantis aproximados de um histograma (interpolação linear no bin)."""
+    total = hist.sum()
+    if total == 0:
+        return [np.nan] * len(probs)
+    acumulado = np.cumsum(hist)
+    resultado = []
+    for p in probs:
+        alvo = p * total
+        i = int(np.searchsorted(acumulado, alvo, side="left"))
+        i = min(i, N_BINS - 1)
+        antes = acumulado[i - 1] if i > 0 else 0
+        fracao = (alvo - antes) / hist[i] if hist[i] else 0.5
+        resultado.append(-LIMITE_HIST + (i + fracao) * LARGURA_BIN)
+    return resultado
+
+
+class EstatisticasIncrementais:
+    """Estado incremental de todos os tickers."""
+
+    def __init__(self, janelas=JANELAS):
+        self.janelas = tuple(sorted(janelas))
+        self.tickers = []
+        self._indice = {}
+        # Versão dos dados (``agregados_gaps.versao_dados``) já incorporada; 0 = desconhecida
+        self.versao_dados = 0.0
+        self._alocar(0)
+
+    # ---- estado -------------------------------------------------------------
+
+    def _alocar(self, n):
+        w, d, g = len(self.janelas), len(ORDEM_DIAS), len(TIPOS_GAP)
+        r, maxj = len(REGIMES), self.janelas[-1]
+        self.n_obs = np.zeros(n, dtype=np.int64)
+        self.ultima_data = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.ewma_curta = np.full(n, np.nan)
+        self.ewma_longa = np.full(n, np.nan)
+        self.buf_valor = np.zeros((n, maxj))
+        self.buf_dia = np.zeros((n, maxj), dtype=np.int8)
+        self.buf_gap = np.zeros((n, maxj), dtype=np.int8)
+        self.buf_bin = np.zeros((n, maxj), dtype=np.int16)
+        self.jan_n = np.zeros((n, w, d, g), dtype=np.int32)
+        self.jan_soma = np.zeros((n, w, d, g))
+        self.jan_soma2 = np.zeros((n, w, d, g))
+        self.jan_hist = np.zeros((n, w, d, g, N_BINS), dtype=np.int32)
+        self.reg_n = np.zeros((n, r, d, g), dtype=np.int32)
+        self.reg_soma = np.zeros((n, r, d, g))
+        self.reg_soma2 = np.zeros((n, r, d, g))
+        self.reg_hist = np.zeros((n, r, d, g, N_BINS), dtype=np.int32)
+        self.hist_soma = np.zeros(n)
+        self.hist_soma2 = np.zeros(n)
+
+    def _registrar(self, tickers):
+        """Aloca espaço para tickers novos de uma só vez."""
+        novos = [t for t in dict.fromkeys(tickers) if t not in self._indice]
+        if not novos:
+            return
+        antigo = {c: getattr(self, c) for c in _CAMPOS_ESTADO}
+        self._alocar(len(self.tickers) + len(novos))
+        for campo, valores in antigo.items():
+            getattr(self, campo)[:len(self.tickers)] = valores
+        for ticker in novos:
+            self._indice[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+
+    def salvar(self, caminho=ARQUIVO_ESTADO):
+        temporario = caminho + ".tmp.npz"
+        np.savez_compressed(temporario, janelas=np.array(self.janelas),
+                            versao_dados=np.float64(self.versao_dados),
+                            tickers=np.array(self.tickers, dtype=object).astype(str),
+                            **{c: getattr(self, c) for c in _CAMPOS_ESTADO})
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_ESTADO):
+        with np.load(caminho) as dados:
+            estado = cls(janelas=tuple(int(j) for j in dados["janelas"]))
+            estado.tickers = [str(t) for t in dados["tickers"]]
+            estado._indice = {t: i for i, t in enumerate(estado.tickers)}
+            estado._alocar(len(estado.tickers))
+            if "versao_dados" in dados.files:
+                estado.versao_dados = float(dados["versao_dados"])
+            for campo in _CAMPOS_ESTADO:
+                if campo in dados.files:
+                    setattr(estado, campo, dados[campo])
+                else:
+                    # Estado antigo sem as somas do histórico: cada ticker é refeito na próxima atualização
+                    getattr(estado, campo)[:] = np.nan
+        return estado
+
+    # ---- atualização --------------------------------------------------------
+
+    def atualizar(self, df):
+        """Processa as barras de ``df`` posteriores à última data de cada ticker.
+
+        ``df`` precisa das ``COLUNAS`` (``Ticker, Date, Variação_%, Tipo_Gap,
+        Dia_Semana``) com o histórico inteiro de cada ticker presente: se as
+        barras já incorporadas mudaram, o ticker é refeito. Devolve quantas
+        barras foram incorporadas.
+        """
+        df = df[COLUNAS]
+        self._registrar(df["Ticker"].astype(str).unique())
+        novas = 0
+        for ticker, grupo in df.groupby("Ticker", observed=True, sort=False):
+            t = self._indice[str(ticker)]
+            datas = pd.to_datetime(grupo["Date"]).to_numpy("datetime64[ns]")
+            ordem = np.argsort(datas, kind="stable")
+            datas = datas[ordem]
+            valores = grupo["Variação_%"].to_numpy(np.float64)[ordem]
+            dias = pd.Categorical(grupo["Dia_Semana"].astype(str), categories=ORDEM_DIAS).codes[ordem]
+            gaps = pd.Categorical(grupo["Tipo_Gap"].astype(str), categories=TIPOS_GAP).codes[ordem]
+            validas = (dias >= 0) & (gaps >= 0) & ~np.isnan(valores)
+
+            ultima = self.ultima_data[t]
+            selecao = np.ones(len(datas), dtype=bool) if np.isnat(ultima) else datas > ultima
+            if not np.isnat(ultima) and self._historico_mudou(t, valores[~selecao & validas]):
+                self._zerar(t)
+                selecao[:] = True
+            if not selecao.any():
+                continue
+            usar = selecao & validas
+            self._incorporar(t, valores[usar], dias[usar], gaps[usar])
+            self.ultima_data[t] = datas[selecao][-1]
+            novas += int(selecao.sum())
+        return novas
+
+    def _historico_mudou(self, t, valores):
+        """Compara as barras já incorporadas com a contagem e as somas gravadas."""
+        return not (len(valores) == self.n_obs[t]
+                    and np.isclose(valores.sum(), self.hist_soma[t], atol=TOLERANCIA_HISTORICO)
+                    and np.isclose(np.square(valores).sum(), self.hist_soma2[t], atol=TOLERANCIA_HISTORICO))
+
+    def _zerar(self, t):
+        for campo in _CAMPOS_ESTADO:
+            getattr(self, campo)[t] = _VAZIOS.get(campo, 0)
+
+    def _incorporar(self, t, v, d, g):
+        """Acrescenta as barras válidas ``v`` (com dia ``d`` e tipo ``g``) em ordem de data."""
+        if len(v) == 0:
+            return
+        b = _bins(v)
+        v2 = v * v
+
+        # Regime de volatilidade do ticker em cada barra (EWMA de v²)
+        curta = _ewma(self.ewma_curta[t], v2, LAMBDA_CURTA)
+        longa = _ewma(self.ewma_longa[t], v2, LAMBDA_LONGA)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            razao = np.where(longa > 0, np.sqrt(curta / longa), 1.0)
+        r = np.where(razao < RAZAO_BAIXA, 0, np.where(razao > RAZAO_ALTA, 2, 1))
+        np.add.at(self.reg_n[t], (r, d, g), 1)
+        np.add.at(self.reg_soma[t], (r, d, g), v)
+        np.add.at(self.reg_soma2[t], (r, d, g), v2)
+        np.add.at(self.reg_hist[t], (r, d, g, b), 1)
+        self.ewma_curta[t], self.ewma_longa[t] = curta[-1], longa[-1]
+
+        # Buffer circular: a barra de número i fica na posição i % maxj
+        maxj = self.janelas[-1]
+        n = int(self.n_obs[t])
+        total = n + len(v)
+        antigas = np.arange(n - min(n, maxj), n) % maxj
+        ultimas = [np.concatenate((buf[t, antigas], novos))[-maxj:]
+                   for buf, novos in ((self.buf_valor, v), (self.buf_dia, d), (self.buf_gap, g), (self.buf_bin, b))]
+        posicoes = np.arange(total - len(ultimas[0]), total) % maxj
+        for buf, valores in zip((self.buf_valor, self.buf_dia, self.buf_gap, self.buf_bin), ultimas):
+            buf[t, posicoes] = valores
+
+        # Janelas refeitas a partir das últimas barras do buffer
+        for w, tamanho in enumerate(self.janelas):
+            vs, ds, gs, bs = (u[-tamanho:] for u in ultimas)
+            for acumulador in (self.jan_n, self.jan_soma, self.jan_soma2, self.jan_hist):
+                acumulador[t, w] = 0
+            np.add.at(self.jan_n[t, w], (ds, gs), 1)
+            np.add.at(self.jan_soma[t, w], (ds, gs), vs)
+            np.add.at(self.jan_soma2[t, w], (ds, gs), vs * vs)
+            np.add.at(self.jan_hist[t, w], (ds, gs, bs), 1)
+
+        self.n_obs[t] = total
+        self.hist_soma[t] += v.sum()
+        self.hist_soma2[t] += v2.sum()
+
+    # ---- consulta -----------------------------------------------------------
+
+    def resumo(self, ticker, janela=None, regime=None, por_dia=False):
+        """Estatísticas do ticker numa janela (20/60/250) ou num regime.
+
+        Sem ``janela`` nem ``regime`` soma os regimes (histórico completo).
+        Devolve colunas ``[Dia_Semana,] Tipo_Gap, N, Media, Desvio, P05, Q1,
+        Q2, Q3, P95``.
+        """
+        colunas = (["Dia_Semana"] if por_dia else []) + ["Tipo_Gap", "N", "Media", "Desvio",
+                                                         "P05", "Q1", "Q2", "Q3", "P95"]
+        if ticker not in self._indice:
+            return pd.DataFrame(columns=colunas)
+        t = self._indice[ticker]
+        if janela is not None:
+            w = self.janelas.index(janela)
+            n, soma, soma2, hist = (self.jan_n[t, w], self.jan_soma[t, w],
+                                    self.jan_soma2[t, w], self.jan_hist[t, w])
+        else:
+            regimes = [REGIMES.index(regime)] if regime is not None else slice(None)
+            n, soma, soma2, hist = (self.reg_n[t, regimes].sum(0), self.reg_soma[t, regimes].sum(0),
+                                    self.reg_soma2[t, regimes].sum(0), self.reg_hist[t, regimes].sum(0))
+        if not por_dia:
+            n, soma, soma2, hist = n.sum(0)[None], soma.sum(0)[None], soma2.sum(0)[None], hist.sum(0)[None]
+
+        linhas = []
+        for d in range(n.shape[0]):
+            for g, tipo in enumerate(TIPOS_GAP):
+                contagem = int(n[d, g])
+                if contagem == 0:
+                    continue
+                media = soma[d, g] / contagem
+                desvio = np.sqrt(max(soma2[d, g] / contagem - media ** 2, 0.0))
+                linha = ([ORDEM_DIAS[d]] if por_dia else []) + [tipo, contagem, media, desvio]
+                linhas.append(linha + _quantis(hist[d, g], (0.05, 0.25, 0.5, 0.75, 0.95)))
+        return pd.DataFrame(linhas, columns=colunas)
+
+
+def atualizar_estado(df=None, caminho=ARQUIVO_ESTADO, reconstruir=False, versao=None):
+    """Carrega o estado gravado, incorpora as barras novas e grava de volta.
+
+    ``versao`` é a versão dos dados de ``df`` e fica gravada no estado, para
+    que o dashboard saiba se ele está atrasado; sem ``df`` a base é lida do
+    disco e a versão vem de ``agregados_gaps.versao_dados``.
+    """
+    if df is None:
+        import agregados_gaps
+        versao = agregados_gaps.versao_dados() if versao is None else versao
+        df = agregados_gaps.carregar_base()
+    if os.path.exists(caminho) and not reconstruir:
+        estado = EstatisticasIncrementais.carregar(caminho)
+    else:
+        estado = EstatisticasIncrementais()
+    novas = estado.atualizar(df)
+    if versao is not None:
+        estado.versao_dados = float(versao)
+    estado.salvar(caminho)
+    logger.info("Estatísticas incrementais: %d barras novas em %s", novas, caminho)
+    return estado
+
+
+if __name__ == "__main__":
+    import sys
+    atualizar_estado(reconstruir="--reconstruir" in sys.argv)
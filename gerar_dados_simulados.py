@@ -1,92 +1,190 @@
+import argparse
+import os
+
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+
+import agregados_gaps
+import armazem_precos
+import estatisticas_incrementais
+import intradiario
+from motor_gaps import classificar_gaps
+
+ATIVOS_PADRAO = ["POMO4", "BRFS3", "WEGE3", "MGLU3"]
+# Data inicial fixa: com a mesma semente a saída é a mesma em qualquer dia
+INICIO_PADRAO = "2020-01-02"
+
+# Volatilidade diária de cada regime (2% era o valor único da versão original)
+REGIMES_PADRAO = (0.02,)
+
+DIAS_SEMANA = np.array(["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"])
+
+
+def nomes_ativos(n_ativos):
+    """Usa os ativos padrão e completa com nomes sintéticos SIM0001, SIM0002..."""
+    nomes = ATIVOS_PADRAO[:n_ativos]
+    nomes += [f"SIM{i:04d}" for i in range(1, n_ativos - len(nomes) + 1)]
+    return nomes
+
+
+def gerar_barras(rng, n_ativos=4, n_dias=1000, inicio=None, regimes=REGIMES_PADRAO,
+                 prob_troca_regime=0.01, limiar_gap=1.0):
+    """Gera barras diárias simuladas para vários ativos de uma vez.
+
+    Todos os caminhos de preço são montados como matrizes (ativos x dias) com
+    produto acumulado; OHLC e volume são derivados por operações vetoriais.
+    ``regimes`` lista as volatilidades diárias; cada ativo troca de regime com
+    probabilidade ``prob_troca_regime`` por dia.
+
+    Retorna um DataFrame longo com ``Ticker``, OHLCV e as colunas do dashboard
+    (``Variação_%``, ``Gap_%``, ``Tipo_Gap``, ``Dia_Semana``). ``Tipo_Gap`` usa o
+    gap de abertura contra o fechamento anterior, com ``limiar_gap`` em %.
+    """
+    if inicio is None:
+        inicio = INICIO_PADRAO
+    datas = pd.bdate_range(start=pd.Timestamp(inicio).normalize(), periods=n_dias)
+    forma = (n_ativos, n_dias)
+
+    # Regime de volatilidade por ativo/dia
+    vols = np.asarray(regimes, dtype=np.float64)
+    trocas = rng.random(forma) < prob_troca_regime
+    regime = (np.cumsum(trocas, axis=1) + rng.integers(0, len(vols), (n_ativos, 1))) % len(vols)
+    sigma = vols[regime]
+
+    # Caminhos de preço
+    variacao = rng.standard_normal(forma) * sigma
+    base = rng.uniform(10, 100, (n_ativos, 1))
+    close = np.maximum(base * np.cumprod(1 + variacao, axis=1), 1.0)
+
+    # OHLC simulado (mesmas proporções da versão original, escaladas pelo regime);
+    # máxima/mínima partem do corpo do candle para conter Open e Close
+    open_ = np.round(close * (1 + rng.standard_normal(forma) * sigma / 4), 2)
+    close = np.round(close, 2)
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.standard_normal(forma)) * sigma / 2), 2)
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.standard_normal(forma)) * sigma / 2), 2)
+    low = np.maximum(low, 0.01)
+    volume = rng.integers(100000, 1000000, forma)
+
+    # Gap de abertura: Open contra o fechamento do pregão anterior
+    gap_pct = np.zeros(forma)
+    gap_pct[:, 1:] = (open_[:, 1:] / close[:, :-1] - 1) * 100
+    gap_pct = np.round(gap_pct, 2).ravel()
+
+    # Variação do Close final (já com o piso e o arredondamento), como no dashboard
+    variacao_pct = np.zeros(forma)
+    variacao_pct[:, 1:] = (close[:, 1:] / close[:, :-1] - 1) * 100
+    variacao_pct = np.round(variacao_pct, 2).ravel()
+    codigo_dia = np.tile(datas.dayofweek.to_numpy(), n_ativos)
+
+    close = close.ravel()
+    return pd.DataFrame({
+        "Ticker": pd.Categorical.from_codes(np.repeat(np.arange(n_ativos), n_dias),
+                                            categories=nomes_ativos(n_ativos)),
+        "Date": np.tile(datas.to_numpy(), n_ativos),
+        "Open": open_.ravel(),
+        "High": high.ravel(),
+        "Low": low.ravel(),
+        "Close": close,
+        "Adj Close": close,
+        "Volume": volume.ravel(),
+        "Variação_%": variacao_pct,
+        "Gap_%": gap_pct,
+        "Tipo_Gap": classificar_gaps(gap_pct, limiar_gap),
+        "Dia_Semana": pd.Categorical.from_codes(codigo_dia, categories=DIAS_SEMANA),
+    })
+
+
+def gerar_sessoes_intradiarias(rng, n_dias=250, inicio=None, minutos=420, abertura="10:00",
+                               vol_diaria=0.02, vol_gap=0.01, preco_inicial=None, sessoes_por_bloco=20):
+    """Gera barras de 1 minuto de um ativo, um bloco de pregões por vez.
+
+    Cada pregão tem ``minutos`` barras a partir de ``abertura``; a primeira
+    abre com um gap normal (desvio ``vol_gap``) sobre o fechamento anterior.
+    Devolve um gerador de DataFrames ``Date, Open, High, Low, Close, Volume``,
+    de modo que o histórico inteiro nunca fica na memória.
+    """
+    if inicio is None:
+        inicio = INICIO_PADRAO
+    datas = pd.bdate_range(start=pd.Timestamp(inicio).normalize(), periods=n_dias)
+    deslocamentos = pd.Timedelta(abertura + ":00") + pd.to_timedelta(np.arange(minutos), unit="min")
+    vol_min = vol_diaria / np.sqrt(minutos)
+    fech_anterior = rng.uniform(10, 100) if preco_inicial is None else preco_inicial
+
+    for i in range(0, n_dias, sessoes_por_bloco):
+        dias = datas[i:i + sessoes_por_bloco]
+        forma = (len(dias), minutos)
+        retornos = rng.standard_normal(forma) * vol_min
+        gaps = rng.standard_normal(len(dias)) * vol_gap
+        # Caminho contínuo; a abertura de cada pregão é o fechamento anterior com o gap
+        fatores = 1 + retornos
+        fatores[:, 0] *= 1 + gaps
+        close = np.maximum(fech_anterior * np.cumprod(fatores.ravel()), 0.01).reshape(forma)
+        open_ = np.empty(forma)
+        open_.ravel()[1:] = close.ravel()[:-1]
+        open_[:, 0] = close[:, 0] / (1 + retornos[:, 0])
+        high = np.maximum(open_, close) * (1 + np.abs(rng.standard_normal(forma)) * vol_min / 2)
+        low = np.minimum(open_, close) * (1 - np.abs(rng.standard_normal(forma)) * vol_min / 2)
+        fech_anterior = close[-1, -1]
+        yield pd.DataFrame({
+            "Date": (dias.to_numpy()[:, None] + deslocamentos.to_numpy()[None, :]).ravel(),
+            "Open": np.round(open_, 2).ravel(),
+            "High": np.round(high, 2).ravel(),
+            "Low": np.round(low, 2).ravel(),
+            "Close": np.round(close, 2).ravel(),
+            "Volume": rng.integers(100, 10000, forma).ravel(),
+        })
+
+
+def criar_intradiario_simulado(n_ativos=4, n_dias=250, seed=None, diretorio="intradiario", inicio=None):
+    """Grava ``<diretorio>/<TICKER>_1min.csv`` em blocos e processa cada arquivo."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(diretorio, exist_ok=True)
+    for ativo in nomes_ativos(n_ativos):
+        destino = os.path.join(diretorio, f"{ativo}_1min.csv")
+        with open(destino, "w", newline="", encoding="utf-8") as f:
+            for n, bloco in enumerate(gerar_sessoes_intradiarias(rng, n_dias, inicio=inicio)):
+                bloco.to_csv(f, header=n == 0, index=False)
+        sessoes = intradiario.processar_arquivo(destino, ativo)
+        print(f"✅ Barras de 1 minuto simuladas: {destino} ({sessoes} pregões)")
+
 
 # Criar dados simulados para demonstração
-def criar_dados_simulados():
-    ativos = ["POMO4", "BRFS3", "WEGE3", "MGLU3"]
-    
-    # Dados simulados de 5 anos
-    start_date = datetime.now() - timedelta(days=5*365)
-    dates = pd.date_range(start=start_date, periods=1000, freq='D')
-    
-    all_data = []
-    
-    for ativo in ativos:
-        # Simular preços base
-        base_price = np.random.uniform(10, 100)
-        
-        # Simular dados históricos
-        data = []
-        current_price = base_price
-        
-        for i, date in enumerate(dates):
-            # Simular variação diária
-            variation = np.random.normal(0, 0.02)  # 2% de volatilidade
-            current_price = current_price * (1 + variation)
-            
-            # Garantir que preços não fiquem negativos
-            current_price = max(current_price, 1.0)
-            
-            # OHLC simulado
-            high = current_price * (1 + abs(np.random.normal(0, 0.01)))
-            low = current_price * (1 - abs(np.random.normal(0, 0.01)))
-            open_price = current_price * (1 + np.random.normal(0, 0.005))
-            
-            volume = np.random.randint(100000, 1000000)
-            
-            # Calcular variação percentual
-            variacao_pct = variation * 100
-            
-            # Definir tipo de gap baseado na variação
-            if variacao_pct > 1.0:
-                tipo_gap = "Alta"
-            elif variacao_pct < -1.0:
-                tipo_gap = "Baixa"
-            else:
-                tipo_gap = "Sem Gap"
-            
-            # Dia da semana
-            dia_semana = date.strftime('%A')
-            dias_map = {
-                'Monday': 'Segunda',
-                'Tuesday': 'Terça', 
-                'Wednesday': 'Quarta',
-                'Thursday': 'Quinta',
-                'Friday': 'Sexta'
-            }
-            dia_semana = dias_map.get(dia_semana, 'Segunda')
-            
-            data.append({
-                'Date': date.strftime('%Y-%m-%d'),
-                'Open': round(open_price, 2),
-                'High': round(high, 2),
-                'Low': round(low, 2),
-                'Close': round(current_price, 2),
-                'Adj Close': round(current_price, 2),
-                'Volume': volume
-            })
-            
-            # Adicionar aos dados completos para o dashboard
-            all_data.append({
-                'Ticker': ativo,
-                'Date': date.strftime('%Y-%m-%d'),
-                'Variação_%': round(variacao_pct, 2),
-                'Tipo_Gap': tipo_gap,
-                'Dia_Semana': dia_semana,
-                'Close': round(current_price, 2),
-                'Volume': volume
-            })
-        
-        # Salvar CSV individual do ativo
-        df = pd.DataFrame(data)
-        df.to_csv(f"{ativo}_diario_5anos.csv", index=False)
-        print(f"✅ Dados simulados salvos: {ativo}_diario_5anos.csv")
-    
+def criar_dados_simulados(n_ativos=4, n_dias=1000, seed=None, regimes=REGIMES_PADRAO,
+                          salvar_csv=True, inicio=None):
+    rng = np.random.default_rng(seed)
+    df = gerar_barras(rng, n_ativos=n_ativos, n_dias=n_dias, inicio=inicio, regimes=regimes)
+
+    # Salvar partição de cada ativo no armazém colunar
+    for ativo, df_ativo in df.groupby("Ticker", observed=True, sort=False):
+        destino = armazem_precos.salvar_ticker(df_ativo[armazem_precos.COLUNAS], ativo)
+        print(f"✅ Dados simulados salvos: {destino}")
+
     # Salvar dados combinados para o dashboard
-    df_all = pd.DataFrame(all_data)
-    df_all.to_csv("dados_completos_dashboard.csv", index=False)
-    print(f"✅ Dados completos para dashboard salvos: dados_completos_dashboard.csv")
+    if salvar_csv:
+        df_all = df[["Ticker", "Date", "Variação_%", "Gap_%", "Tipo_Gap", "Dia_Semana", "Close", "Volume"]]
+        df_all.to_csv("dados_completos_dashboard.csv", index=False, date_format="%Y-%m-%d")
+        print("✅ Dados completos para dashboard salvos: dados_completos_dashboard.csv")
+
+    agregados_gaps.aquecer_cache()
+    estatisticas_incrementais.atualizar_estado(reconstruir=True)
+    return df
+
 
 if __name__ == "__main__":
-    criar_dados_simulados()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gera dados simulados de ativos da B3")
+    parser.add_argument("--ativos", type=int, default=4, help="quantidade de ativos")
+    parser.add_argument("--dias", type=int, default=1000, help="pregões por ativo")
+    parser.add_argument("--seed", type=int, default=None, help="semente do gerador")
+    parser.add_argument("--inicio", default=INICIO_PADRAO, help="primeiro pregão simulado (AAAA-MM-DD)")
+    parser.add_argument("--regimes", type=float, nargs="+", default=list(REGIMES_PADRAO),
+                        help="volatilidades diárias dos regimes (ex.: 0.01 0.02 0.04)")
+    parser.add_argument("--sem-csv", action="store_true",
+                        help="não grava dados_completos_dashboard.csv")
+    parser.add_argument("--intradiario", action="store_true",
+                        help="gera barras de 1 minuto em intradiario/ em vez das diárias")
+    args = parser.parse_args()
+    if args.intradiario:
+        criar_intradiario_simulado(args.ativos, args.dias, args.seed, inicio=args.inicio)
+    else:
+        criar_dados_simulados(args.ativos, args.dias, args.seed, tuple(args.regimes),
+                              salvar_csv=not args.sem_csv, inicio=args.inicio)
@@ -0,0 +1,100 @@
+"""Instantâneo do dataset pré-processado para a partida rápida do dashboard.
+
+Grava o ``DatasetPainel`` já compacto (categóricas, float32, ordenado por
+Ticker/Date) e as tabelas agregadas em arquivos Arrow IPC sem compressão em
+``instantaneo_painel/``. Na partida, os arquivos são abertos com
+``pa.memory_map``: o dataset fica mapeado e só a fatia do ticker pedido vira
+pandas (``DatasetPainel.de_arrow``). O índice ticker -> fatia vai nos
+metadados do esquema.
+
+Cada gravação vai para uma subpasta nova; o ``versao.json`` é gravado por
+último, aponta para ela e marca o instantâneo como completo. Assim nenhum
+arquivo que outro processo tenha mapeado é sobrescrito (no Windows isso
+falharia), e as subpastas antigas são removidas quando possível. A chave do
+instantâneo combina a versão dos dados com os parâmetros da análise (limiar de
+gap, número de outliers); um instantâneo de outra chave é ignorado.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import agregados_gaps
+from dataset_painel import DatasetPainel
+
+DIRETORIO_INSTANTANEO = "instantaneo_painel"
+ARQUIVO_DATASET = "dataset.arrow"
+ARQUIVO_VERSAO = "versao.json"
+
+
+def _chave(versao):
+    parametros = json.dumps(agregados_gaps.parametros_analise(), sort_keys=True)
+    return hashlib.sha1(f"{versao}|{parametros}".encode()).hexdigest()[:16]
+
+
+def _gravar_tabela(tabela, destino, metadados=None):
+    if metadados:
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), **metadados})
+    with pa.OSFile(destino, "wb") as arquivo, ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+
+
+def _ler_tabela(caminho):
+    # Leitura sem cópia: os buffers apontam para o arquivo mapeado
+    return ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+
+
+def salvar(dados, agregados, versao, diretorio=DIRETORIO_INSTANTANEO):
+    """Grava o dataset e os agregados (não indexados) da ``versao`` dos dados."""
+    chave = _chave(versao)
+    pasta = f"{chave}-{os.getpid()}-{time.time_ns()}"
+    os.makedirs(os.path.join(diretorio, pasta))
+    indice = {t: [f.start, f.stop] for t, f in dados.indice.items()}
+    tabela = pa.Table.from_pandas(dados.df, preserve_index=False).combine_chunks()
+    _gravar_tabela(tabela, os.path.join(diretorio, pasta, ARQUIVO_DATASET),
+                   {b"indice": json.dumps(indice).encode()})
+    for nome, agregado in agregados.items():
+        _gravar_tabela(pa.Table.from_pandas(agregado, preserve_index=False),
+                       os.path.join(diretorio, pasta, f"{nome}.arrow"))
+
+    caminho_versao = os.path.join(diretorio, ARQUIVO_VERSAO)
+    temporario = caminho_versao + f".{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"versao": versao, "chave": chave, "pasta": pasta, "tabelas": sorted(agregados)}, f)
+    os.replace(temporario, caminho_versao)
+    _remover_antigos(diretorio, pasta)
+
+
+def _remover_antigos(diretorio, atual):
+    # Uma subpasta ainda mapeada por outro processo (Windows) fica para a próxima gravação
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        if nome != atual and os.path.isdir(caminho):
+            shutil.rmtree(caminho, ignore_errors=True)
+
+
+def carregar(versao, diretorio=DIRETORIO_INSTANTANEO):
+    """``(dados, agregados)`` do instantâneo, ou ``None`` se ausente ou de outra chave."""
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_VERSAO), encoding="utf-8") as f:
+            info = json.load(f)
+        if info["chave"] != _chave(versao):
+            return None
+        pasta = os.path.join(diretorio, info["pasta"])
+        tabela = _ler_tabela(os.path.join(pasta, ARQUIVO_DATASET))
+        agregados = {nome: _ler_tabela(os.path.join(pasta, f"{nome}.arrow")).to_pandas()
+                     for nome in info["tabelas"]}
+    except (FileNotFoundError, KeyError, ValueError, pa.ArrowInvalid):
+        return None
+    indice = {t: slice(i, f) for t, (i, f) in json.loads(tabela.schema.metadata[b"indice"]).items()}
+    return DatasetPainel.de_arrow(tabela, indice), agregados
+
+
+if __name__ == "__main__":
+    df_all, agregados, _ = agregados_gaps.carregar_com_cache()
+    salvar(DatasetPainel(df_all), agregados, agregados_gaps.versao_dados())
+    print(f"✅ Instantâneo gravado em {DIRETORIO_INSTANTANEO}/")
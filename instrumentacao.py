@@ -0,0 +1,150 @@
+"""Instrumentação leve do caminho quente do dashboard.
+
+Cada rerun do Streamlit cria um ``Medidor`` que registra spans de tempo por
+etapa (com contagem de linhas quando faz sentido). Contadores de cache ficam no
+nível do módulo, que sobrevive entre reruns no mesmo processo: a função em cache
+chama ``contar_miss`` no corpo (que só roda quando não há acerto) e quem chama
+registra ``contar_chamada``.
+
+Ao fim do rerun ``Medidor.finalizar`` emite uma linha JSON no logger
+``painel.performance``; com ``PAINEL_LOG_PERF=<arquivo>`` as linhas também são
+anexadas a esse arquivo. O logger tem handler próprio (stderr, nível
+``PAINEL_LOG_NIVEL``, padrão INFO), já que o Streamlit não configura o logging
+da aplicação. ``registrar_primeira_renderizacao`` emite, uma vez por processo,
+o tempo desde o início do processo até a primeira tela completa (partida a
+frio).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("painel.performance")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.environ.get("PAINEL_LOG_NIVEL", "INFO").upper())
+    logger.propagate = False  # sem linhas duplicadas se a raiz também tiver handler
+
+# Orçamento de latência por rerun (ms), configurável por ambiente
+ORCAMENTO_MS = float(os.environ.get("PAINEL_ORCAMENTO_MS", "1000"))
+
+
+def _inicio_processo():
+    """Início do processo na escala de ``time.perf_counter``.
+
+    No Linux vem de ``/proc`` (inclui o import do Streamlit e dos módulos
+    pesados); nos demais sistemas, do primeiro import deste módulo.
+    """
+    agora = time.perf_counter()
+    try:
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        with open("/proc/self/stat", encoding="ascii") as f:
+            # Campos depois do nome do executável (entre parênteses); starttime é o 22º
+            campos = f.read().rsplit(")", 1)[1].split()
+        idade = uptime - int(campos[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return agora
+    return agora - max(idade, 0.0)
+
+
+# Referência para o tempo até a primeira renderização
+INICIO_PROCESSO = _inicio_processo()
+_primeira_renderizacao = None
+
+_trava = threading.Lock()
+_cache = {}
+
+
+def contar_chamada(nome):
+    with _trava:
+        _cache.setdefault(nome, {"chamadas": 0, "misses": 0})["chamadas"] += 1
+
+
+def contar_miss(nome):
+    with _trava:
+        _cache.setdefault(nome, {"chamadas": 0, "misses": 0})["misses"] += 1
+
+
+def contadores_cache():
+    """``{funcao: {chamadas, misses, hits}}`` acumulados no processo."""
+    with _trava:
+        return {nome: dict(c, hits=max(c["chamadas"] - c["misses"], 0)) for nome, c in _cache.items()}
+
+
+def _emitir(relatorio):
+    linha = json.dumps(relatorio, ensure_ascii=False, default=str)
+    logger.info(linha)
+    destino = os.environ.get("PAINEL_LOG_PERF")
+    if destino:
+        with _trava, open(destino, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+
+
+def registrar_primeira_renderizacao(medidor):
+    """Emite uma vez por processo o tempo desde ``INICIO_PROCESSO`` até agora.
+
+    Chamado quando a primeira tela útil foi enviada; inclui os spans do
+    rerun até esse ponto (imports, carga, figuras).
+    """
+    global _primeira_renderizacao
+    with _trava:
+        if _primeira_renderizacao is not None:
+            return _primeira_renderizacao
+        _primeira_renderizacao = {
+            "rotulo": "primeira_renderizacao",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round((time.perf_counter() - INICIO_PROCESSO) * 1000, 2),
+            "spans": list(medidor.spans),
+        }
+    _emitir(_primeira_renderizacao)
+    return _primeira_renderizacao
+
+
+def primeira_renderizacao():
+    return _primeira_renderizacao
+
+
+class Medidor:
+    """Spans de tempo de um rerun."""
+
+    def __init__(self, rotulo="rerun"):
+        self.rotulo = rotulo
+        self.inicio = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def span(self, etapa, linhas=None, **extras):
+        """Mede o bloco; ``linhas`` e ``extras`` podem ser atualizados dentro dele."""
+        registro = {"etapa": etapa, "linhas": linhas, **extras}
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+            self.spans.append(registro)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.inicio) * 1000, 2)
+
+    def relatorio(self):
+        total = self.total_ms()
+        return {
+            "rotulo": self.rotulo,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_ms": total,
+            "orcamento_ms": ORCAMENTO_MS,
+            "acima_orcamento": total > ORCAMENTO_MS,
+            "spans": self.spans,
+            "cache": contadores_cache(),
+        }
+
+    def finalizar(self):
+        """Emite o relatório estruturado do rerun e o devolve."""
+        relatorio = self.relatorio()
+        _emitir(relatorio)
+        return relatorio
@@ -0,0 +1,300 @@
+"""Barras intradiárias (1 min, 5 min...) processadas em blocos.
+
+Um arquivo de barras de minuto por ticker (CSV ou Parquet com ``Date, Open,
+High, Low, Close, Volume`` em ordem cronológica) é lido bloco a bloco. Cada
+bloco é cortado no último pregão, que ainda pode estar incompleto e segue para
+o bloco seguinte junto com o fechamento do pregão anterior. Assim a memória
+fica limitada a um bloco mais um pregão, qualquer que seja o histórico.
+
+Para cada pregão completo:
+
+- as barras são reamostradas para os intervalos pedidos (``"5min"``,
+  ``"15min"``, ``"1h"``...) e anexadas a
+  ``dados_intradiarios/intervalo=<I>/Ticker=<T>/dados.parquet``;
+- saem as métricas da sessão: gap de abertura, faixa de abertura (máxima e
+  mínima dos primeiros ``minutos_abertura`` minutos), o primeiro rompimento
+  dessa faixa e em quantos minutos o gap foi preenchido (preço de volta ao
+  fechamento anterior), gravadas em
+  ``dados_intradiarios/metricas_sessoes/Ticker=<T>/dados.parquet``.
+"""
+import argparse
+import glob
+import os
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from motor_gaps import classificar_gaps
+
+DIRETORIO_INTRADIARIO = "dados_intradiarios"
+NOME_ARQUIVO = "dados.parquet"
+INTERVALOS_PADRAO = ("5min", "15min")
+MINUTOS_ABERTURA = 30
+TAMANHO_BLOCO = 200_000
+
+ESQUEMA_BARRAS = pa.schema([
+    ("Date", pa.timestamp("ns")),
+    ("Open", pa.float64()),
+    ("High", pa.float64()),
+    ("Low", pa.float64()),
+    ("Close", pa.float64()),
+    ("Volume", pa.int64()),
+])
+COLUNAS_BARRAS = ESQUEMA_BARRAS.names
+
+
+def ler_em_blocos(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera DataFrames de até ``tamanho_bloco`` linhas de um CSV ou Parquet."""
+    if caminho.endswith(".parquet"):
+        arquivo = pq.ParquetFile(caminho)
+        for lote in arquivo.iter_batches(batch_size=tamanho_bloco, columns=COLUNAS_BARRAS):
+            yield lote.to_pandas()
+    else:
+        for bloco in pd.read_csv(caminho, usecols=COLUNAS_BARRAS, chunksize=tamanho_bloco):
+            yield bloco
+
+
+def _normalizar(bloco):
+    bloco = bloco[COLUNAS_BARRAS].copy()
+    datas = pd.to_datetime(bloco["Date"])
+    if getattr(datas.dt, "tz", None) is not None:
+        datas = datas.dt.tz_localize(None)
+    bloco["Date"] = datas.astype("datetime64[ns]")
+    for col in ("Open", "High", "Low", "Close"):
+        bloco[col] = pd.to_numeric(bloco[col], errors="coerce").astype("float64")
+    bloco["Volume"] = pd.to_numeric(bloco["Volume"], errors="coerce").fillna(0).astype("int64")
+    return bloco
+
+
+def reamostrar(barras, intervalo):
+    """OHLCV em ``intervalo`` (regra do pandas); buckets não cruzam pregões."""
+    bucket = barras["Date"].dt.floor(intervalo)
+    grupos = barras.groupby(bucket.to_numpy(), sort=False)
+    resultado = pd.DataFrame({
+        "Open": grupos["Open"].first(),
+        "High": grupos["High"].max(),
+        "Low": grupos["Low"].min(),
+        "Close": grupos["Close"].last(),
+        "Volume": grupos["Volume"].sum(),
+    })
+    resultado.index.name = "Date"
+    return resultado.reset_index()
+
+
+def _primeiro_minuto(codigos, minutos, mascara, n_sessoes):
+    """Menor ``minutos`` por sessão entre as linhas da máscara (NaN se nenhuma)."""
+    primeiro = np.full(n_sessoes, np.inf)
+    np.minimum.at(primeiro, codigos[mascara], minutos[mascara])
+    primeiro[np.isinf(primeiro)] = np.nan
+    return primeiro
+
+
+def metricas_sessoes(barras, fech_anterior=np.nan, minutos_abertura=MINUTOS_ABERTURA):
+    """Uma linha por pregão completo de ``barras`` (ordenadas por Date).
+
+    ``fech_anterior`` é o fechamento do pregão anterior ao primeiro de
+    ``barras`` (vem do bloco anterior no processamento em blocos).
+    """
+    datas = barras["Date"].to_numpy("datetime64[ns]")
+    sessoes, codigos = np.unique(datas.astype("datetime64[D]"), return_inverse=True)
+    n = len(sessoes)
+    inicio_linha = np.ones(len(datas), dtype=bool)
+    inicio_linha[1:] = codigos[1:] != codigos[:-1]
+    primeira = np.flatnonzero(inicio_linha)
+    ultima = np.append(primeira[1:] - 1, len(datas) - 1)
+
+    abertura_p, maxima, minima = (barras["Open"].to_numpy(), barras["High"].to_numpy(),
+                                  barras["Low"].to_numpy())
+    fechamento = barras["Close"].to_numpy()
+    fech_ant = np.concatenate(([fech_anterior], fechamento[ultima][:-1]))
+    abertura = abertura_p[primeira]
+    gap = (abertura / fech_ant - 1) * 100
+
+    # Minutos desde a primeira barra do pregão
+    minutos = (datas - datas[primeira][codigos]) / np.timedelta64(1, "m")
+    na_faixa = minutos < minutos_abertura
+    faixa_max = np.full(n, -np.inf)
+    faixa_min = np.full(n, np.inf)
+    np.maximum.at(faixa_max, codigos[na_faixa], maxima[na_faixa])
+    np.minimum.at(faixa_min, codigos[na_faixa], minima[na_faixa])
+
+    # Primeiro rompimento da faixa depois que ela se fecha
+    depois = ~na_faixa
+    rompe_alta = _primeiro_minuto(codigos, minutos, depois & (maxima > faixa_max[codigos]), n)
+    rompe_baixa = _primeiro_minuto(codigos, minutos, depois & (minima < faixa_min[codigos]), n)
+    rompimento = np.select([np.isnan(rompe_alta) & np.isnan(rompe_baixa),
+                            np.nan_to_num(rompe_alta, nan=np.inf) <= np.nan_to_num(rompe_baixa, nan=np.inf)],
+                           ["Nenhum", "Alta"], "Baixa")
+
+    # Preenchimento: gap de alta fecha quando a mínima volta ao fechamento anterior
+    alvo = fech_ant[codigos]
+    gap_linha = gap[codigos]
+    preenche = ((gap_linha > 0) & (minima <= alvo)) | ((gap_linha < 0) & (maxima >= alvo))
+    minutos_preench = _primeiro_minuto(codigos, minutos, preenche, n)
+
+    return pd.DataFrame({
+        "Sessao": pd.DatetimeIndex(sessoes.astype("datetime64[ns]")),
+        "Abertura": abertura,
+        "Maxima": pd.Series(maxima).groupby(codigos).max().to_numpy(),
+        "Minima": pd.Series(minima).groupby(codigos).min().to_numpy(),
+        "Fechamento": fechamento[ultima],
+        "Volume": pd.Series(barras["Volume"].to_numpy()).groupby(codigos).sum().to_numpy(),
+        "Fech_Anterior": fech_ant,
+        "Gap_%": gap,
+        "Tipo_Gap": classificar_gaps(np.nan_to_num(gap)),
+        "Faixa_Max": faixa_max,
+        "Faixa_Min": faixa_min,
+        "Faixa_%": (faixa_max / faixa_min - 1) * 100,
+        "Rompimento": rompimento,
+        "Minutos_Rompimento": np.fmin(rompe_alta, rompe_baixa),
+        "Gap_Preenchido": ~np.isnan(minutos_preench),
+        "Minutos_Preenchimento": minutos_preench,
+    })
+
+
+class _Gravador:
+    """ParquetWriter atômico: escreve num temporário e troca no ``fechar``.
+
+    Sem nenhuma linha escrita, ``fechar`` remove o destino anterior (a
+    partição passa a não existir). Como gerenciador de contexto, um erro no
+    meio do processamento fecha o escritor e apaga o temporário, sem tocar no
+    destino.
+    """
+
+    def __init__(self, destino, esquema=None):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        self.destino = destino
+        self.temporario = os.path.join(os.path.dirname(destino), "." + NOME_ARQUIVO + ".tmp")
+        self.esquema = esquema
+        self.escritor = None
+
+    def escrever(self, df):
+        if df.empty:
+            return
+        tabela = pa.Table.from_pandas(df, schema=self.esquema, preserve_index=False)
+        if self.escritor is None:
+            self.escritor = pq.ParquetWriter(self.temporario, tabela.schema)
+        self.escritor.write_table(tabela)
+
+    def fechar(self):
+        if self.escritor is None:
+            # Entrada sem linhas: a partição antiga não corresponde mais ao arquivo
+            if os.path.exists(self.destino):
+                os.remove(self.destino)
+            try:
+                os.rmdir(os.path.dirname(self.destino))
+            except OSError:
+                pass  # pasta com outros arquivos
+            return
+        self.escritor.close()
+        self.escritor = None
+        os.replace(self.temporario, self.destino)
+
+    def descartar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+            self.escritor = None
+        if os.path.exists(self.temporario):
+            os.remove(self.temporario)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        if tipo is None:
+            self.fechar()
+        else:
+            self.descartar()
+
+
+def _particao(diretorio, nome, ticker):
+    return os.path.join(diretorio, nome, f"Ticker={ticker}", NOME_ARQUIVO)
+
+
+def processar_arquivo(caminho, ticker, intervalos=INTERVALOS_PADRAO, minutos_abertura=MINUTOS_ABERTURA,
+                      tamanho_bloco=TAMANHO_BLOCO, diretorio=DIRETORIO_INTRADIARIO):
+    """Reamostra e calcula as métricas de sessão de um arquivo de minutos.
+
+    Substitui as partições do ticker; um arquivo sem linhas remove as
+    partições anteriores. Devolve o número de pregões processados.
+    Levanta ``ValueError`` se o arquivo não estiver em ordem cronológica; nesse
+    caso as partições anteriores ficam intactas e nenhum temporário sobra.
+    """
+    pendente = None
+    fech_anterior = np.nan
+    sessoes = 0
+
+    with ExitStack() as pilha:
+        gravadores = {i: pilha.enter_context(_Gravador(_particao(diretorio, f"intervalo={i}", ticker),
+                                                       ESQUEMA_BARRAS))
+                      for i in intervalos}
+        metricas = pilha.enter_context(_Gravador(_particao(diretorio, "metricas_sessoes", ticker)))
+
+        def fechar_pregoes(barras):
+            nonlocal fech_anterior, sessoes
+            if barras.empty:
+                return
+            for intervalo, gravador in gravadores.items():
+                gravador.escrever(reamostrar(barras, intervalo))
+            resumo = metricas_sessoes(barras, fech_anterior, minutos_abertura)
+            metricas.escrever(resumo)
+            fech_anterior = resumo["Fechamento"].iloc[-1]
+            sessoes += len(resumo)
+
+        for bloco in ler_em_blocos(caminho, tamanho_bloco):
+            bloco = _normalizar(bloco)
+            if bloco.empty:
+                continue
+            if pendente is not None:
+                bloco = pd.concat([pendente, bloco], ignore_index=True)
+            if not bloco["Date"].is_monotonic_increasing:
+                raise ValueError(f"{caminho}: barras fora de ordem cronológica")
+            # O último pregão do bloco pode continuar no próximo
+            ultimo_dia = bloco["Date"].iloc[-1].normalize()
+            corte = int(np.searchsorted(bloco["Date"].to_numpy(), ultimo_dia.to_datetime64()))
+            fechar_pregoes(bloco.iloc[:corte])
+            pendente = bloco.iloc[corte:]
+        if pendente is not None:
+            fechar_pregoes(pendente)
+        # Saída do ``with``: os gravadores publicam as partições (ou descartam, em erro)
+    return sessoes
+
+
+def ticker_do_arquivo(caminho):
+    return os.path.basename(caminho).split("_")[0]
+
+
+def ler_barras(ticker, intervalo, inicio=None, fim=None, diretorio=DIRETORIO_INTRADIARIO):
+    """Barras reamostradas de um ticker, filtradas por data na leitura."""
+    filtros = []
+    if inicio is not None:
+        filtros.append(("Date", ">=", pd.Timestamp(inicio)))
+    if fim is not None:
+        filtros.append(("Date", "<", pd.Timestamp(fim)))
+    return pq.read_table(_particao(diretorio, f"intervalo={intervalo}", ticker),
+                         filters=filtros or None).to_pandas()
+
+
+def ler_metricas(ticker, diretorio=DIRETORIO_INTRADIARIO):
+    """Métricas por pregão de um ticker (uma linha por sessão, cabe na memória)."""
+    return pd.read_parquet(_particao(diretorio, "metricas_sessoes", ticker))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Processa barras intradiárias em blocos")
+    parser.add_argument("arquivos", nargs="*", help="arquivos <TICKER>_1min.csv/.parquet "
+                                                    "(padrão: intradiario/*_1min.*)")
+    parser.add_argument("--intervalos", nargs="+", default=list(INTERVALOS_PADRAO))
+    parser.add_argument("--minutos-abertura", type=int, default=MINUTOS_ABERTURA,
+                        help="duração da faixa de abertura")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas por bloco de leitura")
+    args = parser.parse_args()
+
+    arquivos = args.arquivos or sorted(glob.glob(os.path.join("intradiario", "*_1min.*")))
+    for arquivo in arquivos:
+        n = processar_arquivo(arquivo, ticker_do_arquivo(arquivo), args.intervalos,
+                              args.minutos_abertura, args.bloco)
+        print(f"✅ {ticker_do_arquivo(arquivo)}: {n} pregões processados")
@@ -0,0 +1,166 @@
+"""Motor de gaps de abertura: ``Open_t / Close_{t-1} - 1``.
+
+Todas as funções trabalham sobre o quadro longo de barras diárias ordenado por
+(Ticker, Date), de uma vez para todos os ativos: o fechamento anterior e o ATR
+são calculados com deslocamentos e somas acumuladas mascarados na troca de
+ticker, sem ``groupby().apply``.
+
+Com barras diárias o preenchimento do gap é medido por High/Low (se o preço
+voltou ao fechamento anterior e quanto do gap foi retraçado); o horário do
+preenchimento exige barras intradiárias.
+"""
+import numpy as np
+import pandas as pd
+
+LIMIAR_PADRAO = 1.0  # % sobre o fechamento anterior
+JANELA_ATR = 14
+TIPOS_GAP = ["Alta", "Baixa", "Sem Gap"]
+
+
+def classificar_gaps(gap, limiar=LIMIAR_PADRAO):
+    """``Tipo_Gap`` categórico a partir do gap em %.
+
+    ``limiar`` pode ser escalar ou um array alinhado às linhas (por exemplo
+    limiares por ticker ou um múltiplo do ATR de cada dia).
+    """
+    gap = np.asarray(gap, dtype=np.float64)
+    limiar = np.asarray(limiar, dtype=np.float64)
+    codigos = np.select([gap > limiar, gap < -limiar], [0, 1], 2)
+    return pd.Categorical.from_codes(codigos, categories=TIPOS_GAP)
+
+
+def _codigos_ticker(tickers):
+    if isinstance(getattr(tickers, "dtype", None), pd.CategoricalDtype):
+        return np.asarray(tickers.cat.codes)
+    return pd.factorize(np.asarray(tickers))[0]
+
+
+def _inicio_de_grupo(codigos):
+    """Máscara das linhas que abrem um novo ticker."""
+    inicio = np.ones(len(codigos), dtype=bool)
+    inicio[1:] = codigos[1:] != codigos[:-1]
+    return inicio
+
+
+def _anterior(valores, inicio):
+    """Valor da linha anterior do mesmo ticker (NaN na primeira linha)."""
+    anterior = np.empty(len(valores), dtype=np.float64)
+    anterior[1:] = valores[:-1]
+    anterior[inicio] = np.nan
+    return anterior
+
+
+def _media_movel(valores, inicio, janela):
+    """Média móvel de ``janela`` linhas que não atravessa a troca de ticker."""
+    n = len(valores)
+    idx = np.arange(n)
+    primeira = np.maximum.accumulate(np.where(inicio, idx, 0))
+    acumulado = np.concatenate(([0.0], np.nancumsum(valores)))
+    ini = np.maximum(idx - janela + 1, primeira)
+    contagem = idx + 1 - ini
+    media = (acumulado[idx + 1] - acumulado[ini]) / contagem
+    media[contagem < janela] = np.nan
+    return media
+
+
+def gap_abertura(tickers, abertura, fechamento):
+    """Gap de abertura em % para linhas já ordenadas por (Ticker, Date)."""
+    inicio = _inicio_de_grupo(_codigos_ticker(tickers))
+    anterior = _anterior(np.asarray(fechamento, dtype=np.float64), inicio)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (np.asarray(abertura, dtype=np.float64) / anterior - 1) * 100
+
+
+def calcular_gaps(df, janela_atr=JANELA_ATR):
+    """Métricas de gap por barra para todos os tickers de ``df``.
+
+    ``df`` precisa de ``Ticker, Date, Open, High, Low, Close``. Devolve um
+    quadro alinhado a ``df`` (mesmo índice, ordenado por Ticker/Date) com:
+
+    - ``Fech_Anterior``, ``Gap_%``: fechamento anterior e gap de abertura em %;
+    - ``ATR_%``: ATR(``janela_atr``) do dia anterior em % do fechamento anterior;
+    - ``Gap_ATR``: gap em múltiplos desse ATR (base para limiares por volatilidade);
+    - ``Gap_Preenchido``: se o preço tocou o fechamento anterior no mesmo dia;
+    - ``Preenchimento_%``: fração do gap retraçada (0-100).
+    """
+    df = df.sort_values(["Ticker", "Date"], kind="stable")
+    inicio = _inicio_de_grupo(_codigos_ticker(df["Ticker"]))
+    abertura = df["Open"].to_numpy(np.float64)
+    maxima = df["High"].to_numpy(np.float64)
+    minima = df["Low"].to_numpy(np.float64)
+    fech = df["Close"].to_numpy(np.float64)
+
+    anterior = _anterior(fech, inicio)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap = (abertura / anterior - 1) * 100
+
+        # True range usa o fechamento anterior quando existe
+        tr = np.fmax(maxima - minima, np.fmax(np.abs(maxima - anterior), np.abs(minima - anterior)))
+        atr_anterior = _anterior(_media_movel(tr, inicio, janela_atr), inicio)
+        gap_atr = (abertura - anterior) / atr_anterior
+
+        alta = gap > 0
+        baixa = gap < 0
+        preenchido = np.where(alta, minima <= anterior, np.where(baixa, maxima >= anterior, False))
+        fracao = np.where(alta, (abertura - minima) / (abertura - anterior),
+                          np.where(baixa, (maxima - abertura) / (anterior - abertura), np.nan))
+    fracao = np.clip(fracao, 0, 1) * 100
+
+    return pd.DataFrame({
+        "Fech_Anterior": anterior,
+        "Gap_%": gap,
+        "ATR_%": atr_anterior / anterior * 100,
+        "Gap_ATR": gap_atr,
+        "Gap_Preenchido": preenchido & ~np.isnan(gap),
+        "Preenchimento_%": fracao,
+    }, index=df.index)
+
+
+def varrer_limiares(tickers, gap, limiares, preenchido=None):
+    """Contagens de gaps para vários limiares numa única passada.
+
+    Cada linha é colocada no intervalo de limiares em que |gap| cai
+    (``searchsorted``) e as contagens por (ticker, intervalo) saem de um
+    ``bincount``; a soma acumulada reversa dá "quantos gaps passam de cada
+    limiar" para todos os limiares de uma vez. Funciona tanto com ``Gap_%``
+    quanto com ``Gap_ATR``.
+
+    Devolve um quadro longo com ``Ticker, Limiar, Gaps_Alta, Gaps_Baixa,
+    Sem_Gap, Preench_Alta_%, Preench_Baixa_%``.
+    """
+    limiares = np.sort(np.asarray(limiares, dtype=np.float64))
+    gap = np.asarray(gap, dtype=np.float64)
+    codigos, nomes = pd.factorize(np.asarray(tickers, dtype=object), sort=True)
+    validos = ~np.isnan(gap)
+    codigos, gap = codigos[validos], gap[validos]
+    preenchido = (np.zeros(len(gap), dtype=bool) if preenchido is None
+                  else np.asarray(preenchido, dtype=bool)[validos])
+
+    n_tickers, n_lim = len(nomes), len(limiares)
+    # Intervalo j: limiares[j-1] < |gap| <= limiares[j]; "passa de limiares[i]" se j > i
+    faixa = np.searchsorted(limiares, np.abs(gap), side="left")
+    chave = codigos * (n_lim + 1) + faixa
+
+    def _acima(mascara):
+        contagem = np.bincount(chave[mascara], minlength=n_tickers * (n_lim + 1))
+        contagem = contagem.reshape(n_tickers, n_lim + 1)
+        # Soma acumulada reversa: linhas com faixa > i
+        return np.cumsum(contagem[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+    alta = _acima(gap > 0)
+    baixa = _acima(gap < 0)
+    alta_preench = _acima((gap > 0) & preenchido)
+    baixa_preench = _acima((gap < 0) & preenchido)
+    total = np.bincount(codigos, minlength=n_tickers)[:, None]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resultado = pd.DataFrame({
+            "Ticker": np.repeat(nomes, n_lim),
+            "Limiar": np.tile(limiares, n_tickers),
+            "Gaps_Alta": alta.ravel(),
+            "Gaps_Baixa": baixa.ravel(),
+            "Sem_Gap": (total - alta - baixa).ravel(),
+            "Preench_Alta_%": (alta_preench / alta * 100).ravel(),
+            "Preench_Baixa_%": (baixa_preench / baixa * 100).ravel(),
+        })
+    return resultado
@@ -0,0 +1,74 @@
+
+import streamlit as st
+import numpy as np
+import plotly.express as px
+
+import agregados_gaps
+import analise_cruzada
+import instrumentacao
+
+st.set_page_config(page_title="Análise Cruzada - Day Trade", layout="wide")
+
+st.title("🔗 Análise Cruzada entre Ativos")
+st.markdown("Quais ativos abrem com gap juntos e quão correlacionadas são suas variações diárias.")
+
+# Matrizes em cache por versão dos dados (mtime das fontes) e parâmetros; uma entrada
+# por vez, como no app principal, para o cache não crescer a cada versão dos dados
+@st.cache_data(max_entries=1)
+def calcular_matrizes(versao, tipo, minimo_periodos):  # pylint: disable=unused-argument
+    # versao só entra na chave do cache (com "_versao" o Streamlit a ignoraria)
+    instrumentacao.contar_miss("calcular_matrizes")
+    # Mesmo cache em disco do app principal: só tickers regravados são reprocessados
+    df_all, _, _ = agregados_gaps.carregar_com_cache()
+    if df_all.empty:
+        return None
+    return analise_cruzada.calcular(df_all, tipo=tipo, minimo_periodos=minimo_periodos)
+
+col1, col2 = st.columns(2)
+with col1:
+    tipo_sel = st.selectbox("⛳ Gaps considerados", list(analise_cruzada.TIPOS_COOCORRENCIA), index=2)
+with col2:
+    minimo_sel = st.number_input("Mínimo de pregões em comum", 2, 1000, analise_cruzada.MINIMO_PERIODOS)
+
+instrumentacao.contar_chamada("calcular_matrizes")
+matrizes = calcular_matrizes(agregados_gaps.versao_dados(), tipo_sel, int(minimo_sel))
+if matrizes is None:
+    st.info("Sem dados no armazém `dados_precos/` nem em `dados_completos_dashboard.csv`.")
+    st.stop()
+
+tickers = list(matrizes["correlacao"].index)
+st.caption(f"{len(tickers)} ativos alinhados por data.")
+
+# Mapas de calor: todos os ativos até 50, senão os escolhidos
+selecionados = st.multiselect("Ativos nos mapas de calor", tickers, default=tickers[:50])
+if not selecionados:
+    selecionados = tickers[:50]
+
+st.subheader("📈 Correlação de Variação % Diária")
+corr = matrizes["correlacao"].loc[selecionados, selecionados]
+fig_corr = px.imshow(corr.round(3), zmin=-1, zmax=1, color_continuous_scale="RdBu_r", aspect="auto")
+st.plotly_chart(fig_corr, use_container_width=True)
+
+st.subheader("⛳ Coocorrência de Gaps")
+modo = st.radio("Exibir", ["P(gap na coluna | gap na linha)", "Pregões com gap simultâneo"], horizontal=True)
+if modo.startswith("P("):
+    cooc = matrizes["condicional"].loc[selecionados, selecionados].round(3)
+    fig_cooc = px.imshow(cooc, zmin=0, zmax=1, color_continuous_scale="Viridis", aspect="auto")
+else:
+    cooc = matrizes["coocorrencia"].loc[selecionados, selecionados]
+    fig_cooc = px.imshow(cooc, color_continuous_scale="Viridis", aspect="auto")
+st.plotly_chart(fig_cooc, use_container_width=True)
+
+# Pares de destaque sobre todos os ativos (não só os do mapa)
+c1, c2 = st.columns(2)
+with c1:
+    st.markdown("**Pares mais correlacionados**")
+    st.dataframe(analise_cruzada.principais_pares(matrizes["correlacao"], nome="Correlação"), hide_index=True)
+with c2:
+    st.markdown("**Pares que mais abrem com gap juntos**")
+    pares = analise_cruzada.principais_pares(matrizes["coocorrencia"], nome="Pregões")
+    condicional = matrizes["condicional"].to_numpy()
+    linhas = matrizes["condicional"].index.get_indexer(pares["Ativo_A"])
+    colunas = matrizes["condicional"].columns.get_indexer(pares["Ativo_B"])
+    pares["P(B|A)"] = np.round(condicional[linhas, colunas], 3)
+    st.dataframe(pares, hide_index=True)
@@ -0,0 +1,107 @@
+"""Provedores de barras diárias usados pelo downloader.
+
+Todo provedor implementa ``baixar(ticker, inicio=None, fim=None)`` e devolve um
+DataFrame no layout de ``armazem_precos`` (``Date, Open, High, Low, Close,
+Adj Close, Volume``). ``inicio`` e ``fim`` são inclusivos; ``inicio=None``
+significa "histórico padrão completo". ``erros_transitorios()`` diz quais
+exceções valem uma nova tentativa (rede, limite de requisições).
+"""
+import abc
+import os
+
+import pandas as pd
+
+import armazem_precos
+
+
+# Falhas de rede comuns a qualquer provedor
+ERROS_REDE = (ConnectionError, TimeoutError)
+
+
+class ProvedorDados(abc.ABC):
+    """Interface mínima de um provedor de barras diárias."""
+
+    nome = "base"
+
+    @abc.abstractmethod
+    def baixar(self, ticker, inicio=None, fim=None):
+        """Barras de ``ticker`` entre ``inicio`` e ``fim`` (inclusivos)."""
+
+    def erros_transitorios(self):
+        """Exceções de ``baixar`` que justificam repetir o pedido."""
+        return ERROS_REDE
+
+
+class ProvedorYahoo(ProvedorDados):
+    """Busca no Yahoo Finance via ``yfinance`` (sufixo ``.SA`` da B3)."""
+
+    nome = "yahoo"
+
+    def __init__(self, periodo="5y", sufixo=".SA"):
+        self.periodo = periodo
+        self.sufixo = sufixo
+
+    def baixar(self, ticker, inicio=None, fim=None):
+        import yfinance as yf
+
+        # Um ``Ticker`` por chamada: ``yf.download`` guarda estado no módulo e não
+        # é seguro com várias threads do downloader
+        parametros = {"interval": "1d", "auto_adjust": False, "actions": False}
+        if inicio is None:
+            parametros["period"] = self.periodo
+        else:
+            parametros["start"] = pd.Timestamp(inicio).strftime("%Y-%m-%d")
+            if fim is not None:
+                # No yfinance o fim é exclusivo
+                parametros["end"] = (pd.Timestamp(fim) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        df = yf.Ticker(ticker + self.sufixo).history(**parametros)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=armazem_precos.COLUNAS)
+        return _recortar(armazem_precos.normalizar_colunas(df), inicio, fim)
+
+    def erros_transitorios(self):
+        # yfinance só é importado quando o provedor é usado, como em ``baixar``
+        from yfinance.exceptions import YFRateLimitError  # pylint: disable=import-outside-toplevel
+        try:
+            from curl_cffi.requests.exceptions import RequestException  # pylint: disable=import-outside-toplevel
+        except ImportError:  # versões do yfinance sobre ``requests``
+            from requests.exceptions import RequestException  # pylint: disable=import-outside-toplevel
+        return ERROS_REDE + (YFRateLimitError, RequestException)
+
+
+class ProvedorArquivo(ProvedorDados):
+    """Provedor local que serve ``<TICKER>_diario_5anos.csv`` de uma pasta.
+
+    Permite testar o pipeline inteiro sem rede: ``fim`` simula "hoje", então
+    chamadas sucessivas com ``fim`` maiores reproduzem atualizações diárias.
+    """
+
+    nome = "arquivo"
+
+    def __init__(self, diretorio=".", padrao="{ticker}_diario_5anos.csv", fim=None):
+        self.diretorio = diretorio
+        self.padrao = padrao
+        self.fim = fim
+
+    def baixar(self, ticker, inicio=None, fim=None):
+        caminho = os.path.join(self.diretorio, self.padrao.format(ticker=ticker))
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(caminho)
+        df = armazem_precos.normalizar_colunas(pd.read_csv(caminho))
+        if fim is None:
+            fim = self.fim
+        return _recortar(df, inicio, fim)
+
+
+def _recortar(df, inicio, fim):
+    if inicio is not None:
+        df = df[df["Date"] >= pd.Timestamp(inicio)]
+    if fim is not None:
+        df = df[df["Date"] <= pd.Timestamp(fim)]
+    return df.reset_index(drop=True)
+
+
+PROVEDORES = {
+    ProvedorYahoo.nome: ProvedorYahoo,
+    ProvedorArquivo.nome: ProvedorArquivo,
+}
@@ -0,0 +1,200 @@
+"""Relatório em lote (sem Streamlit) com as mesmas análises do dashboard.
+
+Calcula a base diária e as tabelas agregadas de todos os ativos do armazém
+num pool de processos, pelo mesmo cache em disco usado pelo dashboard
+(``agregados_gaps.carregar_ticker``). Rodar o job noturno deixa o cache
+quente, e o rerun do dashboard só lê os resultados.
+
+Saídas em ``--saida`` (padrão ``relatorios/``):
+
+- ``tabelas/<tabela>.parquet`` e/ou ``.csv`` (as tabelas de ``agregados_gaps``
+  e ``limiares``, a varredura de limiares de gap com o preenchimento no dia);
+- ``graficos/<TICKER>.html`` (rentabilidade, quartis e frequência) e ``index.html``;
+- ``problemas.json`` com os problemas de dados por ativo;
+- o instantâneo do dataset lido na partida do dashboard (``instantaneo_painel``).
+
+O código de saída é 0 sem problemas, 1 se algum ativo tiver problema de dados
+e 2 se não houver dados. Exemplo::
+
+    python relatorio_lote.py --workers 8 --formatos parquet csv
+"""
+import argparse
+import html
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import plotly.express as px
+
+import agregados_gaps
+import armazem_precos
+import cache_derivados
+import dados_graficos
+import instantaneo_painel
+import motor_gaps
+from dataset_painel import DatasetPainel
+
+DIRETORIO_SAIDA = "relatorios"
+FORMATOS = ("parquet", "csv")
+MINIMO_PREGOES = 2
+LIMIARES_VARREDURA = (0.5, 1.0, 1.5, 2.0, 3.0, 5.0)  # % sobre o fechamento anterior
+
+
+def verificar(df):
+    """Lista de problemas de dados de um ativo (vazia se estiver tudo certo)."""
+    if len(df) < MINIMO_PREGOES:
+        return [f"apenas {len(df)} pregão(ões)"]
+    problemas = []
+    close = pd.to_numeric(df["Close"], errors="coerce")
+    invalidos = int((close.isna() | (close <= 0)).sum())
+    if invalidos:
+        problemas.append(f"Close ausente ou não positivo em {invalidos} pregão(ões)")
+    duplicadas = int(df["Date"].duplicated().sum())
+    if duplicadas:
+        problemas.append(f"{duplicadas} data(s) duplicada(s)")
+    if not pd.to_datetime(df["Date"]).is_monotonic_increasing:
+        problemas.append("datas fora de ordem")
+    return problemas
+
+
+def analisar(max_workers=None, diretorio_cache=cache_derivados.DIRETORIO_CACHE):
+    """Processa todos os ativos; devolve ``(df_all, agregados, problemas, recalculados)``.
+
+    Um ativo que falha na leitura entra em ``problemas`` e fica fora das
+    tabelas, sem interromper os demais.
+    """
+    if not armazem_precos.existe_armazem():
+        # CSV combinado: uma única entrada no cache
+        df_all, agregados, recalculados = agregados_gaps.carregar_com_cache(diretorio_cache)
+        problemas = {str(t): p for t, grupo in df_all.groupby("Ticker", observed=True)
+                     if "Close" in grupo and (p := verificar(grupo))}
+        return df_all, agregados, problemas, recalculados
+
+    tickers = armazem_precos.listar_tickers()
+    resultados, problemas = {}, {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(agregados_gaps.carregar_ticker, t, diretorio_cache): t for t in tickers}
+        for futuro in as_completed(futuros):
+            ticker = futuros[futuro]
+            try:
+                resultados[ticker] = futuro.result()
+            except Exception as e:  # qualquer erro de leitura vira problema do ativo
+                problemas[ticker] = [f"{type(e).__name__}: {e}"]
+                continue
+            encontrados = verificar(resultados[ticker][0])
+            if encontrados:
+                problemas[ticker] = encontrados
+
+    if not resultados:
+        return pd.DataFrame(), None, problemas, []
+    ordem = sorted(resultados)
+    df_all, agregados = agregados_gaps.combinar_tickers([resultados[t][0] for t in ordem],
+                                                        [resultados[t][1] for t in ordem])
+    recalculados = [t for t in ordem if not resultados[t][2]]
+    return df_all, agregados, problemas, recalculados
+
+
+def gravar_tabelas(agregados, saida, formatos=("parquet",)):
+    pasta = os.path.join(saida, "tabelas")
+    os.makedirs(pasta, exist_ok=True)
+    for nome, tabela in agregados.items():
+        if "parquet" in formatos:
+            tabela.to_parquet(os.path.join(pasta, f"{nome}.parquet"), index=False)
+        if "csv" in formatos:
+            tabela.to_csv(os.path.join(pasta, f"{nome}.csv"), index=False)
+
+
+def tabela_limiares(tickers, limiares=LIMIARES_VARREDURA):
+    """Gaps acima de cada limiar por ativo, com a fração preenchida no mesmo dia.
+
+    High/Low vêm do armazém (a base do dashboard não os carrega); sem armazém
+    devolve ``None``.
+    """
+    if not armazem_precos.existe_armazem():
+        return None
+    df = armazem_precos.ler_todos(colunas=["Date", "Open", "High", "Low", "Close"], tickers=tickers)
+    gaps = motor_gaps.calcular_gaps(df)
+    return motor_gaps.varrer_limiares(df.loc[gaps.index, "Ticker"], gaps["Gap_%"], limiares,
+                                      gaps["Gap_Preenchido"])
+
+
+def figuras_ticker(indexados, ticker):
+    """As três figuras da página principal do dashboard para um ativo."""
+    resumo = agregados_gaps.consultar(indexados["resumo_gap"], ticker)
+    frequencia = agregados_gaps.consultar(indexados["frequencia"], ticker)
+    return [
+        px.bar(resumo.rename(columns={"Media": "Variação_%"}), x="Tipo_Gap", y="Variação_%",
+               color="Tipo_Gap", title=f"{ticker}: Rentabilidade Média (%)"),
+        dados_graficos.figura_box(resumo, outliers=agregados_gaps.consultar(indexados["outliers"], ticker),
+                                  titulo=f"{ticker}: Distribuição de Variação (%) por Tipo de Gap"),
+        px.bar(frequencia, x="Dia_Semana", y="Frequência", color="Tipo_Gap", barmode="group",
+               title=f"{ticker}: Frequência de Gaps"),
+    ]
+
+
+def gravar_graficos(agregados, saida, problemas=None):
+    """Um HTML estático por ativo e um ``index.html`` com os links."""
+    pasta = os.path.join(saida, "graficos")
+    os.makedirs(pasta, exist_ok=True)
+    indexados = agregados_gaps.indexar_por_ticker(agregados)
+    tickers = sorted(indexados["resumo_gap"].index.unique())
+    for ticker in tickers:
+        # plotly.js vem do CDN uma vez por página; as figuras são só fragmentos
+        corpo = "\n".join(fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False)
+                          for i, fig in enumerate(figuras_ticker(indexados, ticker)))
+        with open(os.path.join(pasta, f"{ticker}.html"), "w", encoding="utf-8") as f:
+            f.write(f"<html><head><meta charset='utf-8'><title>{html.escape(ticker)}</title></head>"
+                    f"<body><h1>{html.escape(ticker)}</h1>{corpo}</body></html>")
+
+    problemas = problemas or {}
+    itens = "\n".join(
+        f"<li><a href='{html.escape(t)}.html'>{html.escape(t)}</a>"
+        + (f" ⚠️ {html.escape('; '.join(problemas[t]))}" if t in problemas else "") + "</li>"
+        for t in tickers)
+    with open(os.path.join(pasta, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"<html><head><meta charset='utf-8'><title>Relatório de gaps</title></head>"
+                f"<body><h1>Relatório de gaps</h1><ul>{itens}</ul></body></html>")
+    return tickers
+
+
+def executar(saida=DIRETORIO_SAIDA, formatos=("parquet",), max_workers=None, graficos=True,
+             diretorio_cache=cache_derivados.DIRETORIO_CACHE):
+    """Roda o relatório completo; devolve o código de saída."""
+    df_all, agregados, problemas, recalculados = analisar(max_workers, diretorio_cache)
+    os.makedirs(saida, exist_ok=True)
+    with open(os.path.join(saida, "problemas.json"), "w", encoding="utf-8") as f:
+        json.dump(problemas, f, ensure_ascii=False, indent=2)
+    for ticker, lista in sorted(problemas.items()):
+        print(f"⚠️ {ticker}: {'; '.join(lista)}")
+    if agregados is None or df_all.empty:
+        print("❌ Nenhum dado para analisar")
+        return 2
+
+    print(f"🔄 {df_all['Ticker'].nunique()} ativos, {len(recalculados)} recalculado(s)")
+    gravar_tabelas(agregados, saida, formatos)
+    limiares = tabela_limiares(sorted(df_all["Ticker"].astype(str).unique()))
+    if limiares is not None:
+        gravar_tabelas({"limiares": limiares}, saida, formatos)
+    # Instantâneo para a partida rápida do dashboard, só com todos os ativos lidos
+    if df_all["Ticker"].nunique() >= len(armazem_precos.listar_tickers()):
+        try:
+            instantaneo_painel.salvar(DatasetPainel(df_all), agregados, agregados_gaps.versao_dados())
+        except Exception as e:  # sem instantâneo a próxima partida do dashboard só fica mais lenta
+            print(f"⚠️ Instantâneo não gravado: {e}")
+    if graficos:
+        gravar_graficos(agregados, saida, problemas)
+    print(f"✅ Relatório gravado em {saida}/")
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relatório em lote das estatísticas de gaps")
+    parser.add_argument("--saida", default=DIRETORIO_SAIDA)
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS, default=["parquet"])
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: núcleos da máquina)")
+    parser.add_argument("--sem-graficos", action="store_true", help="não gera os HTMLs")
+    parser.add_argument("--cache", default=cache_derivados.DIRETORIO_CACHE, help="diretório do cache em disco")
+    args = parser.parse_args()
+    sys.exit(executar(args.saida, tuple(args.formatos), args.workers, not args.sem_graficos, args.cache))
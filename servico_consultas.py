@@ -0,0 +1,258 @@
+"""Serviço HTTP/JSON local com as estatísticas de gaps do dashboard.
+
+O conjunto de dados é carregado uma vez (pelo mesmo cache em disco do
+dashboard) e fica em memória; planilhas e outros programas consultam o
+serviço em vez de reler os arquivos. Os pedidos são atendidos em threads
+(``ThreadingHTTPServer``). Cada resposta leva um ``ETag`` derivado da versão
+dos dados (mtime das fontes): ``If-None-Match`` com esse ETag (lista separada
+por vírgulas, ETags fracos ``W/`` e ``*`` aceitos) devolve 304, e o corpo fica
+num cache LRU por URL até os dados mudarem. Versão, dataset e agregados são
+trocados juntos na recarga; cada pedido usa um único retrato deles. Um erro
+inesperado vira 500 com corpo JSON.
+
+Rotas (todas GET):
+
+- ``/versao``: versão dos dados, linhas e tickers;
+- ``/tickers``: lista de ativos;
+- ``/estatisticas?ticker=X[&dia=Segunda]``: % de cada tipo de gap por dia da semana;
+- ``/resumo_gap?ticker=X[&tipo_gap=Alta]``: média, quartis e bigodes por tipo de gap;
+- ``/frequencia?ticker=X[&dia=...][&tipo_gap=...]``: contagem por dia x tipo de gap;
+- ``/serie?ticker=X[&inicio=AAAA-MM-DD][&fim=...][&colunas=Close,Gap_%]``: barras diárias.
+
+Exemplo::
+
+    python servico_consultas.py --porta 8765
+    curl "http://127.0.0.1:8765/resumo_gap?ticker=WEGE3"
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import agregados_gaps
+from dataset_painel import DatasetPainel
+
+PORTA_PADRAO = 8765
+MAX_RESPOSTAS = 512
+INTERVALO_VERIFICACAO = 5.0  # segundos entre verificações da versão dos dados
+COLUNAS_SERIE = ["Date", "Open", "Close", "Volume", "Variação_%", "Gap_%", "Tipo_Gap", "Dia_Semana"]
+# Casas decimais por coluna em /serie (preços em centavos; as demais colunas float, 4 casas)
+CASAS_SERIE = {"Open": 2, "High": 2, "Low": 2, "Close": 2, "Adj Close": 2}
+
+# Retrato imutável dos dados servidos; trocado inteiro na recarga
+Retrato = namedtuple("Retrato", ["versao", "dados", "agregados"])
+
+
+class ErroConsulta(Exception):
+    """Erro do pedido, devolvido ao cliente com o status HTTP indicado."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _parametro(consulta, nome, obrigatorio=False):
+    valores = consulta.get(nome)
+    if not valores:
+        if obrigatorio:
+            raise ErroConsulta(400, f"parâmetro obrigatório: {nome}")
+        return None
+    return valores[0]
+
+
+def _filtrar(tabela, coluna, valor):
+    return tabela if valor is None else tabela[tabela[coluna].astype(str) == valor]
+
+
+def corresponde_etag(if_none_match, etag):
+    """``If-None-Match`` contém ``etag``? Aceita lista, ``W/`` (comparação fraca) e ``*``."""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato in ("*", etag):
+            return True
+    return False
+
+
+class Servico:
+    """Dados em memória, versão atual e cache de respostas."""
+
+    def __init__(self, carregar=None):
+        self._carregar = carregar or agregados_gaps.carregar_com_cache
+        self._trava = threading.Lock()
+        self._trava_recarga = threading.Lock()
+        self._respostas = OrderedDict()
+        self._verificado_em = 0.0
+        self.retrato = None
+        self._recarregar(agregados_gaps.versao_dados())
+
+    @property
+    def versao(self):
+        return self.retrato.versao
+
+    def _recarregar(self, versao):
+        # A carga roda fora da trava: os pedidos seguem no retrato anterior até a troca
+        df_all, agregados, _ = self._carregar()
+        retrato = Retrato(versao, DatasetPainel(df_all), agregados_gaps.indexar_por_ticker(agregados))
+        with self._trava:
+            self.retrato = retrato
+            self._respostas.clear()
+
+    def atualizar(self):
+        """Recarrega se as fontes mudaram (verificado no máximo a cada ``INTERVALO_VERIFICACAO``)."""
+        agora = time.monotonic()
+        with self._trava:
+            if agora - self._verificado_em < INTERVALO_VERIFICACAO:
+                return
+            self._verificado_em = agora
+        versao = agregados_gaps.versao_dados()
+        if versao == self.versao:
+            return
+        with self._trava_recarga:
+            if versao != self.versao:  # outra thread pode ter recarregado enquanto esperava
+                self._recarregar(versao)
+
+    @staticmethod
+    def etag(url, versao):
+        return '"' + hashlib.sha1(f"{versao}|{url}".encode()).hexdigest()[:20] + '"'
+
+    @staticmethod
+    def _ticker(retrato, consulta):
+        ticker = _parametro(consulta, "ticker", obrigatorio=True)
+        if ticker not in retrato.dados.indice:
+            raise ErroConsulta(404, f"ticker desconhecido: {ticker}")
+        return ticker
+
+    def consultar(self, rota, consulta, retrato=None):
+        """Resultado de uma rota como objeto serializável em JSON (sobre ``retrato``, padrão: o atual)."""
+        retrato = retrato or self.retrato
+        dados, agregados = retrato.dados, retrato.agregados
+        if rota == "/versao":
+            return {"versao": retrato.versao, "linhas": len(dados), "tickers": len(dados.indice)}
+        if rota == "/tickers":
+            return dados.tickers
+        if rota == "/estatisticas":
+            tabela = agregados_gaps.consultar(agregados["estatisticas"], self._ticker(retrato, consulta))
+            return _filtrar(tabela, "Dia_Semana", _parametro(consulta, "dia"))
+        if rota == "/resumo_gap":
+            tabela = agregados_gaps.consultar(agregados["resumo_gap"], self._ticker(retrato, consulta))
+            return _filtrar(tabela, "Tipo_Gap", _parametro(consulta, "tipo_gap"))
+        if rota == "/frequencia":
+            tabela = agregados_gaps.consultar(agregados["frequencia"], self._ticker(retrato, consulta))
+            tabela = _filtrar(tabela, "Dia_Semana", _parametro(consulta, "dia"))
+            return _filtrar(tabela, "Tipo_Gap", _parametro(consulta, "tipo_gap"))
+        if rota == "/serie":
+            return self._serie(retrato, consulta)
+        raise ErroConsulta(404, f"rota desconhecida: {rota}")
+
+    def _serie(self, retrato, consulta):
+        fatia = retrato.dados.fatia(self._ticker(retrato, consulta))
+        colunas = _parametro(consulta, "colunas")
+        colunas = colunas.split(",") if colunas else [c for c in COLUNAS_SERIE if c in fatia.columns]
+        faltando = [c for c in colunas if c not in fatia.columns]
+        if faltando:
+            raise ErroConsulta(400, f"colunas desconhecidas: {faltando}")
+        # Fatia já ordenada por data: o intervalo vira uma busca binária
+        datas = fatia["Date"]
+        try:
+            inicio = _parametro(consulta, "inicio")
+            fim = _parametro(consulta, "fim")
+            i = datas.searchsorted(pd.Timestamp(inicio)) if inicio else 0
+            f = datas.searchsorted(pd.Timestamp(fim), side="right") if fim else len(fatia)
+        except ValueError as e:
+            raise ErroConsulta(400, f"data inválida: {e}") from None
+        serie = fatia.iloc[i:f][["Date"] + [c for c in colunas if c != "Date"]]
+        # O DatasetPainel guarda float32 (61.44 viraria 61.4399986267 no JSON)
+        flutuantes = serie.select_dtypes("floating").columns
+        return (serie.astype({c: "float64" for c in flutuantes})
+                .round({c: CASAS_SERIE.get(c, 4) for c in flutuantes}))
+
+    def responder(self, url, if_none_match=None):
+        """``(status, corpo_bytes, etag)`` do pedido, usando o cache de respostas.
+
+        Com ``if_none_match`` contendo o ETag atual devolve 304 sem montar o corpo.
+        """
+        self.atualizar()
+        with self._trava:
+            retrato = self.retrato
+            etag = self.etag(url, retrato.versao)
+            if corresponde_etag(if_none_match, etag):
+                return 304, b"", etag
+            if url in self._respostas:
+                self._respostas.move_to_end(url)
+                return 200, self._respostas[url], etag
+        partes = urlsplit(url)
+        try:
+            resultado = self.consultar(partes.path.rstrip("/") or "/", parse_qs(partes.query), retrato)
+        except ErroConsulta as e:
+            return e.status, _erro_json(str(e)), None
+        if isinstance(resultado, pd.DataFrame):
+            corpo = resultado.to_json(orient="records", date_format="iso", force_ascii=False).encode()
+        else:
+            corpo = json.dumps(resultado, ensure_ascii=False).encode()
+        with self._trava:
+            if retrato is self.retrato:
+                self._respostas[url] = corpo
+                if len(self._respostas) > MAX_RESPOSTAS:
+                    self._respostas.popitem(last=False)
+        return 200, corpo, etag
+
+
+def _erro_json(mensagem):
+    return json.dumps({"erro": mensagem}, ensure_ascii=False).encode()
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=PORTA_PADRAO):
+    """``ThreadingHTTPServer`` (uma thread por pedido) ligado ao ``servico``."""
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            try:
+                status, corpo, etag = servico.responder(self.path, self.headers.get("If-None-Match"))
+            except Exception as e:  # qualquer falha inesperada vira 500 em JSON, sem derrubar a conexão
+                traceback.print_exc()
+                status, corpo, etag = 500, _erro_json(f"erro interno: {type(e).__name__}"), None
+            if status == 304:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            if etag is not None:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            pass  # sem log por pedido no terminal
+
+    return ThreadingHTTPServer((host, porta), Manipulador)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de consultas das estatísticas de gaps")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    args = parser.parse_args()
+
+    servidor = criar_servidor(Servico(), args.host, args.porta)
+    print(f"✅ Servindo em http://{args.host}:{args.porta}/ (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
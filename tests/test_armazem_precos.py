@@ -0,0 +1,56 @@
+import pandas as pd
+
+import armazem_precos
+
+
+def _barras(datas, fechamento):
+    return pd.DataFrame({"Date": pd.to_datetime(datas), "Open": fechamento, "High": fechamento,
+                         "Low": fechamento, "Close": fechamento, "Volume": [100] * len(datas)})
+
+
+def test_salvar_e_ler_ticker(tmp_path):
+    pasta = str(tmp_path)
+    # Fora de ordem e com Date no índice, como vem do yfinance
+    df = _barras(["2024-01-03", "2024-01-02"], [10.5, 10.0]).set_index("Date")
+    armazem_precos.salvar_ticker(df, "AAAA3", pasta)
+
+    lido = armazem_precos.ler_ticker("AAAA3", diretorio=pasta)
+    assert list(lido.columns) == armazem_precos.COLUNAS
+    assert list(lido["Date"]) == list(pd.to_datetime(["2024-01-02", "2024-01-03"]))
+    assert list(lido["Close"]) == [10.0, 10.5]
+    assert list(lido["Adj Close"]) == [10.0, 10.5]  # sem Adj Close, copia o Close
+    assert armazem_precos.existe_armazem(pasta)
+    assert armazem_precos.listar_tickers(pasta) == ["AAAA3"]
+
+
+def test_anexar_substitui_datas_repetidas(tmp_path):
+    pasta = str(tmp_path)
+    armazem_precos.anexar_ticker(_barras(["2024-01-02", "2024-01-03"], [10.0, 10.5]), "AAAA3", pasta)
+    armazem_precos.anexar_ticker(_barras(["2024-01-03", "2024-01-04"], [11.0, 11.5]), "AAAA3", pasta)
+
+    lido = armazem_precos.ler_ticker("AAAA3", diretorio=pasta)
+    assert list(lido["Date"]) == list(pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"]))
+    assert list(lido["Close"]) == [10.0, 11.0, 11.5]  # a barra nova vence
+
+
+def test_ultima_data(tmp_path):
+    pasta = str(tmp_path)
+    assert armazem_precos.ultima_data("AAAA3", pasta) is None
+    armazem_precos.salvar_ticker(_barras(["2024-01-05", "2024-01-02"], [10.0, 10.5]), "AAAA3", pasta)
+    assert armazem_precos.ultima_data("AAAA3", pasta) == pd.Timestamp("2024-01-05")
+
+
+def test_ler_todos_projeta_colunas_e_filtra_tickers(tmp_path):
+    pasta = str(tmp_path)
+    assert not armazem_precos.existe_armazem(pasta)
+    armazem_precos.salvar_ticker(_barras(["2024-01-02"], [10.0]), "BBBB3", pasta)
+    armazem_precos.salvar_ticker(_barras(["2024-01-02", "2024-01-03"], [20.0, 21.0]), "AAAA3", pasta)
+
+    todos = armazem_precos.ler_todos(colunas=["Date", "Close"], diretorio=pasta)
+    assert list(todos.columns) == ["Ticker", "Date", "Close"]
+    assert isinstance(todos["Ticker"].dtype, pd.CategoricalDtype)
+    assert list(todos["Ticker"].astype(str)) == ["AAAA3", "AAAA3", "BBBB3"]
+
+    um = armazem_precos.ler_todos(colunas=["Close"], tickers=["BBBB3"], diretorio=pasta)
+    assert list(um.columns) == ["Ticker", "Close"]
+    assert list(um["Close"]) == [10.0]
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+import backtest_gaps
+
+
+def _barras(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    abertura = close * (1 + rng.normal(0, 0.015, n))
+    return pd.DataFrame({"Date": pd.bdate_range("2020-01-01", periods=n), "Open": abertura,
+                         "High": np.maximum(abertura, close) * 1.01,
+                         "Low": np.minimum(abertura, close) * 0.99, "Close": close})
+
+
+def test_sem_barras_acima_do_limiar():
+    plano = _barras().assign(Open=50.0, High=50.0, Low=50.0, Close=50.0)
+    resumo, curvas = backtest_gaps.backtest_ticker(plano, (5.0,), stops=(None, 1.0), top_curvas=2)
+    assert len(resumo) == 2 * 2 * 2  # tipos x direções x stops
+    assert (resumo["Trades"] == 0).all()
+    assert resumo["Sharpe"].isna().all()
+    assert (curvas.to_numpy() == 0).all()
+
+
+def test_blocos_da_grade_nao_mudam_o_resultado(monkeypatch):
+    parametros = {"limiares": (0.5, 1.0, 2.0), "dias": (None, 0, 4), "stops": (None, 1.0),
+                  "alvos": (None, 2.0), "custo_pct": 0.05, "top_curvas": 3}
+    inteiro, curvas_inteiro = backtest_gaps.backtest_ticker(_barras(), **parametros)
+    monkeypatch.setattr(backtest_gaps, "CELULAS_POR_BLOCO", 100)
+    em_blocos, curvas_blocos = backtest_gaps.backtest_ticker(_barras(), **parametros)
+    pd.testing.assert_frame_equal(inteiro, em_blocos)
+    pd.testing.assert_frame_equal(curvas_inteiro, curvas_blocos)
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from baixar_diario_5anos_yfinance import atualizar_ticker
+from provedores_dados import ProvedorDados
+
+
+class ProvedorFalho(ProvedorDados):
+    """Levanta os erros da fila antes de devolver as barras."""
+
+    nome = "teste"
+
+    def __init__(self, erros):
+        self.erros = list(erros)
+        self.chamadas = 0
+
+    def baixar(self, ticker, inicio=None, fim=None):
+        self.chamadas += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return pd.DataFrame({"Date": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+                             "Open": [10.0, 10.5], "High": [11.0, 11.0], "Low": [9.5, 10.0],
+                             "Close": [10.5, 10.8], "Adj Close": [10.5, 10.8], "Volume": [100, 200]})
+
+
+def test_erro_de_rede_e_repetido(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    provedor = ProvedorFalho([ConnectionError("queda"), TimeoutError("lento")])
+    assert atualizar_ticker(provedor, "TEST3", completo=True, espera=0) == 2
+    assert provedor.chamadas == 3
+
+
+def test_erro_que_nao_e_de_rede_sobe_sem_repetir():
+    provedor = ProvedorFalho([FileNotFoundError("sem arquivo")])
+    with pytest.raises(FileNotFoundError):
+        atualizar_ticker(provedor, "TEST3", completo=True, espera=0)
+    assert provedor.chamadas == 1
+
+
+def test_sem_tentativas_ainda_baixa_uma_vez(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    provedor = ProvedorFalho([])
+    assert atualizar_ticker(provedor, "TEST3", completo=True, tentativas=0, espera=0) == 2
+    assert provedor.chamadas == 1
+
+
+def test_provedor_sem_baixar_nao_instancia():
+    class Incompleto(ProvedorDados):
+        pass
+
+    with pytest.raises(TypeError):
+        Incompleto()
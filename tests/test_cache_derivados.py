@@ -0,0 +1,63 @@
+import os
+
+import cache_derivados
+
+
+def _fonte(tmp_path, conteudo):
+    caminho = tmp_path / "fonte.csv"
+    caminho.write_text(conteudo)
+    return str(caminho)
+
+
+def test_fonte_regravada_ou_parametros_novos_invalidam(tmp_path):
+    diretorio = str(tmp_path / "cache")
+    fonte = _fonte(tmp_path, "a,b\n1,2\n")
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return len(chamadas)
+
+    assert cache_derivados.obter("x", [fonte], calcular, {"limiar": 1}, diretorio=diretorio) == (1, False)
+    assert cache_derivados.obter("x", [fonte], calcular, {"limiar": 1}, diretorio=diretorio) == (1, True)
+    assert cache_derivados.obter("x", [fonte], calcular, {"limiar": 2}, diretorio=diretorio) == (2, False)
+
+    _fonte(tmp_path, "a,b\n1,2\n3,4\n")
+    assert cache_derivados.obter("x", [fonte], calcular, {"limiar": 1}, diretorio=diretorio) == (3, False)
+
+    # Por conteúdo: regravar os mesmos bytes com outro mtime mantém a chave
+    antes = cache_derivados.chave("x", [fonte], conteudo=True)
+    os.utime(fonte, ns=(1, 1))
+    assert cache_derivados.chave("x", [fonte], conteudo=True) == antes
+    assert cache_derivados.chave("x", [fonte]) != cache_derivados.chave("x", [fonte], conteudo=True)
+
+
+def test_gravacao_atomica_substitui_sem_deixar_temporarios(tmp_path):
+    diretorio = str(tmp_path)
+    destino = cache_derivados.gravar("k", {"v": 1}, diretorio)
+    assert cache_derivados.gravar("k", {"v": 2}, diretorio) == destino
+    assert cache_derivados.ler("k", diretorio) == {"v": 2}
+    assert os.listdir(diretorio) == ["k" + cache_derivados.EXTENSAO]
+
+    # Escrita de outro processo em andamento não conta como entrada nem é limpa
+    (tmp_path / ".k.123.abc.tmp").write_bytes(b"parcial")
+    assert cache_derivados.resumo(diretorio)["entradas"] == 1
+    cache_derivados.limpar(diretorio)
+    assert os.listdir(diretorio) == [".k.123.abc.tmp"]
+
+    # Arquivo truncado vira miss
+    (tmp_path / ("t" + cache_derivados.EXTENSAO)).write_bytes(b"")
+    assert cache_derivados.ler("t", diretorio) is None
+
+
+def test_evictar_remove_as_menos_usadas(tmp_path):
+    diretorio = str(tmp_path)
+    for i, nome in enumerate(("a", "b", "c")):
+        caminho = cache_derivados.gravar(nome, b"x" * 1000, diretorio)
+        os.utime(caminho, (1000 + i, 1000 + i))
+    assert cache_derivados.ler("a", diretorio) is not None  # acerto renova o mtime de "a"
+
+    tamanho = os.path.getsize(cache_derivados._caminho("a", diretorio))
+    assert cache_derivados.evictar(limite_mb=2 * tamanho / 1e6, diretorio=diretorio) == 1
+    restantes = sorted(os.listdir(diretorio))
+    assert restantes == ["a" + cache_derivados.EXTENSAO, "c" + cache_derivados.EXTENSAO]
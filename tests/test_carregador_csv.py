@@ -0,0 +1,22 @@
+import pandas as pd
+
+from carregador_csv import carregar_diarios
+
+
+def test_arquivo_corrompido_vira_falha_sem_derrubar_os_demais(tmp_path):
+    valido = tmp_path / "AAAA3_diario_5anos.csv"
+    pd.DataFrame({"Date": pd.bdate_range("2024-01-02", periods=4),
+                  "Open": [10.0, 10.4, 9.8, 9.95], "Close": [10.2, 10.0, 9.9, 10.3],
+                  "Volume": [100] * 4}).to_csv(valido, index=False)
+    corrompido = tmp_path / "BBBB3_diario_5anos.csv"
+    corrompido.write_text("Date;Preco\n\x00\x01lixo\n")
+
+    df, falhas = carregar_diarios([str(valido), str(corrompido)])
+
+    assert list(falhas) == [str(corrompido)]
+    assert "Close" in falhas[str(corrompido)]
+    assert list(df["Ticker"].astype(str).unique()) == ["AAAA3"]
+    assert list(df["Dia_Semana"].astype(str)) == ["Terça", "Quarta", "Quinta", "Sexta"]
+    assert isinstance(df["Dia_Semana"].dtype, pd.CategoricalDtype)
+    # Gap de abertura contra o fechamento anterior: +1,96% e -2% passam do limiar de 1%, +0,5% não
+    assert list(df["Tipo_Gap"].astype(str)) == ["Sem Gap", "Alta", "Baixa", "Sem Gap"]
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from dados_graficos import reduzir_curvas, reduzir_serie
+
+
+def _serie(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"Date": pd.date_range("2000-01-03", periods=n, freq="B"),
+                         "Close": 50 + np.cumsum(rng.standard_normal(n))})
+
+
+def test_lttb_mantem_extremos_e_limita_pontos():
+    df = _serie(5000)
+    reduzida = reduzir_serie(df, "Date", "Close", pontos=300)
+    assert len(reduzida) == 300
+    assert reduzida.index[0] == 0 and reduzida.index[-1] == len(df) - 1
+    assert reduzida["Date"].is_monotonic_increasing
+
+
+def test_serie_curta_fica_inteira():
+    df = _serie(100)
+    assert reduzir_serie(df, "Date", "Close", pontos=300) is df
+
+
+def test_minmax_preserva_minimo_e_maximo():
+    df = _serie(5000)
+    reduzida = reduzir_serie(df, "Date", "Close", pontos=200, metodo="minmax")
+    assert len(reduzida) <= 202
+    assert reduzida["Close"].min() == df["Close"].min()
+    assert reduzida["Close"].max() == df["Close"].max()
+    curvas = reduzir_curvas(df.set_index("Date").rename(columns={"Close": 0}), pontos=200)
+    assert curvas[0].max() == df["Close"].max()
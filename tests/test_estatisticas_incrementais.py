@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import agregados_gaps
+import gerar_dados_simulados
+import estatisticas_incrementais
+from estatisticas_incrementais import EstatisticasIncrementais
+
+CONSULTAS = ({"janela": 20}, {"janela": 250}, {"regime": "Alta"}, {}, {"regime": "Normal", "por_dia": True})
+
+
+@pytest.fixture
+def base():
+    df = gerar_dados_simulados.gerar_barras(np.random.default_rng(7), n_ativos=3, n_dias=600)
+    return agregados_gaps.derivar_colunas(df[["Ticker", "Date", "Open", "Close"]].copy())
+
+
+def _mesmos_resumos(a, b):
+    for ticker in a.tickers:
+        for consulta in CONSULTAS:
+            pd.testing.assert_frame_equal(a.resumo(ticker, **consulta), b.resumo(ticker, **consulta),
+                                          check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+def test_atualizacao_incremental_igual_a_reconstrucao(base):
+    datas = np.sort(base["Date"].unique())
+    incremental = EstatisticasIncrementais()
+    for corte in (datas[100], datas[101], datas[400], datas[-1]):
+        incremental.atualizar(base[base["Date"] <= corte])
+    completo = EstatisticasIncrementais()
+    assert completo.atualizar(base) == len(base)
+    _mesmos_resumos(incremental, completo)
+
+
+def test_historico_alterado_refaz_o_ticker(base):
+    estado = EstatisticasIncrementais()
+    estado.atualizar(base)
+    revisada = base.copy()
+    ticker = revisada["Ticker"].iloc[0]
+    linha = revisada.index[revisada["Ticker"] == ticker][50]
+    revisada.loc[linha, "Variação_%"] += 5.0  # barra antiga substituída
+
+    assert estado.atualizar(revisada) == int((revisada["Ticker"] == ticker).sum())
+    completo = EstatisticasIncrementais()
+    completo.atualizar(revisada)
+    _mesmos_resumos(estado, completo)
+
+
+def test_estado_gravado_e_carregado(base, tmp_path):
+    estado = EstatisticasIncrementais()
+    estado.atualizar(base)
+    caminho = str(tmp_path / "estado.npz")
+    estado.salvar(caminho)
+    carregado = EstatisticasIncrementais.carregar(caminho)
+    assert carregado.atualizar(base) == 0
+    _mesmos_resumos(estado, carregado)
+
+
+def test_atualizar_estado_grava_a_versao_dos_dados(base, tmp_path):
+    caminho = str(tmp_path / "estado.npz")
+    antigo = base[base["Date"] <= np.sort(base["Date"].unique())[300]]
+    estatisticas_incrementais.atualizar_estado(antigo, caminho, versao=1.0)
+    assert EstatisticasIncrementais.carregar(caminho).versao_dados == 1.0
+
+    estado = estatisticas_incrementais.atualizar_estado(base, caminho, versao=2.0)
+    carregado = EstatisticasIncrementais.carregar(caminho)
+    assert carregado.versao_dados == 2.0
+    _mesmos_resumos(estado, carregado)
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from gerar_dados_simulados import INICIO_PADRAO, gerar_barras, gerar_sessoes_intradiarias
+
+
+def test_ohlc_consistente_e_variacao_do_close_final():
+    # Volatilidade alta leva vários caminhos ao piso de preço
+    df = gerar_barras(np.random.default_rng(0), n_ativos=5, n_dias=500, regimes=(0.08,))
+    assert (df["High"] >= df[["Open", "Close"]].max(axis=1)).all()
+    assert (df["Low"] <= df[["Open", "Close"]].min(axis=1)).all()
+    assert (df["Low"] > 0).all()
+
+    esperado = (df.groupby("Ticker", observed=True)["Close"].pct_change() * 100).fillna(0).round(2)
+    pd.testing.assert_series_equal(df["Variação_%"], esperado, check_names=False)
+
+
+def test_mesma_semente_mesmos_dados():
+    a = gerar_barras(np.random.default_rng(1), n_ativos=2, n_dias=30)
+    b = gerar_barras(np.random.default_rng(1), n_ativos=2, n_dias=30)
+    pd.testing.assert_frame_equal(a, b)
+    assert a["Date"].min() == pd.Timestamp(INICIO_PADRAO)
+
+    sessoes = next(gerar_sessoes_intradiarias(np.random.default_rng(1), n_dias=2, minutos=3))
+    assert sessoes["Date"].iloc[0] == pd.Timestamp(INICIO_PADRAO) + pd.Timedelta("10:00:00")
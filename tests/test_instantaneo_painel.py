@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+import pytest
+
+import agregados_gaps
+import instantaneo_painel
+from dataset_painel import DatasetPainel
+
+
+def _base():
+    df = pd.DataFrame({"Ticker": ["AAAA3"] * 3 + ["BBBB4"] * 3,
+                       "Date": list(pd.date_range("2024-01-02", periods=3)) * 2,
+                       "Open": [10.0, 10.2, 10.1, 20.0, 20.5, 19.8],
+                       "Close": [10.1, 10.0, 10.3, 20.2, 20.1, 20.4],
+                       "Volume": [100] * 6})
+    df = agregados_gaps.derivar_colunas(df)
+    return DatasetPainel(df), agregados_gaps.construir_agregados(df)
+
+
+def test_regravar_com_o_instantaneo_mapeado(tmp_path):
+    dados, agregados = _base()
+    diretorio = str(tmp_path)
+    instantaneo_painel.salvar(dados, agregados, 1.0, diretorio)
+    mapeado, _ = instantaneo_painel.carregar(1.0, diretorio)
+
+    # Nova gravação com o anterior ainda mapeado: outra subpasta, nada sobrescrito
+    instantaneo_painel.salvar(dados, agregados, 2.0, diretorio)
+    assert mapeado.fatia("AAAA3")["Close"].tolist() == pytest.approx([10.1, 10.0, 10.3])
+    assert instantaneo_painel.carregar(1.0, diretorio) is None
+    novo, _ = instantaneo_painel.carregar(2.0, diretorio)
+    assert len(novo.fatia("BBBB4")) == 3
+    assert len([n for n in os.listdir(diretorio) if os.path.isdir(tmp_path / n)]) == 1
+
+
+def test_parametros_da_analise_invalidam_o_instantaneo(tmp_path, monkeypatch):
+    dados, agregados = _base()
+    instantaneo_painel.salvar(dados, agregados, 1.0, str(tmp_path))
+    monkeypatch.setattr(agregados_gaps, "MAX_OUTLIERS", agregados_gaps.MAX_OUTLIERS + 1)
+    assert instantaneo_painel.carregar(1.0, str(tmp_path)) is None
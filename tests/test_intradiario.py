@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import intradiario
+from gerar_dados_simulados import gerar_sessoes_intradiarias
+
+
+def _minutos(n_dias):
+    return pd.concat(gerar_sessoes_intradiarias(np.random.default_rng(1), n_dias=n_dias, minutos=60),
+                     ignore_index=True)
+
+
+def test_erro_no_meio_do_arquivo_nao_deixa_temporario(tmp_path):
+    diretorio = str(tmp_path / "saida")
+    bom = tmp_path / "TEST3_1min.csv"
+    _minutos(3).to_csv(bom, index=False)
+    assert intradiario.processar_arquivo(str(bom), "TEST3", tamanho_bloco=50, diretorio=diretorio) == 3
+    antes = intradiario.ler_metricas("TEST3", diretorio=diretorio)
+
+    # Segundo bloco volta no tempo: erro depois de os gravadores já terem escrito
+    df = _minutos(4)
+    df = pd.concat([df.iloc[:120], df.iloc[:60]], ignore_index=True)
+    ruim = tmp_path / "ruim.csv"
+    df.to_csv(ruim, index=False)
+    with pytest.raises(ValueError, match="ordem cronológica"):
+        intradiario.processar_arquivo(str(ruim), "TEST3", tamanho_bloco=100, diretorio=diretorio)
+
+    assert [f for _, _, arquivos in os.walk(diretorio) for f in arquivos if f.endswith(".tmp")] == []
+    pd.testing.assert_frame_equal(intradiario.ler_metricas("TEST3", diretorio=diretorio), antes)
+
+
+def test_arquivo_sem_linhas_remove_as_particoes(tmp_path):
+    diretorio = str(tmp_path / "saida")
+    cheio = tmp_path / "TEST3_1min.csv"
+    _minutos(2).to_csv(cheio, index=False)
+    intradiario.processar_arquivo(str(cheio), "TEST3", diretorio=diretorio)
+
+    vazio = tmp_path / "vazio.csv"
+    _minutos(1).iloc[:0].to_csv(vazio, index=False)
+    assert intradiario.processar_arquivo(str(vazio), "TEST3", diretorio=diretorio) == 0
+
+    assert [f for _, _, arquivos in os.walk(diretorio) for f in arquivos] == []
+    with pytest.raises(FileNotFoundError):
+        intradiario.ler_metricas("TEST3", diretorio=diretorio)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import gerar_dados_simulados
+from motor_gaps import calcular_gaps, varrer_limiares
+
+LIMIARES = [0.5, 1.0, 2.0, 3.0]
+
+
+@pytest.fixture
+def barras():
+    df = gerar_dados_simulados.gerar_barras(np.random.default_rng(3), n_ativos=3, n_dias=120)
+    # Ordem embaralhada: calcular_gaps ordena por (Ticker, Date) e mantém o índice
+    return df[["Ticker", "Date", "Open", "High", "Low", "Close"]].sample(frac=1, random_state=0)
+
+
+def _gaps_ingenuos(df, janela=14):
+    df = df.sort_values(["Ticker", "Date"])
+    anterior = df.groupby("Ticker")["Close"].shift()
+    tr = pd.concat([df["High"] - df["Low"], (df["High"] - anterior).abs(),
+                    (df["Low"] - anterior).abs()], axis=1).max(axis=1)
+    atr = tr.groupby(df["Ticker"]).transform(lambda s: s.rolling(janela).mean())
+    atr_anterior = atr.groupby(df["Ticker"]).shift()
+    gap = (df["Open"] / anterior - 1) * 100
+    preenchido = ((gap > 0) & (df["Low"] <= anterior)) | ((gap < 0) & (df["High"] >= anterior))
+    return pd.DataFrame({"Fech_Anterior": anterior, "Gap_%": gap,
+                         "ATR_%": atr_anterior / anterior * 100,
+                         "Gap_ATR": (df["Open"] - anterior) / atr_anterior,
+                         "Gap_Preenchido": preenchido})
+
+
+def test_calcular_gaps_igual_a_groupby(barras):
+    gaps = calcular_gaps(barras)
+    esperado = _gaps_ingenuos(barras)
+    pd.testing.assert_frame_equal(gaps[esperado.columns], esperado, check_exact=False, rtol=1e-9)
+    assert gaps["Preenchimento_%"].dropna().between(0, 100).all()
+
+
+def test_varrer_limiares_igual_a_contagem_por_limiar(barras):
+    gaps = calcular_gaps(barras)
+    tickers = barras.loc[gaps.index, "Ticker"]
+    resultado = varrer_limiares(tickers, gaps["Gap_%"], LIMIARES, gaps["Gap_Preenchido"]).set_index(
+        ["Ticker", "Limiar"])
+
+    validos = gaps.assign(Ticker=tickers).dropna(subset=["Gap_%"])
+    for (ticker, limiar), linha in resultado.iterrows():
+        grupo = validos[validos["Ticker"] == ticker]
+        alta = grupo[grupo["Gap_%"] > limiar]
+        baixa = grupo[grupo["Gap_%"] < -limiar]
+        assert linha["Gaps_Alta"] == len(alta)
+        assert linha["Gaps_Baixa"] == len(baixa)
+        assert linha["Sem_Gap"] == len(grupo) - len(alta) - len(baixa)
+        if len(alta):
+            assert linha["Preench_Alta_%"] == pytest.approx(alta["Gap_Preenchido"].mean() * 100)
+        if len(baixa):
+            assert linha["Preench_Baixa_%"] == pytest.approx(baixa["Gap_Preenchido"].mean() * 100)
@@ -0,0 +1,73 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import agregados_gaps
+import servico_consultas
+from servico_consultas import Servico, corresponde_etag, criar_servidor
+
+
+def _carregar():
+    df = pd.DataFrame({"Ticker": ["AAAA3"] * 4,
+                       "Date": pd.date_range("2024-01-02", periods=4),
+                       "Open": [10.0, 10.3, 10.1, 10.6], "Close": [10.2, 10.0, 10.4, 10.5],
+                       "Volume": [100] * 4})
+    df = agregados_gaps.derivar_colunas(df)
+    return df, agregados_gaps.construir_agregados(df), []
+
+
+@pytest.fixture
+def servico(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # versão dos dados fixa: nenhuma fonte na pasta
+    return Servico(carregar=_carregar)
+
+
+def test_etag_com_lista_e_etag_fraco(servico):
+    status, corpo, etag = servico.responder("/resumo_gap?ticker=AAAA3")
+    assert status == 200 and json.loads(corpo)
+    assert servico.responder("/resumo_gap?ticker=AAAA3", etag)[0] == 304
+    assert servico.responder("/resumo_gap?ticker=AAAA3", f'"outro", W/{etag}')[0] == 304
+    assert servico.responder("/resumo_gap?ticker=AAAA3", '"outro"')[0] == 200
+    assert corresponde_etag("*", etag)
+    assert not corresponde_etag(None, etag)
+
+
+def test_erros_do_pedido(servico):
+    status, corpo, etag = servico.responder("/resumo_gap?ticker=XXXX3")
+    assert status == 404 and etag is None
+    assert "XXXX3" in json.loads(corpo)["erro"]
+    assert servico.responder("/serie")[0] == 400
+
+
+def test_serie_sem_ruido_de_float32(servico):
+    status, corpo, _ = servico.responder("/serie?ticker=AAAA3&colunas=Open,Close,Variação_%")
+    assert status == 200
+    serie = json.loads(corpo)
+    assert [linha["Open"] for linha in serie] == [10.0, 10.3, 10.1, 10.6]
+    assert [linha["Close"] for linha in serie] == [10.2, 10.0, 10.4, 10.5]
+    assert serie[1]["Variação_%"] == round((10.0 - 10.2) / 10.2 * 100, 4)
+
+
+def test_erro_inesperado_vira_500_em_json(servico, monkeypatch):
+    def falhar(*args, **kwargs):
+        raise RuntimeError("quebrou")
+
+    monkeypatch.setattr(servico_consultas.traceback, "print_exc", lambda: None)
+    servidor = criar_servidor(servico, porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+        with urllib.request.urlopen(url + "/tickers") as resposta:
+            assert json.loads(resposta.read()) == ["AAAA3"]
+        monkeypatch.setattr(servico, "consultar", falhar)
+        with pytest.raises(urllib.error.HTTPError) as erro:
+            urllib.request.urlopen(url + "/versao")
+        assert erro.value.code == 500
+        assert json.loads(erro.value.read())["erro"] == "erro interno: RuntimeError"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from validacao_dados import calendario_b3, validar
+
+
+def _barras(fechamentos, volumes, ticker="TEST3"):
+    datas = calendario_b3("2024-03-01", "2024-06-28")[:len(fechamentos)]
+    fech = np.asarray(fechamentos, dtype=np.float64)
+    return pd.DataFrame({"Ticker": ticker, "Date": datas, "Open": fech, "High": fech * 1.01,
+                         "Low": fech * 0.99, "Close": fech, "Adj Close": fech, "Volume": volumes})
+
+
+def test_split_confirmado_pelo_volume_reajusta_o_historico():
+    # Desdobramento 1:2 não ajustado: preço cai à metade e o volume dobra
+    df = _barras([20.0] * 15 + [10.0] * 15, [1000] * 15 + [2000] * 15)
+    limpo, relatorio = validar(df)
+    assert relatorio.loc["TEST3", "Splits_Ajustados"] == 1
+    assert relatorio.loc["TEST3", "Splits_Suspeitos"] == 0
+    assert limpo["Close"].to_numpy() == pytest.approx([10.0] * 30)
+    assert limpo["Volume"].tolist() == [2000] * 30
+
+
+def test_queda_sem_confirmacao_so_e_reportada():
+    # Tombo de 50% com volume estável: pode ser um evento real, não se reescreve nada
+    df = _barras([20.0] * 15 + [10.0] * 15, [1000] * 30)
+    limpo, relatorio = validar(df)
+    assert relatorio.loc["TEST3", "Splits_Ajustados"] == 0
+    assert relatorio.loc["TEST3", "Splits_Suspeitos"] == 1
+    assert relatorio.loc["TEST3", "Alteradas"] == 0
+    assert limpo["Close"].tolist() == df["Close"].tolist()
+
+
+def test_split_confirmado_pela_lista_de_eventos():
+    df = _barras([20.0] * 15 + [10.0] * 15, [1000] * 30)
+    eventos = pd.DataFrame({"Ticker": ["TEST3"], "Date": [df["Date"].iloc[15]]})
+    limpo, relatorio = validar(df, eventos=eventos)
+    assert relatorio.loc["TEST3", "Splits_Ajustados"] == 1
+    assert limpo["Close"].to_numpy() == pytest.approx([10.0] * 30)
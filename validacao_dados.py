@@ -0,0 +1,261 @@
+"""Validação e reparo das barras diárias antes da análise.
+
+Roda numa única passada vetorizada sobre todos os ativos (linhas ordenadas
+por Ticker/Date, sem laço por ticker) e devolve o quadro limpo mais um
+relatório de qualidade por ativo. Etapas:
+
+- achata o layout do ``yf.download`` (colunas MultiIndex Preço x Ticker);
+- remove datas duplicadas (fica a última), datas fora do calendário da B3
+  (fins de semana e feriados) e pregões sem negociação (volume zero e
+  máxima = mínima, como o yfinance preenche feriados);
+- remove barras com preço ausente ou não positivo e corrige High/Low que não
+  contêm Open/Close;
+- detecta saltos: os que batem com um desdobramento/grupamento não ajustado
+  (razão próxima de k ou 1/k) só têm o histórico anterior reajustado se forem
+  confirmados, pelo volume (média geométrica dos pregões seguintes contra a
+  dos anteriores variando no sentido inverso, pelo mesmo fator) ou pela lista
+  de eventos corporativos (``eventos_corporativos.csv``: ``Ticker, Date`` do
+  primeiro pregão com o preço novo). Os não confirmados e os demais saltos
+  acima de ``limite_salto`` só entram no relatório.
+
+``validar_armazem()`` aplica tudo ao armazém Parquet e regrava só os tickers
+alterados; o downloader chama essa etapa após cada atualização.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import armazem_precos
+
+ARQUIVO_RELATORIO = "qualidade_dados.json"
+ARQUIVO_EVENTOS = "eventos_corporativos.csv"
+PRECOS = ["Open", "High", "Low", "Close", "Adj Close"]
+FATORES_SPLIT = np.array([2, 3, 4, 5, 8, 10, 20, 50, 100], dtype=np.float64)
+TOLERANCIA_SPLIT = 0.03
+LIMITE_SALTO = 0.30  # variação absoluta fechamento a fechamento
+# Confirmação de split pelo volume: pregões de cada lado e desvio tolerado (em log)
+JANELA_VOLUME = 10
+TOLERANCIA_VOLUME = 0.5
+
+# Feriados fixos da B3 (mês, dia); 24/12 e 31/12 não têm pregão
+_FERIADOS_FIXOS = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 24), (12, 25), (12, 31)]
+# Feriados de São Paulo em que a B3 fechou até 2021
+_FERIADOS_SP = [(1, 25), (7, 9), (11, 20)]
+# Deslocamentos em dias a partir da Páscoa: Carnaval (seg/ter), Sexta-feira Santa, Corpus Christi
+_MOVEIS = [-48, -47, -2, 60]
+
+
+def _pascoa(anos):
+    """Domingo de Páscoa de cada ano (algoritmo de Meeus/Jones/Butcher)."""
+    a = anos % 19
+    b, c = anos // 100, anos % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    mes = (h + l - 7 * m + 90) // 25
+    dia = (h + l - 7 * m + 33 * mes + 19) % 32
+    return pd.to_datetime(pd.DataFrame({"year": anos, "month": mes, "day": dia}))
+
+
+def feriados_b3(anos):
+    """Datas sem pregão na B3 (além dos fins de semana) para os ``anos`` pedidos."""
+    anos = np.asarray(sorted(set(anos)), dtype=np.int64)
+    datas = [pd.to_datetime(pd.DataFrame({"year": anos, "month": m, "day": d})) for m, d in _FERIADOS_FIXOS]
+    antigos = anos[anos <= 2021]
+    datas += [pd.to_datetime(pd.DataFrame({"year": antigos, "month": m, "day": d})) for m, d in _FERIADOS_SP]
+    recentes = anos[anos >= 2024]  # Consciência Negra virou feriado nacional
+    datas.append(pd.to_datetime(pd.DataFrame({"year": recentes, "month": 11, "day": 20})))
+    pascoa = _pascoa(anos)
+    datas += [pascoa + pd.Timedelta(days=d) for d in _MOVEIS]
+    return pd.DatetimeIndex(pd.concat(datas, ignore_index=True)).unique().sort_values()
+
+
+def calendario_b3(inicio, fim):
+    """Dias de pregão da B3 entre ``inicio`` e ``fim`` (inclusivos)."""
+    inicio, fim = pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize()
+    uteis = pd.bdate_range(inicio, fim)
+    return uteis[~uteis.isin(feriados_b3(range(inicio.year, fim.year + 1)))]
+
+
+def achatar_yfinance(df):
+    """Converte a saída do ``yf.download`` para o formato longo ``Ticker, Date, ...``.
+
+    Aceita colunas MultiIndex (Preço x Ticker, de downloads com vários ativos)
+    ou simples; o sufixo ``.SA`` é removido dos tickers.
+    """
+    if not isinstance(df.columns, pd.MultiIndex):
+        return df
+    nivel_ticker = 1 if set(df.columns.get_level_values(0)) & set(PRECOS + ["Volume"]) else 0
+    longo = df.stack(level=nivel_ticker, future_stack=True).dropna(how="all")
+    longo.index.names = ["Date", "Ticker"]
+    longo = longo.reset_index()
+    longo["Ticker"] = longo["Ticker"].astype(str).str.replace(r"\.SA$", "", regex=True)
+    longo.columns.name = None
+    return longo
+
+
+def _contar(tickers, mascara, n_tickers):
+    return np.bincount(tickers[mascara], minlength=n_tickers)
+
+
+def _confirmado_por_volume(volume, codigos, inicio, razao, janela=JANELA_VOLUME,
+                           tolerancia=TOLERANCIA_VOLUME):
+    """Linhas em que o volume médio (geométrico) muda na razão inversa do preço."""
+    posicao = np.arange(len(volume))
+    acumulado = np.concatenate(([0.0], np.cumsum(np.log(np.maximum(volume, 1)))))
+    primeira = np.maximum.accumulate(np.where(inicio, posicao, 0))
+    fim = np.cumsum(np.bincount(codigos))[codigos] if len(codigos) else posicao
+    a = np.maximum(posicao - janela, primeira)
+    b = np.minimum(posicao + janela, fim)
+    antes = (acumulado[posicao] - acumulado[a]) / np.maximum(posicao - a, 1)
+    depois = (acumulado[b] - acumulado[posicao]) / np.maximum(b - posicao, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (posicao > a) & (b > posicao) & (np.abs(depois - antes + np.log(razao)) < tolerancia)
+
+
+def ler_eventos(caminho=ARQUIVO_EVENTOS):
+    """Lista de eventos corporativos (``Ticker, Date``), ou ``None`` se não houver arquivo."""
+    if not os.path.exists(caminho):
+        return None
+    return pd.read_csv(caminho, parse_dates=["Date"])
+
+
+def validar(df, limite_salto=LIMITE_SALTO, tolerancia_split=TOLERANCIA_SPLIT, eventos=None):
+    """Valida e repara ``df`` (``Ticker, Date`` + colunas de preço/volume).
+
+    ``eventos`` (``Ticker, Date``) confirma splits além do volume. Devolve
+    ``(df_limpo, relatorio)``; ``relatorio`` tem uma linha por ativo com a
+    contagem de cada problema encontrado.
+    """
+    df = achatar_yfinance(df)
+    datas = pd.to_datetime(df["Date"])
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    df = df.assign(Date=datas.dt.normalize())
+    df = df.sort_values(["Ticker", "Date"], kind="stable").reset_index(drop=True)
+    codigos, nomes = pd.factorize(df["Ticker"].astype(str), sort=True)
+    n = len(nomes)
+    relatorio = pd.DataFrame({"Linhas_Originais": np.bincount(codigos, minlength=n)},
+                             index=pd.Index(nomes, name="Ticker"))
+
+    precos = [c for c in PRECOS if c in df.columns]
+    for col in precos + (["Volume"] if "Volume" in df.columns else []):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    datas = df["Date"].to_numpy("datetime64[ns]")
+    duplicada = np.zeros(len(df), dtype=bool)
+    duplicada[:-1] = (codigos[:-1] == codigos[1:]) & (datas[:-1] == datas[1:])  # fica a última
+    if len(df):
+        calendario = calendario_b3(df["Date"].min(), df["Date"].max())
+    else:
+        calendario = pd.DatetimeIndex([])
+    volume = df["Volume"].to_numpy(np.float64) if "Volume" in df.columns else np.ones(len(df))
+    # Feriado da tabela em que a maioria dos ativos negociou conta como pregão
+    negociado = pd.Series(volume > 0).groupby(df["Date"]).transform("mean").to_numpy() > 0.5
+    util = (df["Date"].dt.dayofweek < 5).to_numpy()
+    fora = ~df["Date"].isin(calendario).to_numpy() & ~(negociado & util)
+    if {"High", "Low"} <= set(df.columns):
+        sem_faixa = (df["High"] == df["Low"]).to_numpy()
+    else:
+        sem_faixa = np.ones(len(df), dtype=bool)
+    sem_negociacao = (volume == 0) & sem_faixa & ~fora
+    valores = df[precos].to_numpy(np.float64)
+    invalido = ~(valores[:, precos.index("Close")] > 0) if "Close" in precos else np.zeros(len(df), bool)
+
+    remover = duplicada | fora | sem_negociacao | invalido
+    relatorio["Duplicadas"] = _contar(codigos, duplicada, n)
+    relatorio["Fora_Calendario"] = _contar(codigos, fora & ~duplicada, n)
+    relatorio["Sem_Negociacao"] = _contar(codigos, sem_negociacao & ~duplicada, n)
+    relatorio["Precos_Invalidos"] = _contar(codigos, invalido & ~(duplicada | fora | sem_negociacao), n)
+    df = df.loc[~remover].reset_index(drop=True)
+    codigos = codigos[~remover]
+
+    # Máxima/mínima precisam conter abertura e fechamento
+    corrigidas = np.zeros(len(df), dtype=bool)
+    if {"Open", "High", "Low", "Close"} <= set(df.columns):
+        corpo_max = np.fmax(df["Open"].to_numpy(np.float64), df["Close"].to_numpy(np.float64))
+        corpo_min = np.fmin(df["Open"].to_numpy(np.float64), df["Close"].to_numpy(np.float64))
+        alta, baixa = df["High"].to_numpy(np.float64), df["Low"].to_numpy(np.float64)
+        corrigidas = (alta < corpo_max) | (baixa > corpo_min)
+        df["High"] = np.fmax(alta, corpo_max)
+        df["Low"] = np.fmin(baixa, corpo_min)
+    relatorio["OHLC_Corrigidas"] = _contar(codigos, corrigidas, n)
+
+    # Saltos fechamento a fechamento dentro do mesmo ticker
+    fech = df["Close"].to_numpy(np.float64) if "Close" in df.columns else np.ones(len(df))
+    inicio = np.ones(len(df), dtype=bool)
+    inicio[1:] = codigos[1:] != codigos[:-1]
+    anterior = np.empty(len(df))
+    anterior[1:] = fech[:-1]
+    anterior[inicio] = np.nan
+    razao = fech / anterior
+    # Razão próxima de 1/k (desdobramento) ou k (grupamento)
+    candidatos = np.concatenate([1 / FATORES_SPLIT, FATORES_SPLIT])
+    erro = np.abs(razao[:, None] / candidatos[None, :] - 1)
+    melhor = np.argmin(np.where(np.isnan(erro), np.inf, erro), axis=1) if len(df) else np.array([], int)
+    candidato = ~np.isnan(razao) & (erro[np.arange(len(df)), melhor] < tolerancia_split)
+    # Só um split confirmado reescreve o histórico; um tombo de ~50% real fica como está
+    confirmado = np.zeros(len(df), dtype=bool)
+    if "Volume" in df.columns:
+        confirmado = _confirmado_por_volume(df["Volume"].to_numpy(np.float64), codigos, inicio, razao)
+    if eventos is not None and len(eventos):
+        chaves = pd.MultiIndex.from_arrays([df["Ticker"].astype(str), df["Date"]])
+        listados = pd.MultiIndex.from_arrays([eventos["Ticker"].astype(str),
+                                              pd.to_datetime(eventos["Date"]).dt.normalize()])
+        confirmado |= chaves.isin(listados)
+    split = candidato & confirmado
+    salto = ~candidato & (np.abs(razao - 1) > limite_salto)
+    relatorio["Splits_Ajustados"] = _contar(codigos, split, n)
+    relatorio["Splits_Suspeitos"] = _contar(codigos, candidato & ~confirmado, n)
+    relatorio["Saltos"] = _contar(codigos, salto, n)
+
+    if split.any():
+        # Fator acumulado dos splits posteriores de cada linha (mesmo ticker)
+        log_fator = np.where(split, np.log(candidatos[melhor]), 0.0)
+        acumulado = np.cumsum(log_fator)
+        total = np.bincount(codigos, weights=log_fator, minlength=n)
+        antes_do_grupo = np.bincount(codigos, weights=np.where(inicio, acumulado - log_fator, 0), minlength=n)
+        ajuste = np.exp(total[codigos] - (acumulado - antes_do_grupo[codigos]))
+        for col in precos:
+            df[col] = df[col].to_numpy(np.float64) * ajuste
+        if "Volume" in df.columns:
+            df["Volume"] = np.round(df["Volume"].to_numpy(np.float64) / ajuste).astype(df["Volume"].dtype)
+
+    # Pregões do calendário entre a primeira e a última data sem barra
+    primeira = df.groupby(codigos)["Date"].min()
+    ultima = df.groupby(codigos)["Date"].max()
+    esperados = calendario.searchsorted(ultima, side="right") - calendario.searchsorted(primeira)
+    esperados = pd.Series(esperados, index=primeira.index).reindex(range(n), fill_value=0).to_numpy()
+    relatorio["Linhas_Finais"] = np.bincount(codigos, minlength=n)
+    relatorio["Dias_Faltando"] = np.maximum(esperados - relatorio["Linhas_Finais"].to_numpy(), 0)
+    relatorio["Alteradas"] = (relatorio["Linhas_Originais"] - relatorio["Linhas_Finais"]
+                              + relatorio["OHLC_Corrigidas"] + relatorio["Splits_Ajustados"])
+    return df, relatorio
+
+
+def validar_armazem(diretorio=armazem_precos.DIRETORIO_PADRAO, arquivo_relatorio=ARQUIVO_RELATORIO,
+                    arquivo_eventos=ARQUIVO_EVENTOS, **kwargs):
+    """Valida todo o armazém, regrava só os tickers alterados e grava o relatório."""
+    df = armazem_precos.ler_todos(diretorio=diretorio)
+    limpo, relatorio = validar(df, eventos=ler_eventos(arquivo_eventos), **kwargs)
+    for ticker in relatorio.index[relatorio["Alteradas"] > 0]:
+        armazem_precos.salvar_ticker(limpo[limpo["Ticker"] == ticker].drop(columns="Ticker"), ticker, diretorio)
+    if arquivo_relatorio:
+        with open(arquivo_relatorio, "w", encoding="utf-8") as f:
+            json.dump(relatorio.reset_index().to_dict(orient="records"), f, ensure_ascii=False, indent=2,
+                      default=int)
+    return relatorio
+
+
+if __name__ == "__main__":
+    if not armazem_precos.existe_armazem():
+        print(f"❌ Armazém {armazem_precos.DIRETORIO_PADRAO}/ vazio")
+        raise SystemExit(2)
+    resultado = validar_armazem()
+    print(resultado.to_string())
+    alterados = int((resultado["Alteradas"] > 0).sum())
+    print(f"✅ {alterados} ativo(s) reparado(s); relatório em {ARQUIVO_RELATORIO}")